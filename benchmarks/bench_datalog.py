@@ -0,0 +1,111 @@
+import random
+import time
+from collections import defaultdict
+from collections.abc import Callable
+
+from stop_the_bus.Card import Card, Rank
+from stop_the_bus.Datalog import Atom, Database, Indexes, Inequality, Literal, Subst, match, solve
+from stop_the_bus.Deck import standard_deck
+from stop_the_bus.Hand import MAX_HAND_SIZE
+
+HAND_COUNTS: tuple[int, ...] = (50, 100, 200)
+NODE_COUNTS: tuple[int, ...] = (50, 100, 200)
+EDGES_PER_NODE: int = 4
+START_COUNT: int = 5
+
+# Hands with a pair and a three of another rank, written as the engine used to need them: the
+# inequalities last, after the atoms that bind them, and the atom with a constant last of all
+PAIR_WITH_A_THREE: tuple[Literal, ...] = (
+    Atom("card", ("hand", "i", "suit_i", "rank")),
+    Atom("card", ("hand", "j", "suit_j", "rank")),
+    Atom("card", ("hand", "k", "suit_k", Rank.Three)),
+    Inequality("i", "j"),
+    Inequality("k", "i"),
+    Inequality("k", "j"),
+    Inequality("rank", Rank.Three),
+)
+
+# Triangles through a few start nodes, with the start nodes joined last
+TRIANGLES: tuple[Literal, ...] = (
+    Atom("edge", ("a", "b")),
+    Atom("edge", ("b", "c")),
+    Atom("edge", ("c", "a")),
+    Atom("start", ("a",)),
+    Inequality("a", "b"),
+    Inequality("b", "c"),
+    Inequality("a", "c"),
+)
+
+
+def hands_database(hand_count: int) -> Database:
+    rng: random.Random = random.Random(0)
+    deck: list[Card] = list(standard_deck())
+    database: Database = defaultdict(set)
+    for hand in range(hand_count):
+        for index, card in enumerate(rng.sample(deck, MAX_HAND_SIZE)):
+            database[("card", 4)].add((hand, index, card.suit, card.rank))
+    return database
+
+
+def graph_database(node_count: int) -> Database:
+    rng: random.Random = random.Random(0)
+    database: Database = defaultdict(set)
+    for _ in range(node_count * EDGES_PER_NODE):
+        database[("edge", 2)].add((rng.randrange(node_count), rng.randrange(node_count)))
+    for node in rng.sample(range(node_count), START_COUNT):
+        database[("start", 1)].add((node,))
+    return database
+
+
+# Joining the body in its written order, scanning every fact of each atom, as `solve` did before
+# it indexed and planned
+def scan_in_order(db: Database, body: tuple[Literal, ...]) -> list[Subst]:
+    envs: list[Subst] = [{}]
+    for literal in body:
+        envs = [result for env in envs for result in match(db, env, literal)]
+    return envs
+
+
+def index_in_order(db: Database, body: tuple[Literal, ...]) -> list[Subst]:
+    indexes: Indexes = Indexes(db)
+    envs: list[Subst] = [{}]
+    for literal in body:
+        envs = [result for env in envs for result in match(db, env, literal, indexes)]
+    return envs
+
+
+SOLVERS: dict[str, Callable[[Database, tuple[Literal, ...]], list[Subst]]] = {
+    "scanned, in order": scan_in_order,
+    "indexed, in order": index_in_order,
+    "indexed, planned": solve,
+}
+
+
+def bench(name: str, db: Database, body: tuple[Literal, ...]) -> None:
+    facts: int = sum(len(relation) for relation in db.values())
+    expected: set[frozenset[tuple[str, object]]] | None = None
+    baseline: float | None = None
+    for solver_name, solver in SOLVERS.items():
+        start: float = time.perf_counter()
+        results: list[Subst] = solver(db, body)
+        elapsed: float = time.perf_counter() - start
+
+        found: set[frozenset[tuple[str, object]]] = {frozenset(r.items()) for r in results}
+        assert expected is None or found == expected, f"{solver_name} disagrees on {name}"
+        expected = found
+        baseline = elapsed if baseline is None else baseline
+        print(
+            f"{name:>10} over {facts:>6,} facts, {solver_name:>17}: {elapsed * 1e3:>10.2f} ms "
+            f"({baseline / elapsed:>7.1f}x), {len(results):,} matches"
+        )
+
+
+def main() -> None:
+    for hand_count in HAND_COUNTS:
+        bench("hands", hands_database(hand_count), PAIR_WITH_A_THREE)
+    for node_count in NODE_COUNTS:
+        bench("triangles", graph_database(node_count), TRIANGLES)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+import random
+import time
+
+import torch
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.Driver import Driver
+from stop_the_bus.Encoding import ViewModule
+from stop_the_bus.Log import setup_logging
+from stop_the_bus.NeuralAgent import DecisionCache, NeuralAgent
+
+PLAYER_COUNT: int = 4
+GAME_COUNT: int = 20
+MAX_TURN_COUNT: int = 400
+CACHE_SIZES: list[int] = [64, 1_024, 16_384]
+
+
+# Greedy agents sharing a network play the same games whatever their cache size, since a cached
+# decision is the one the network would make
+def play(agents: list[NeuralAgent]) -> float:
+    players: list[Agent] = list(agents)
+    start: float = time.perf_counter()
+    for seed in range(GAME_COUNT):
+        Driver(players, lives=1, max_turn_count=MAX_TURN_COUNT, rng=random.Random(seed)).drive()
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    setup_logging(level="WARNING")
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule()
+
+    uncached: float = play([NeuralAgent(net) for _ in range(PLAYER_COUNT)])
+    for cache_size in CACHE_SIZES:
+        agents: list[NeuralAgent] = [
+            NeuralAgent(net, cache_size=cache_size) for _ in range(PLAYER_COUNT)
+        ]
+        elapsed: float = play(agents)
+        caches: list[DecisionCache] = [agent.cache for agent in agents if agent.cache is not None]
+        hits: int = sum(cache.hits for cache in caches)
+        decision_count: int = hits + sum(cache.misses for cache in caches)
+        if cache_size == CACHE_SIZES[0]:
+            print(f"{'uncached':>12}: {decision_count / uncached:>10,.0f} decisions/s")
+        print(
+            f"{f'cache {cache_size:,}':>12}: {decision_count / elapsed:>10,.0f} decisions/s "
+            f"({uncached / elapsed:.1f}x), hit rate {hits / decision_count:.1%}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import random
+import time
+
+import numpy as np
+
+from stop_the_bus.Determinization import Determinizations, sample_determinizations
+from stop_the_bus.Game import Game, Round, View
+
+PLAYER_COUNT: int = 4
+SAMPLE_COUNT: int = 10_000
+ROUND_SAMPLE_COUNT: int = 1_000
+
+
+def main() -> None:
+    rng: random.Random = random.Random(0)
+    round: Round = Game(PLAYER_COUNT, rng=rng).start_round()
+    for _ in range(10):
+        if round.turn > 0:
+            round.draw_from_discard()
+        round.discard(rng.randrange(len(round.current_hand)))
+        round.advance_turn()
+    view: View = round.current_view()
+    generator: np.random.Generator = np.random.default_rng(0)
+
+    start: float = time.perf_counter()
+    samples: Determinizations = sample_determinizations(view, SAMPLE_COUNT, generator)
+    sample_rate: float = SAMPLE_COUNT / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    samples.to_vector_game()
+    vector_rate: float = SAMPLE_COUNT / (time.perf_counter() - start)
+
+    small: Determinizations = sample_determinizations(view, ROUND_SAMPLE_COUNT, generator)
+    start = time.perf_counter()
+    small.to_rounds()
+    round_rate: float = ROUND_SAMPLE_COUNT / (time.perf_counter() - start)
+
+    print(f"sample_determinizations  {sample_rate:>12,.0f} deals/s")
+    print(f"to_vector_game           {vector_rate:>12,.0f} tables/s")
+    print(f"to_rounds                {round_rate:>12,.0f} rounds/s")
+
+
+if __name__ == "__main__":
+    main()
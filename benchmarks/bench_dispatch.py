@@ -0,0 +1,101 @@
+import timeit
+from collections.abc import Callable, Sequence
+from functools import partial
+
+from stop_the_bus.Agent import Event, Observer
+from stop_the_bus.Card import CARDS, Card
+from stop_the_bus.Driver import Dispatcher
+from stop_the_bus.Game import View
+
+PLAYER_COUNT: int = 4
+TURNS: int = 100_000
+
+
+class NullObserver:
+    def on_turn_start(self, view: View) -> None:
+        pass
+
+    def on_turn_end(self, view: View) -> None:
+        pass
+
+    def on_discard(self, agent: int, actor: int, card: Card) -> None:
+        pass
+
+    def on_stop_the_bus(self, agent: int, actor: int) -> None:
+        pass
+
+    def on_round_start(self) -> None:
+        pass
+
+    def on_draw(self, agent: int, actor: int, card: Card, from_deck: bool) -> None:
+        pass
+
+
+class NullBatchObserver:
+    def on_turn_start(self, view: View) -> None:
+        pass
+
+    def on_turn_end(self, view: View) -> None:
+        pass
+
+    def on_events(self, agent: int, events: Sequence[Event]) -> None:
+        pass
+
+
+class NonObserver:
+    pass
+
+
+# The dispatch of one turn as Driver did it before Dispatcher: a runtime protocol check per
+# agent and a fresh lambda per event
+def broadcast_turn(agents: Sequence[object], actor: int, card: Card) -> None:
+    def broadcast(action: Callable[[Observer, int, int], None]) -> None:
+        for agent_id, agent in enumerate(agents):
+            if isinstance(agent, Observer):
+                action(agent, agent_id, actor)
+
+    current: object = agents[actor]
+    if isinstance(current, Observer):
+        current.on_turn_start(None)  # type: ignore[arg-type]
+    broadcast(
+        lambda observer, agent_id, actor_id: observer.on_draw(
+            agent=agent_id, actor=actor_id, card=card, from_deck=True
+        )
+    )
+    broadcast(
+        lambda observer, agent_id, actor_id: observer.on_discard(
+            agent=agent_id, actor=actor_id, card=card
+        )
+    )
+    if isinstance(current, Observer):
+        current.on_turn_end(None)  # type: ignore[arg-type]
+
+
+def dispatch_turn(dispatcher: Dispatcher, actor: int, card: Card) -> None:
+    dispatcher.turn_start(actor, None)  # type: ignore[arg-type]
+    dispatcher.draw(actor, card, True)
+    dispatcher.discard(actor, card)
+    dispatcher.turn_end(actor, None)  # type: ignore[arg-type]
+
+
+def main() -> None:
+    card: Card = CARDS[0]
+    # The agents before and after. Batch observers are compared with the observers they replace
+    tables: dict[str, tuple[Callable[[], object], Callable[[], object]]] = {
+        "observers": (NullObserver, NullObserver),
+        "batch observers": (NullObserver, NullBatchObserver),
+        "non-observers": (NonObserver, NonObserver),
+    }
+    for name, (old_factory, new_factory) in tables.items():
+        old_agents: list[object] = [old_factory() for _ in range(PLAYER_COUNT)]
+        dispatcher: Dispatcher = Dispatcher([new_factory() for _ in range(PLAYER_COUNT)])
+        before: float = timeit.timeit(partial(broadcast_turn, old_agents, 0, card), number=TURNS)
+        after: float = timeit.timeit(partial(dispatch_turn, dispatcher, 0, card), number=TURNS)
+        print(
+            f"{PLAYER_COUNT} {name + ':':<17} before {before / TURNS * 1e6:>6.2f} µs/turn, "
+            f"after {after / TURNS * 1e6:>6.2f} µs/turn ({before / after:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import random
+import time
+
+from stop_the_bus.Endgame import EndgameSolver, round_position
+from stop_the_bus.Game import Game, Round
+
+PLAYER_COUNT: int = 3
+ROUND_COUNT: int = 20
+
+
+def endgame_round(seed: int, remaining: int) -> Round:
+    rng: random.Random = random.Random(seed)
+    round: Round = Game(PLAYER_COUNT, rng=rng).start_round()
+    for _ in range(rng.randrange(1, 12)):
+        if round.turn > 0:
+            round.draw_from_deck()
+        round.discard(rng.randrange(len(round.current_hand)))
+        round.advance_turn()
+    round.stop_the_bus()
+    while round.turns_remaining is not None and round.turns_remaining > remaining:
+        round.advance_turn()
+    return round
+
+
+def main() -> None:
+    for remaining in (1, 2):
+        rounds: list[Round] = [endgame_round(seed, remaining) for seed in range(ROUND_COUNT)]
+        for canonical in (False, True):
+            solver: EndgameSolver = EndgameSolver(canonical=canonical)
+            for attempt in ("cold", "warm"):
+                start: float = time.perf_counter()
+                for round in rounds:
+                    solver.outcome(round_position(round))
+                elapsed: float = (time.perf_counter() - start) / ROUND_COUNT
+                hit_rate: float = solver.hits / (solver.hits + solver.misses)
+                print(
+                    f"{remaining} turn(s) remaining, {'canonical' if canonical else 'plain':>9}, "
+                    f"{attempt}: {elapsed * 1e3:>9.3f} ms/position, "
+                    f"{len(solver.table):>8,} positions stored, hit rate {hit_rate:.1%}"
+                )
+
+
+if __name__ == "__main__":
+    main()
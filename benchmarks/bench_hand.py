@@ -0,0 +1,96 @@
+import random
+import time
+from collections.abc import Callable
+
+import numpy as np
+import numpy.typing as npt
+
+from stop_the_bus.Card import DECK_SIZE, Card
+from stop_the_bus.Hand import (
+    MAX_HAND_SIZE,
+    MIN_HAND_SIZE,
+    Hand,
+    build_hand_table,
+    can_stop_the_bus,
+    evaluate_hands,
+    flush_value,
+    hand_value,
+    is_flush,
+    is_prile,
+    maximum_suit_value,
+    scan_can_stop_the_bus,
+    scan_flush_value,
+    scan_hand_value,
+    scan_is_flush,
+    scan_is_prile,
+    scan_maximum_suit_value,
+)
+
+HAND_COUNT: int = 10_000
+BATCH_HAND_COUNT: int = 1_000_000
+REPEAT: int = 5
+
+PAIRS: list[tuple[str, Callable[[Hand], object], Callable[[Hand], object]]] = [
+    ("hand_value", hand_value, scan_hand_value),
+    ("is_flush", is_flush, scan_is_flush),
+    ("is_prile", is_prile, scan_is_prile),
+    ("flush_value", flush_value, scan_flush_value),
+    ("maximum_suit_value", maximum_suit_value, scan_maximum_suit_value),
+    ("can_stop_the_bus", can_stop_the_bus, scan_can_stop_the_bus),
+]
+
+
+def random_hands(count: int, rng: random.Random) -> list[Hand]:
+    return [
+        Hand(
+            Card.from_index(i)
+            for i in rng.sample(range(DECK_SIZE), rng.randint(MIN_HAND_SIZE, MAX_HAND_SIZE))
+        )
+        for _ in range(count)
+    ]
+
+
+def calls_per_second(fn: Callable[[Hand], object], hands: list[Hand]) -> float:
+    best: float = float("inf")
+    for _ in range(REPEAT):
+        start: float = time.perf_counter()
+        for hand in hands:
+            fn(hand)
+        best = min(best, time.perf_counter() - start)
+    return len(hands) / best
+
+
+def batch_hands_per_second(size: int, rng: np.random.Generator) -> float:
+    cards: npt.NDArray[np.int64] = np.argsort(rng.random((BATCH_HAND_COUNT, DECK_SIZE)), axis=1)[
+        :, :size
+    ]
+    best: float = float("inf")
+    for _ in range(REPEAT):
+        start: float = time.perf_counter()
+        evaluate_hands(cards)
+        best = min(best, time.perf_counter() - start)
+    return BATCH_HAND_COUNT / best
+
+
+def main() -> None:
+    hands: list[Hand] = random_hands(HAND_COUNT, random.Random(0))
+
+    start: float = time.perf_counter()
+    build_hand_table()
+    print(f"hand table built in {time.perf_counter() - start:.3f}s")
+
+    for name, table_fn, scan_fn in PAIRS:
+        table_rate: float = calls_per_second(table_fn, hands)
+        scan_rate: float = calls_per_second(scan_fn, hands)
+        print(
+            f"{name:>20}: table {table_rate:>12,.0f} calls/s, "
+            f"scan {scan_rate:>12,.0f} calls/s ({table_rate / scan_rate:.1f}x)"
+        )
+
+    for size in (MIN_HAND_SIZE, MAX_HAND_SIZE):
+        rate: float = batch_hands_per_second(size, np.random.default_rng(0))
+        print(f"{f'evaluate_hands ({size} cards)':>20}: {rate:>12,.0f} hands/s")
+
+
+if __name__ == "__main__":
+    main()
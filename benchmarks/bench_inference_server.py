@@ -0,0 +1,87 @@
+import asyncio
+import random
+import time
+
+import torch
+
+from stop_the_bus.Encoding import ViewModule, encode_view
+from stop_the_bus.Game import Game, Phase, Round, View
+from stop_the_bus.InferenceServer import InferenceServer
+
+DECISION_COUNT: int = 4_096
+BATCH_SIZES: list[int] = [1, 4, 16, 64, 256]
+
+
+def sample_views(count: int) -> list[tuple[View, Phase]]:
+    rng: random.Random = random.Random(0)
+    views: list[tuple[View, Phase]] = []
+    for seed in range(count):
+        round: Round = Game(4, rng=random.Random(seed)).start_round()
+        views.append((round.current_view(), rng.choice(list(Phase))))
+    return views
+
+
+async def decide(server: InferenceServer, views: list[tuple[View, Phase]], tables: int) -> None:
+    async def table(offset: int) -> None:
+        for view, phase in views[offset::tables]:
+            await server.infer_async(view, phase)
+
+    await asyncio.gather(*(table(offset) for offset in range(tables)))
+
+
+# As `decide`, but with the views encoded beforehand, to time the server alone
+async def decide_encoded(
+    server: InferenceServer, encoded: list[tuple[torch.Tensor, Phase]], tables: int
+) -> None:
+    async def table(offset: int) -> None:
+        for view_tensor, phase in encoded[offset::tables]:
+            await server.infer_encoded_async(view_tensor, phase)
+
+    await asyncio.gather(*(table(offset) for offset in range(tables)))
+
+
+def report(name: str, rate: float, baseline: float, server: InferenceServer) -> None:
+    print(
+        f"{name:>28}: {rate:>10,.0f} decisions/s "
+        f"({rate / baseline:.1f}x, mean batch {server.mean_batch_size:.1f})"
+    )
+
+
+def main() -> None:
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule()
+    net.eval()
+    views: list[tuple[View, Phase]] = sample_views(DECISION_COUNT)
+    encoded: list[tuple[torch.Tensor, Phase]] = [
+        (encode_view(view, phase), phase) for view, phase in views
+    ]
+
+    start: float = time.perf_counter()
+    with torch.no_grad():
+        for view, phase in views:
+            net(view, phase)
+    baseline: float = DECISION_COUNT / (time.perf_counter() - start)
+    print(f"{'unbatched':>28}: {baseline:>10,.0f} decisions/s")
+
+    start = time.perf_counter()
+    with torch.no_grad():
+        for view_tensor, phase in encoded:
+            net.head(phase)(net.backbone(view_tensor.unsqueeze(0)))
+    encoded_baseline: float = DECISION_COUNT / (time.perf_counter() - start)
+    print(f"{'unbatched, pre-encoded':>28}: {encoded_baseline:>10,.0f} decisions/s")
+
+    for batch_size in BATCH_SIZES:
+        with InferenceServer(net, max_batch_size=batch_size) as server:
+            start = time.perf_counter()
+            asyncio.run(decide(server, views, batch_size))
+            rate: float = DECISION_COUNT / (time.perf_counter() - start)
+            report(f"max batch {batch_size}", rate, baseline, server)
+        with InferenceServer(net, max_batch_size=batch_size) as server:
+            start = time.perf_counter()
+            asyncio.run(decide_encoded(server, encoded, batch_size))
+            rate = DECISION_COUNT / (time.perf_counter() - start)
+            report(f"max batch {batch_size}, pre-encoded", rate, encoded_baseline, server)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,30 @@
+import random
+import time
+
+import numpy as np
+
+from stop_the_bus.Game import Game, Round
+from stop_the_bus.ISMCTSAgent import ISMCTSAgent
+
+PLAYER_COUNT: int = 4
+PLAYOUTS: int = 20_000
+
+
+def main() -> None:
+    round: Round = Game(PLAYER_COUNT, rng=random.Random(0)).start_round()
+    round.discard(0)
+    round.advance_turn()
+
+    for batch_size in (64, 256, 1024):
+        agent: ISMCTSAgent = ISMCTSAgent(
+            playouts=PLAYOUTS, batch_size=batch_size, rng=np.random.default_rng(0)
+        )
+        clone: Round = round.clone()
+        start: float = time.perf_counter()
+        agent.draw(clone.current_view())
+        rate: float = PLAYOUTS / (time.perf_counter() - start)
+        print(f"batch size {batch_size:>5}: {rate:>10,.0f} playouts/s")
+
+
+if __name__ == "__main__":
+    main()
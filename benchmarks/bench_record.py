@@ -0,0 +1,41 @@
+import os
+import tempfile
+import time
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.RandomAgent import RandomAgent
+from stop_the_bus.Record import GameRecord, append_records, read_records, record_game, replay
+
+PLAYER_COUNT: int = 4
+GAME_COUNT: int = 200
+
+
+def main() -> None:
+    records: list[GameRecord] = []
+    start: float = time.perf_counter()
+    for seed in range(GAME_COUNT):
+        agents: list[Agent] = [RandomAgent(seed * PLAYER_COUNT + i) for i in range(PLAYER_COUNT)]
+        records.append(record_game(agents, seed)[1])
+    play_rate: float = GAME_COUNT / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    for record in records:
+        replay(record)
+    replay_rate: float = GAME_COUNT / (time.perf_counter() - start)
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "games.bin")
+        append_records(path, records)
+        size: int = os.path.getsize(path)
+        start = time.perf_counter()
+        for record in read_records(path):
+            replay(record)
+        file_rate: float = GAME_COUNT / (time.perf_counter() - start)
+
+    print(f"play and record: {play_rate:>10,.0f} games/s")
+    print(f"replay:          {replay_rate:>10,.0f} games/s ({replay_rate / play_rate:.1f}x)")
+    print(f"replay from file:{file_rate:>10,.0f} games/s, {size / GAME_COUNT:,.0f} bytes/game")
+
+
+if __name__ == "__main__":
+    main()
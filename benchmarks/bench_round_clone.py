@@ -0,0 +1,50 @@
+import copy
+import random
+import time
+from collections.abc import Callable
+
+from stop_the_bus.Game import Game, Round
+
+PLAYER_COUNT: int = 4
+ITERATIONS: int = 100_000
+
+
+def _play_some_turns(round: Round, rng: random.Random) -> None:
+    for _ in range(10):
+        if round.turn > 0:
+            round.draw_from_deck()
+        round.discard(rng.randrange(len(round.current_hand)))
+        round.advance_turn()
+
+
+def _rate(operation: Callable[[], object], iterations: int = ITERATIONS) -> float:
+    start: float = time.perf_counter()
+    for _ in range(iterations):
+        operation()
+    return iterations / (time.perf_counter() - start)
+
+
+def _discard_and_undo(round: Round) -> None:
+    round.discard(0)
+    round.undo()
+
+
+def main() -> None:
+    rng: random.Random = random.Random(0)
+    round: Round = Game(PLAYER_COUNT, rng=rng).start_round()
+    _play_some_turns(round, rng)
+    snapshot = round.snapshot()
+
+    rates: dict[str, float] = {
+        "Round.clone": _rate(round.clone),
+        "Round.snapshot": _rate(round.snapshot),
+        "Round.restore": _rate(lambda: round.restore(snapshot)),
+        "discard + undo": _rate(lambda: _discard_and_undo(round)),
+        "copy.deepcopy": _rate(lambda: copy.deepcopy(round), ITERATIONS // 10),
+    }
+    for name, rate in rates.items():
+        print(f"{name:<16} {rate:>12,.0f} /s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+import os
+import tempfile
+import time
+
+import torch
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.Distillation import distill
+from stop_the_bus.Encoding import ViewModule
+from stop_the_bus.Log import setup_logging
+from stop_the_bus.NeuralAgent import NeuralAgent
+from stop_the_bus.Record import RECORD_DRAW_MASK, RECORD_NO_DRAW, GameRecord, record_game
+from stop_the_bus.TablePolicyAgent import PolicyTable, TablePolicyAgent
+
+PLAYER_COUNT: int = 4
+GAME_COUNT: int = 50
+MAX_TURN_COUNT: int = 400
+
+
+# A turn is a discard and a stop decision, after a draw decision on all but a round's first turn
+def decision_count(records: list[GameRecord]) -> int:
+    return sum(
+        2 if action & RECORD_DRAW_MASK == RECORD_NO_DRAW else 3
+        for record in records
+        for action in record.actions
+    )
+
+
+def play(agents: list[Agent]) -> tuple[float, list[GameRecord]]:
+    start: float = time.perf_counter()
+    records: list[GameRecord] = [
+        record_game(agents, seed, lives=1, max_turn_count=MAX_TURN_COUNT)[1]
+        for seed in range(GAME_COUNT)
+    ]
+    return time.perf_counter() - start, records
+
+
+def main() -> None:
+    setup_logging(level="INFO")
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule()
+
+    with tempfile.TemporaryDirectory() as directory:
+        path: str = os.path.join(directory, "policy.bin")
+        start: float = time.perf_counter()
+        distill(net, path)
+        print(
+            f"distilled in {time.perf_counter() - start:.0f}s "
+            f"to {os.path.getsize(path) / 2**20:.1f} MiB"
+        )
+
+        neural_time, neural_records = play([NeuralAgent(net) for _ in range(PLAYER_COUNT)])
+        with PolicyTable(path) as table:
+            table_time, table_records = play([TablePolicyAgent(table) for _ in range(PLAYER_COUNT)])
+
+    neural_rate: float = decision_count(neural_records) / neural_time
+    table_rate: float = decision_count(table_records) / table_time
+    same: int = sum(a == b for a, b in zip(neural_records, table_records, strict=True))
+    print(f"{'NeuralAgent':>16}: {neural_rate:>10,.0f} decisions/s")
+    print(
+        f"{'TablePolicyAgent':>16}: {table_rate:>10,.0f} decisions/s "
+        f"({table_rate / neural_rate:.0f}x)"
+    )
+    print(f"identical games: {same}/{GAME_COUNT}")
+
+
+if __name__ == "__main__":
+    main()
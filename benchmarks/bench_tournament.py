@@ -0,0 +1,25 @@
+import os
+import time
+
+from stop_the_bus.RandomAgent import RandomAgent
+from stop_the_bus.Tournament import AgentFactory, run_tournament
+
+PLAYER_COUNT: int = 4
+GAME_COUNT: int = 2_000
+
+
+def main() -> None:
+    factories: list[AgentFactory] = [RandomAgent] * PLAYER_COUNT
+    cores: int = os.cpu_count() or 1
+    worker_counts: list[int] = sorted({1, 2, 4, cores} & set(range(1, cores + 1)))
+    baseline: float | None = None
+    for workers in worker_counts:
+        start: float = time.perf_counter()
+        run_tournament(factories, GAME_COUNT, seed=0, workers=workers)
+        rate: float = GAME_COUNT / (time.perf_counter() - start)
+        baseline = rate if baseline is None else baseline
+        print(f"{workers:>3} worker(s): {rate:>10,.0f} games/s ({rate / baseline:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
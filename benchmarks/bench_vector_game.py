@@ -0,0 +1,67 @@
+import random
+import time
+
+import numpy as np
+
+from stop_the_bus.Game import Game, Round
+from stop_the_bus.Hand import MIN_HAND_SIZE
+from stop_the_bus.VectorGame import VectorGame
+
+PLAYER_COUNT: int = 4
+TABLE_COUNT: int = 4096
+SCALAR_GAME_COUNT: int = 200
+MAX_TURN_COUNT: int = 100
+
+
+def play_vector_games(table_count: int, rng: np.random.Generator) -> VectorGame:
+    game: VectorGame = VectorGame(table_count, PLAYER_COUNT, rng=rng)
+    while not game.over.all():
+        playing = game.playing
+        drawing = playing & (game.round.turn > 0)
+        from_deck = rng.random(table_count) < 0.5
+        game.round.draw_from_deck(drawing & from_deck)
+        game.round.draw_from_discard(drawing & ~from_deck)
+        game.round.discard(rng.integers(0, MIN_HAND_SIZE + 1, table_count), playing)
+        game.round.stop_the_bus(playing & game.round.can_stop_the_bus())
+        game.round.advance_turn(playing)
+        game.finish_rounds()
+    return game
+
+
+def play_scalar_game(rng: random.Random) -> None:
+    game: Game = Game(PLAYER_COUNT, rng=rng)
+    while game.live_player_count > 1:
+        round: Round = game.start_round()
+        while round.has_turns_remaining and round.turn <= MAX_TURN_COUNT:
+            if round.turn > 0:
+                if rng.random() < 0.5:
+                    round.draw_from_deck()
+                else:
+                    round.draw_from_discard()
+            round.discard(rng.randrange(len(round.current_hand)))
+            if round.can_stop_the_bus():
+                round.stop_the_bus()
+            round.advance_turn()
+        if round.has_turns_remaining:
+            return
+        round.end_round()
+        game.rotate_dealer()
+
+
+def main() -> None:
+    start: float = time.perf_counter()
+    play_vector_games(TABLE_COUNT, np.random.default_rng(0))
+    vector_rate: float = TABLE_COUNT / (time.perf_counter() - start)
+
+    rng: random.Random = random.Random(0)
+    start = time.perf_counter()
+    for _ in range(SCALAR_GAME_COUNT):
+        play_scalar_game(rng)
+    scalar_rate: float = SCALAR_GAME_COUNT / (time.perf_counter() - start)
+
+    print(f"VectorGame ({TABLE_COUNT} tables): {vector_rate:>10,.0f} games/s")
+    print(f"Game/Round (one table):   {scalar_rate:>10,.0f} games/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""Run the engine, agent and encoder benchmarks and write the results as JSON.
+
+PYTHONPATH=src python benchmarks/run_benchmarks.py --output results.json
+PYTHONPATH=src python benchmarks/run_benchmarks.py --only hand_value --compare results.json
+"""
+
+import argparse
+import json
+import platform
+import random
+import subprocess
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+import torch
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.Card import DECK_SIZE, Card
+from stop_the_bus.Datalog import Database, query
+from stop_the_bus.Driver import Driver
+from stop_the_bus.Encoding import ViewModule, encode_view, encode_views
+from stop_the_bus.Game import Game, Phase, Round, View
+from stop_the_bus.Hand import (
+    MAX_HAND_SIZE,
+    MIN_HAND_SIZE,
+    Hand,
+    database_from_hand,
+    hand_value,
+)
+from stop_the_bus.Log import setup_logging
+from stop_the_bus.RandomAgent import RandomAgent
+from stop_the_bus.SimpleAgent import (
+    MATCH_3_SUIT_3_RANK_3_PRILE,
+    RULE_3_SUIT_3_RANK_3_PRILE,
+    SimpleAgent,
+)
+
+PLAYER_COUNT: int = 4
+SAMPLE_COUNT: int = 1_000
+DEFAULT_REPEAT: int = 5
+DEFAULT_LOG_LEVEL: str = "WARNING"
+
+
+@dataclass(frozen=True, slots=True)
+class Result:
+    value: float
+    unit: str
+    higher_is_better: bool
+
+
+def best_time(fn: Callable[[], object], repeat: int) -> float:
+    best: float = float("inf")
+    for _ in range(repeat):
+        start: float = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def rate(count: int, fn: Callable[[], object], repeat: int, unit: str) -> Result:
+    return Result(count / best_time(fn, repeat), unit, True)
+
+
+def latency(count: int, fn: Callable[[], object], repeat: int) -> Result:
+    return Result(best_time(fn, repeat) / count * 1e6, "us", False)
+
+
+def random_hand(size: int, rng: random.Random) -> Hand:
+    return Hand(Card.from_index(i) for i in rng.sample(range(DECK_SIZE), size))
+
+
+# Rounds whose current player holds each given four-card hand, with a card on the discard pile
+def rounds_with_hands(hands: list[Hand]) -> list[Round]:
+    rounds: list[Round] = []
+    for i, hand in enumerate(hands):
+        round: Round = Game(PLAYER_COUNT, rng=random.Random(i)).start_round()
+        round.current_hand.clear()
+        round.current_hand.extend(hand)
+        round.discard_pile.append(round.deck.pop())
+        rounds.append(round)
+    return rounds
+
+
+def bench_hand_value(repeat: int) -> Result:
+    rng: random.Random = random.Random(0)
+    hands: list[Hand] = [
+        random_hand(rng.randint(MIN_HAND_SIZE, MAX_HAND_SIZE), rng) for _ in range(10_000)
+    ]
+    return rate(len(hands), lambda: [hand_value(hand) for hand in hands], repeat, "calls/s")
+
+
+def bench_round_turns(repeat: int) -> Result:
+    turn_count: int = 2_000
+
+    def play() -> None:
+        rng: random.Random = random.Random(0)
+        game: Game = Game(PLAYER_COUNT, rng=random.Random(0))
+        round: Round = game.start_round()
+        round.discard(0)
+        round.advance_turn()
+        for _ in range(turn_count):
+            if not round.has_turns_remaining:
+                round = game.start_round()
+                round.discard(0)
+            elif rng.random() < 0.5:
+                round.draw_from_deck()
+                round.discard(rng.randrange(MAX_HAND_SIZE))
+            else:
+                round.draw_from_discard()
+                round.discard(rng.randrange(MAX_HAND_SIZE))
+            if round.can_stop_the_bus() and rng.random() < 0.1:
+                round.stop_the_bus()
+            round.advance_turn()
+
+    return rate(turn_count, play, repeat, "turns/s")
+
+
+def bench_driver_games(repeat: int) -> Result:
+    game_count: int = 20
+
+    def play() -> None:
+        for seed in range(game_count):
+            agents: list[Agent] = [
+                RandomAgent(seed * PLAYER_COUNT + i) for i in range(PLAYER_COUNT)
+            ]
+            Driver(agents, rng=random.Random(seed)).drive()
+
+    return rate(game_count, play, repeat, "games/s")
+
+
+def bench_simple_agent_discard(repeat: int) -> Result:
+    # SimpleAgent only handles some hands, so time it on those, undoing each discard
+    agent: SimpleAgent = SimpleAgent()
+    rng: random.Random = random.Random(0)
+    views: list[View] = []
+    while len(views) < SAMPLE_COUNT:
+        round: Round = rounds_with_hands([random_hand(MAX_HAND_SIZE, rng)])[0]
+        view: View = round.current_view()
+        try:
+            agent.discard(view)
+        except NotImplementedError:
+            continue
+        round.undo()
+        views.append(view)
+
+    def discard() -> None:
+        for view in views:
+            agent.discard(view)
+            view.round.undo()
+
+    return latency(len(views), discard, repeat)
+
+
+def encoder_views() -> list[tuple[View, Phase]]:
+    rng: random.Random = random.Random(0)
+    rounds: list[Round] = rounds_with_hands(
+        [random_hand(MAX_HAND_SIZE, rng) for _ in range(SAMPLE_COUNT)]
+    )
+    return [(round.current_view(), rng.choice(list(Phase))) for round in rounds]
+
+
+def bench_encode_view(repeat: int) -> Result:
+    views: list[tuple[View, Phase]] = encoder_views()
+    return latency(len(views), lambda: [encode_view(view, phase) for view, phase in views], repeat)
+
+
+def bench_encode_views(repeat: int) -> Result:
+    views: list[tuple[View, Phase]] = encoder_views()
+    buffer: torch.Tensor = torch.empty((len(views), ViewModule.INPUT_DIM))
+    batch: list[View] = [view for view, _ in views]
+    phases: list[Phase] = [phase for _, phase in views]
+    return latency(len(views), lambda: encode_views(batch, phases, out=buffer), repeat)
+
+
+def bench_view_module_forward(repeat: int) -> Result:
+    torch.manual_seed(0)
+    module: ViewModule = ViewModule()
+    module.eval()
+    views: list[tuple[View, Phase]] = encoder_views()
+
+    def forward() -> None:
+        with torch.no_grad():
+            for view, phase in views:
+                module(view, phase)
+
+    return latency(len(views), forward, repeat)
+
+
+# The databases of the three-suit, three-rank hands SimpleAgent matches its rule against
+def three_suit_three_rank_databases() -> list[Database]:
+    rng: random.Random = random.Random(0)
+    databases: list[Database] = []
+    while len(databases) < SAMPLE_COUNT:
+        hand: Hand = random_hand(MAX_HAND_SIZE, rng)
+        if hand.distinct_suit_count == 3 and hand.distinct_rank_count == 3:
+            databases.append(database_from_hand(hand))
+    return databases
+
+
+def bench_datalog_query(repeat: int) -> Result:
+    databases: list[Database] = three_suit_three_rank_databases()
+    return latency(
+        len(databases),
+        lambda: [query(database, RULE_3_SUIT_3_RANK_3_PRILE) for database in databases],
+        repeat,
+    )
+
+
+def bench_compiled_rule(repeat: int) -> Result:
+    # The first match, as SimpleAgent takes it
+    databases: list[Database] = three_suit_three_rank_databases()
+    return latency(
+        len(databases),
+        lambda: [next(MATCH_3_SUIT_3_RANK_3_PRILE(database), None) for database in databases],
+        repeat,
+    )
+
+
+BENCHMARKS: dict[str, Callable[[int], Result]] = {
+    "hand_value": bench_hand_value,
+    "round_turns": bench_round_turns,
+    "driver_games": bench_driver_games,
+    "simple_agent_discard": bench_simple_agent_discard,
+    "encode_view": bench_encode_view,
+    "encode_views": bench_encode_views,
+    "view_module_forward": bench_view_module_forward,
+    "datalog_query": bench_datalog_query,
+    "compiled_rule": bench_compiled_rule,
+}
+
+
+def commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_results(results: dict[str, Result], baseline: dict[str, Any] | None) -> None:
+    for name, result in results.items():
+        line: str = f"{name:>22}: {result.value:>14,.2f} {result.unit}"
+        if baseline is not None and name in baseline:
+            base: float = baseline[name]["value"]
+            speedup: float = result.value / base if result.higher_is_better else base / result.value
+            line += f" ({speedup:.2f}x vs {base:,.2f})"
+        print(line)
+
+
+def main() -> None:
+    parser: argparse.ArgumentParser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--only", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS))
+    parser.add_argument("--repeat", type=int, default=DEFAULT_REPEAT)
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--compare", type=Path, help="a JSON file of earlier results")
+    parser.add_argument("--log-level", default=DEFAULT_LOG_LEVEL)
+    args: argparse.Namespace = parser.parse_args()
+
+    # Debug logging every move would dominate the engine benchmarks
+    setup_logging(level=args.log_level)
+
+    results: dict[str, Result] = {name: BENCHMARKS[name](args.repeat) for name in args.only}
+
+    baseline: dict[str, Any] | None = (
+        None if args.compare is None else json.loads(args.compare.read_text())["benchmarks"]
+    )
+    print_results(results, baseline)
+
+    if args.output is not None:
+        report: dict[str, Any] = {
+            "commit": commit(),
+            "timestamp": datetime.now(UTC).isoformat(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "torch": torch.__version__,
+            "repeat": args.repeat,
+            "log_level": args.log_level,
+            "benchmarks": {name: asdict(result) for name, result in results.items()},
+        }
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
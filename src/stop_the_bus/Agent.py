@@ -1,3 +1,5 @@
+from collections.abc import Sequence
+from dataclasses import dataclass
 from typing import Protocol
 
 from typing_extensions import runtime_checkable
@@ -27,3 +29,40 @@ class Observer(Protocol):
     def on_round_start(self) -> None: ...
 
     def on_draw(self, agent: int, actor: int, card: Card, from_deck: bool) -> None: ...
+
+
+@dataclass(frozen=True, slots=True)
+class RoundStartEvent:
+    pass
+
+
+@dataclass(frozen=True, slots=True)
+class DrawEvent:
+    actor: int
+    card: Card
+    from_deck: bool
+
+
+@dataclass(frozen=True, slots=True)
+class DiscardEvent:
+    actor: int
+    card: Card
+
+
+@dataclass(frozen=True, slots=True)
+class StopTheBusEvent:
+    actor: int
+
+
+type Event = RoundStartEvent | DrawEvent | DiscardEvent | StopTheBusEvent
+
+
+# Receives the events of each turn together at the end of the turn, in the order an Observer
+# would see them, instead of one call per event
+@runtime_checkable
+class BatchObserver(Protocol):
+    def on_turn_start(self, view: View) -> None: ...
+
+    def on_turn_end(self, view: View) -> None: ...
+
+    def on_events(self, agent: int, events: Sequence[Event]) -> None: ...
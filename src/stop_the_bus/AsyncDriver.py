@@ -0,0 +1,157 @@
+import asyncio
+import inspect
+import logging
+from collections.abc import Awaitable, Callable, Sequence
+from logging import Logger
+from typing import Protocol
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.Card import Card
+from stop_the_bus.Deck import Rng
+from stop_the_bus.Driver import DEFAULT_MAX_TURN_COUNT, Dispatcher
+from stop_the_bus.Game import Game, Round, View
+from stop_the_bus.RandomAgent import RandomAgent
+
+log: Logger = logging.getLogger(__name__)
+
+
+DEFAULT_DECISION_TIMEOUT: float = 30.0
+
+
+class AsyncAgent(Protocol):
+    async def draw(self, view: View) -> tuple[Card, bool]: ...
+
+    async def discard(self, view: View) -> Card: ...
+
+    async def stop_the_bus(self, view: View) -> bool: ...
+
+
+class AsyncDriver:
+    """Drives a game like `Driver`, but awaits agents whose methods return awaitables, so that
+    slow agents such as people or remote bots only hold up their own table. Each awaited
+    decision gets `timeout` seconds; past that it is cancelled, any moves it already made are
+    undone and `fallback` decides instead. Synchronous agents are called directly and are not
+    timed out.
+
+    Observers are notified through the same `Dispatcher` as by `Driver`. Run many tables at once
+    with `drive_tables`.
+    """
+
+    __slots__ = (
+        "agents",
+        "game",
+        "max_turn_count",
+        "timeout",
+        "fallback",
+        "dispatcher",
+        "round_count",
+        "turn_count",
+        "eliminations",
+        "timeouts",
+    )
+
+    def __init__(
+        self,
+        agents: list[Agent | AsyncAgent],
+        lives: int = 5,
+        max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+        rng: Rng | None = None,
+        timeout: float | None = DEFAULT_DECISION_TIMEOUT,
+        fallback: Agent | None = None,
+    ) -> None:
+        self.agents: list[Agent | AsyncAgent] = agents
+        self.game: Game = Game(len(agents), lives, rng)
+        self.max_turn_count: int = max_turn_count
+        self.timeout: float | None = timeout
+        # Never stops the bus, so a timed out player does not end the round for everyone
+        self.fallback: Agent = RandomAgent(stop_probability=0.0) if fallback is None else fallback
+        self.dispatcher: Dispatcher = Dispatcher(agents)
+        self.round_count: int = 0
+        self.turn_count: int = 0
+        # Players in the order they ran out of lives, in player order within a round
+        self.eliminations: list[int] = []
+        # The number of decisions each player has timed out on
+        self.timeouts: list[int] = [0] * len(agents)
+
+    async def _decide[T](
+        self,
+        round: Round,
+        decide: Callable[[View], T | Awaitable[T]],
+        fallback: Callable[[View], T],
+        view: View,
+    ) -> T:
+        decision: T | Awaitable[T] = decide(view)
+        if not inspect.isawaitable(decision):
+            return decision
+
+        moves: int = len(round.history)
+        try:
+            return await asyncio.wait_for(decision, self.timeout)
+        except TimeoutError:
+            log.warning(f"Player {round.current_player} timed out, using the fallback policy")
+            self.timeouts[round.current_player] += 1
+            while len(round.history) > moves:
+                round.undo()
+            return fallback(view)
+
+    async def drive(self) -> int:
+        while self.game.live_player_count > 1:
+            log.debug("Starting new round")
+            log.debug(f"Dealer is player {self.game.dealer}")
+            round: Round = self.game.start_round()
+            self.round_count += 1
+
+            self.dispatcher.round_start()
+
+            await self._drive_first_turn(round)
+            while round.has_turns_remaining:
+                if round.turn > self.max_turn_count:
+                    log.error("Maximum turn limit reached, aborting game")
+                    self.turn_count += round.turn
+                    return -1
+                await self._drive_turn(round)
+                # Let other tables run, even when every agent here is synchronous
+                await asyncio.sleep(0)
+            self.turn_count += round.turn
+            round.end_round()
+            self.eliminations.extend(p for p in round.players if self.game.lives[p] <= 0)
+            self.game.rotate_dealer()
+        [winner] = self.game.live_players
+        log.debug(f"Player {winner} wins the game!")
+        return winner
+
+    async def _drive_discard(self, round: Round, view: View, agent: Agent | AsyncAgent) -> None:
+        actor: int = round.current_player
+        card: Card = await self._decide(round, agent.discard, self.fallback.discard, view)
+        self.dispatcher.discard(actor, card)
+
+        if await self._decide(round, agent.stop_the_bus, self.fallback.stop_the_bus, view):
+            self.dispatcher.stop_the_bus(actor)
+
+        self.dispatcher.turn_end(actor, view)
+
+        round.advance_turn()
+
+    async def _drive_first_turn(self, round: Round) -> None:
+        agent: Agent | AsyncAgent = self.agents[round.current_player]
+        view: View = round.current_view()
+
+        self.dispatcher.turn_start(round.current_player, view)
+
+        await self._drive_discard(round, view, agent)
+
+    async def _drive_turn(self, round: Round) -> None:
+        agent: Agent | AsyncAgent = self.agents[round.current_player]
+        view: View = round.current_view()
+
+        self.dispatcher.turn_start(round.current_player, view)
+
+        card, from_deck = await self._decide(round, agent.draw, self.fallback.draw, view)
+        self.dispatcher.draw(round.current_player, card, from_deck)
+
+        await self._drive_discard(round, view, agent)
+
+
+async def drive_tables(drivers: Sequence[AsyncDriver]) -> list[int]:
+    """Play every driver's game concurrently in the running event loop, returning the winners."""
+    return list(await asyncio.gather(*(driver.drive() for driver in drivers)))
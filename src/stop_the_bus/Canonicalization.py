@@ -0,0 +1,75 @@
+from collections.abc import Sequence
+
+from stop_the_bus.Card import NO_CARD, Rank, Suit
+
+# Cards are indexed suit by suit, so a card mask is a block of SUIT_BITS bits per suit and
+# relabelling the suits moves whole blocks
+SUIT_BITS: int = Rank.size()
+SUIT_BLOCK: int = (1 << SUIT_BITS) - 1
+
+# A relabelling of the suits, giving the suit index each suit index becomes
+type SuitPermutation = tuple[int, ...]
+# What a player knows of a round, as card masks and indices:
+#   (hand mask, discard pile top or NO_CARD, known holds mask of each seat)
+type Situation = tuple[int, int, tuple[int, ...]]
+
+IDENTITY_PERMUTATION: SuitPermutation = tuple(range(Suit.size()))
+
+
+def invert_permutation(permutation: SuitPermutation) -> SuitPermutation:
+    inverse: list[int] = [0] * len(permutation)
+    for suit, target in enumerate(permutation):
+        inverse[target] = suit
+    return tuple(inverse)
+
+
+# e.g. with (1, 0, 2, 3), the Ace of spades (0) becomes the Ace of diamonds (13)
+def relabel_mask(mask: int, permutation: SuitPermutation) -> int:
+    relabelled: int = 0
+    for suit, target in enumerate(permutation):
+        relabelled |= (mask >> suit * SUIT_BITS & SUIT_BLOCK) << target * SUIT_BITS
+    return relabelled
+
+
+def relabel_card(card: int, permutation: SuitPermutation) -> int:
+    if card == NO_CARD:
+        return NO_CARD
+    suit, rank = divmod(card, SUIT_BITS)
+    return permutation[suit] * SUIT_BITS + rank
+
+
+def card_mask(card: int) -> int:
+    return 0 if card == NO_CARD else 1 << card
+
+
+def canonical_permutation(masks: Sequence[int]) -> SuitPermutation:
+    """The relabelling that orders the suits by the cards they hold in each mask in turn, so
+    that masks that are relabellings of each other all map to the same masks. Suits holding the
+    same cards in every mask are interchangeable, so their order among themselves is moot.
+    """
+    signatures: list[tuple[int, ...]] = [
+        tuple(mask >> suit * SUIT_BITS & SUIT_BLOCK for mask in masks)
+        for suit in IDENTITY_PERMUTATION
+    ]
+    order: list[int] = sorted(IDENTITY_PERMUTATION, key=signatures.__getitem__, reverse=True)
+    return invert_permutation(tuple(order))
+
+
+def relabel_situation(situation: Situation, permutation: SuitPermutation) -> Situation:
+    hand, top, holds = situation
+    return (
+        relabel_mask(hand, permutation),
+        relabel_card(top, permutation),
+        tuple(relabel_mask(hold, permutation) for hold in holds),
+    )
+
+
+def canonicalize(situation: Situation) -> tuple[Situation, SuitPermutation]:
+    """The canonical relabelling of a situation, shared by all its relabellings, and the
+    permutation that maps the situation to it. Relabelling by the inverse permutation, as from
+    `invert_permutation`, maps the canonical situation and anything derived from it, such as a
+    chosen card, back.
+    """
+    hand, top, holds = situation
+    permutation: SuitPermutation = canonical_permutation((hand, card_mask(top), *holds))
+    return relabel_situation(situation, permutation), permutation
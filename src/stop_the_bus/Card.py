@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 
@@ -16,29 +16,13 @@ class Suit(Enum):
 
     @property
     def index(self) -> int:
-        match self:
-            case Suit.Spades:
-                return 0
-            case Suit.Diamonds:
-                return 1
-            case Suit.Clubs:
-                return 2
-            case Suit.Hearts:
-                return 3
+        return SUIT_INDICES[self]
 
     @staticmethod
     def from_index(index: int) -> "Suit":
-        match index:
-            case 0:
-                return Suit.Spades
-            case 1:
-                return Suit.Diamonds
-            case 2:
-                return Suit.Clubs
-            case 3:
-                return Suit.Hearts
-            case _:
-                raise ValueError(f"Invalid suit index: {index}")
+        if not 0 <= index < len(SUITS):
+            raise ValueError(f"Invalid suit index: {index}")
+        return SUITS[index]
 
     @staticmethod
     def size() -> int:
@@ -61,32 +45,14 @@ class Rank(Enum):
     King = 13
 
     def __str__(self) -> str:
-        match self:
-            case Rank.Ten:
-                return "T"
-            case Rank.Jack:
-                return "J"
-            case Rank.Queen:
-                return "Q"
-            case Rank.King:
-                return "K"
-            case Rank.Ace:
-                return "A"
-            case _:
-                return str(self.value)
+        return RANK_SYMBOLS[self]
 
     def __repr__(self) -> str:
         return self.__str__()
 
     @property
     def score(self) -> int:
-        match self:
-            case Rank.Ace:
-                return 11
-            case Rank.King | Rank.Queen | Rank.Jack:
-                return 10
-            case _:
-                return int(self.value)
+        return RANK_SCORES[self]
 
     @property
     def index(self) -> int:
@@ -94,21 +60,52 @@ class Rank(Enum):
 
     @staticmethod
     def from_index(index: int) -> "Rank":
-        return Rank(index + 1)
+        if not 0 <= index < len(RANKS):
+            raise ValueError(f"Invalid rank index: {index}")
+        return RANKS[index]
 
     @staticmethod
     def size() -> int:
         return len(Rank.__members__)
 
 
+SUITS: tuple[Suit, ...] = tuple(Suit)
+SUIT_INDICES: dict[Suit, int] = {suit: index for index, suit in enumerate(SUITS)}
+
+RANKS: tuple[Rank, ...] = tuple(Rank)
+RANK_SYMBOLS: dict[Rank, str] = {rank: str(rank.value) for rank in RANKS} | {
+    Rank.Ten: "T",
+    Rank.Jack: "J",
+    Rank.Queen: "Q",
+    Rank.King: "K",
+    Rank.Ace: "A",
+}
+RANK_SCORES: dict[Rank, int] = {rank: min(int(rank.value), 10) for rank in RANKS} | {Rank.Ace: 11}
+
+DECK_SIZE: int = Rank.size() * Suit.size()
+# The card index standing for no card, such as the top of an empty discard pile
+NO_CARD: int = -1
+
+
 @dataclass(frozen=True, slots=True)
 class Card:
     suit: Suit
     rank: Rank
+    index: int = field(init=False, repr=False, compare=False)
+    score: int = field(init=False, repr=False, compare=False)
 
-    @property
-    def score(self) -> int:
-        return self.rank.score
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "index", self.suit.index * Rank.size() + self.rank.index)
+        object.__setattr__(self, "score", self.rank.score)
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Card) and self.index == other.index
+
+    def __hash__(self) -> int:
+        return self.index
+
+    def __reduce__(self) -> tuple[object, tuple[int]]:
+        return Card.from_index, (self.index,)
 
     def __str__(self) -> str:
         return f"{self.rank}{self.suit.value}"
@@ -116,16 +113,22 @@ class Card:
     def __repr__(self) -> str:
         return self.__str__()
 
-    @property
-    def index(self) -> int:
-        return self.suit.index * Rank.size() + self.rank.index
-
     @staticmethod
     def from_index(index: int) -> "Card":
-        rank_index: int = index % Rank.size()
-        suit_index: int = index // Rank.size()
+        if not 0 <= index < DECK_SIZE:
+            raise ValueError(f"Invalid card index: {index}")
+        return CARDS[index]
+
+    @staticmethod
+    def of(suit: Suit, rank: Rank) -> "Card":
+        return CARDS[suit.index * Rank.size() + rank.index]
+
 
-        rank: Rank = Rank.from_index(rank_index)
-        suit: Suit = Suit.from_index(suit_index)
+# The canonical pool of cards, in card index order. Cards dealt in a game are always taken from
+# this pool, so they compare by identity and never need to be allocated
+CARDS: tuple[Card, ...] = tuple(Card(suit, rank) for suit in SUITS for rank in RANKS)
 
-        return Card(suit, rank)
+# Per-card properties, in card index order
+CARD_SCORES: tuple[int, ...] = tuple(card.score for card in CARDS)
+CARD_SUIT_INDICES: tuple[int, ...] = tuple(card.suit.index for card in CARDS)
+CARD_RANK_INDICES: tuple[int, ...] = tuple(card.rank.index for card in CARDS)
@@ -1,5 +1,8 @@
 from collections import defaultdict
+from collections.abc import Callable, Container, Iterable, Iterator
 from dataclasses import dataclass
+from functools import cache
+from typing import cast
 
 from stop_the_bus.Card import Rank, Suit
 
@@ -57,7 +60,62 @@ def resolve(subst: Subst, term: Term) -> Const | Var:
     return subst[term] if isinstance(term, str) and term in subst else term
 
 
-def match(db: Database, subst: Subst, literal: Literal) -> list[Subst]:
+# Relations with no more facts than this are scanned rather than looked up in an index
+SCAN_LIMIT: int = 16
+
+# The positions of an atom's arguments that are bound, by a constant or a bound variable
+# e.g. card(i, suit, Three) with suit bound -> (1, 2)
+type Pattern = tuple[int, ...]
+# The facts of a relation keyed by their arguments at a pattern's positions
+type Index = dict[tuple[Const, ...], list[Fact]]
+
+
+def bound_pattern(atom: Atom, bound: Container[Var]) -> Pattern:
+    return tuple(
+        position
+        for position, arg in enumerate(atom.args)
+        if not isinstance(arg, str) or arg in bound
+    )
+
+
+class Indexes:
+    """Hash indexes over the relations of a database, one per predicate and pattern of bound
+    arguments, each built the first time it is looked up. Relations are only ever added to, so an
+    index is rebuilt once its relation has grown or been replaced.
+    """
+
+    __slots__ = ("db", "indexes")
+
+    def __init__(self, db: Database) -> None:
+        self.db: Database = db
+        self.indexes: dict[tuple[Predicate, Pattern], tuple[Relation, int, Index]] = {}
+
+    def index(self, predicate: Predicate, pattern: Pattern) -> Index:
+        relation: Relation = self.db.get(predicate, set())
+        built: tuple[Relation, int, Index] | None = self.indexes.get((predicate, pattern))
+        if built is not None and built[0] is relation and built[1] == len(relation):
+            return built[2]
+
+        index: Index = {}
+        for fact in relation:
+            index.setdefault(tuple(fact[position] for position in pattern), []).append(fact)
+        self.indexes[(predicate, pattern)] = (relation, len(relation), index)
+        return index
+
+    def lookup(
+        self, predicate: Predicate, pattern: Pattern, key: tuple[Const, ...]
+    ) -> Iterable[Fact]:
+        if not pattern:
+            return self.db.get(predicate, ())
+        return self.index(predicate, pattern).get(key, ())
+
+    def distinct(self, predicate: Predicate, position: int) -> int:
+        return len(self.index(predicate, (position,)))
+
+
+def match(
+    db: Database, subst: Subst, literal: Literal, indexes: Indexes | None = None
+) -> list[Subst]:
     if isinstance(literal, Inequality):
         left = resolve(subst, literal.left)
         right = resolve(subst, literal.right)
@@ -74,8 +132,16 @@ def match(db: Database, subst: Subst, literal: Literal) -> list[Subst]:
     if predicate not in db:
         return []
 
+    facts: Iterable[Fact] = db[predicate]
+    if indexes is not None and len(db[predicate]) > SCAN_LIMIT:
+        pattern: Pattern = bound_pattern(literal, subst)
+        key: tuple[Const, ...] = tuple(
+            cast(Const, resolve(subst, literal.args[position])) for position in pattern
+        )
+        facts = indexes.lookup(predicate, pattern, key)
+
     results: list[Subst] = []
-    for fact in db[predicate]:
+    for fact in facts:
         local_subst: Subst = subst.copy()
         if unify(local_subst, literal, fact):
             results.append(local_subst)
@@ -83,13 +149,84 @@ def match(db: Database, subst: Subst, literal: Literal) -> list[Subst]:
     return results
 
 
-def solve(db: Database, atoms: tuple[Literal, ...]) -> list[Subst]:
+# The expected number of facts an atom matches once the given variables are bound, taking its
+# bound arguments to be independent and uniformly distributed over their values
+def estimate_matches(indexes: Indexes, atom: Atom, bound: Container[Var]) -> float:
+    predicate: Predicate = (atom.name, len(atom.args))
+    matches: float = len(indexes.db.get(predicate, ()))
+    if matches:
+        for position in bound_pattern(atom, bound):
+            matches /= indexes.distinct(predicate, position)
+    return matches
+
+
+# The variables of a literal
+# e.g. card(i, suit, Three) -> {i, suit}
+@cache
+def literal_variables(literal: Literal) -> frozenset[Var]:
+    terms: tuple[Term, ...] = (
+        literal.args if isinstance(literal, Atom) else (literal.left, literal.right)
+    )
+    return frozenset(term for term in terms if isinstance(term, str))
+
+
+# A body with its atoms in order and each inequality moved to just after the atom that binds the
+# last of its variables, or to the end if no atom does, where it holds
+# e.g. (x != y, p(x), q(y), r(x, z)) -> (p(x), q(y), x != y, r(x, z))
+@cache
+def push_inequalities(body: tuple[Literal, ...]) -> tuple[Literal, ...]:
+    atoms: list[Literal] = [literal for literal in body if isinstance(literal, Atom)]
+    pending: list[Literal] = [literal for literal in body if isinstance(literal, Inequality)]
+    pushed: list[Literal] = []
+    bound: frozenset[Var] = frozenset()
+    while True:
+        ready: list[Literal] = [
+            literal for literal in pending if literal_variables(literal) <= bound
+        ]
+        pushed.extend(ready)
+        pending = [literal for literal in pending if literal not in ready]
+        if not atoms:
+            return (*pushed, *pending)
+        atom: Literal = atoms.pop(0)
+        pushed.append(atom)
+        bound |= literal_variables(atom)
+
+
+def plan(indexes: Indexes, body: tuple[Literal, ...]) -> tuple[Literal, ...]:
+    """Reorder a rule body for `solve`: greedily, the atom expected to match the fewest facts
+    given the variables bound so far goes next, with ties kept in body order, and inequalities
+    are pushed to the earliest point their variables are bound.
+    """
+    atoms: list[Atom] = [literal for literal in body if isinstance(literal, Atom)]
+    ordered: list[Literal] = []
+    bound: frozenset[Var] = frozenset()
+    while atoms:
+        atom: Atom = min(atoms, key=lambda atom: estimate_matches(indexes, atom, bound))
+        atoms.remove(atom)
+        ordered.append(atom)
+        bound |= literal_variables(atom)
+    ordered.extend(literal for literal in body if isinstance(literal, Inequality))
+    return push_inequalities(tuple(ordered))
+
+
+def solve(db: Database, atoms: tuple[Literal, ...], indexes: Indexes | None = None) -> list[Subst]:
+    """The substitutions that satisfy a rule body, with the body ordered by `plan` and the facts
+    of each atom looked up by its bound arguments. Bodies over relations of no more than
+    SCAN_LIMIT facts are left in their order but for their inequalities, as estimating their
+    joins would cost more than making them.
+    """
+    indexes = Indexes(db) if indexes is None else indexes
     envs: list[Subst] = [{}]
 
-    for atom in atoms:
+    small: bool = all(
+        len(db.get((atom.name, len(atom.args)), ())) <= SCAN_LIMIT
+        for atom in atoms
+        if isinstance(atom, Atom)
+    )
+    for atom in push_inequalities(atoms) if small else plan(indexes, atoms):
         new_envs: list[Subst] = []
         for env in envs:
-            new_envs.extend(match(db, env, atom))
+            new_envs.extend(match(db, env, atom, indexes))
         envs = new_envs
 
     return envs
@@ -110,10 +247,10 @@ def instantiate(subst: Subst, atom: Atom) -> Fact | None:
     return tuple(args)
 
 
-def derive(db: Database, rule: Rule) -> set[tuple[Predicate, Fact]]:
+def derive(db: Database, rule: Rule, indexes: Indexes | None = None) -> set[tuple[Predicate, Fact]]:
     results: set[tuple[Predicate, Fact]] = set()
     predicate: Predicate = (rule.head.name, len(rule.head.args))
-    for subst in solve(db, rule.body):
+    for subst in solve(db, rule.body, indexes):
         fact = instantiate(subst, rule.head)
         if fact is not None:
             results.add((predicate, fact))
@@ -122,10 +259,11 @@ def derive(db: Database, rule: Rule) -> set[tuple[Predicate, Fact]]:
 
 
 def naive_fixpoint(db: Database, rules: list[Rule]) -> None:
+    indexes: Indexes = Indexes(db)
     while True:
         added = False
         for rule in rules:
-            for predicate, fact in derive(db, rule):
+            for predicate, fact in derive(db, rule, indexes):
                 if fact not in db[predicate]:
                     db[predicate].add(fact)
                     added = True
@@ -137,3 +275,86 @@ def query(db: Database, q: Rule) -> list[Subst]:
     db_copy = db.copy()
     naive_fixpoint(db_copy, [q])
     return match(db_copy, {}, q.head)
+
+
+# A rule compiled by `compile_rule`, yielding the head variables of each match of its body
+type Matcher = Callable[[Database], Iterator[Subst]]
+
+
+def no_matches(db: Database) -> Iterator[Subst]:
+    return iter(())
+
+
+def compile_rule(rule: Rule) -> Matcher:
+    """Compile a rule into a matcher specialised to its body: one nested loop per atom, in body
+    order, over the facts of its predicate, with every constant, repeated variable and
+    inequality checked as soon as the variables it needs are bound. Matches are yielded one at a
+    time, so taking the first costs only the search up to it.
+
+    Unlike `query`, a matcher yields a match per way of satisfying the body, so the same head
+    may be yielded more than once, and does not yield facts of the head's predicate that were
+    already in the database. As in `solve`, an inequality holds if a variable in it is bound by
+    no atom.
+    """
+    inequalities: list[Inequality] = []
+    for literal in rule.body:
+        if isinstance(literal, Inequality):
+            if literal.left == literal.right:
+                return no_matches
+            if isinstance(literal.left, str) or isinstance(literal.right, str):
+                inequalities.append(literal)
+
+    names: dict[Var, str] = {}
+    namespace: dict[str, object] = {}
+    lines: list[str] = ["def match(db):"]
+    indent: str = "    "
+
+    # e.g. Rank.Three -> "c0", with c0 bound to Rank.Three in the namespace
+    def constant(value: object) -> str:
+        name: str = f"c{len(namespace)}"
+        namespace[name] = value
+        return name
+
+    def code(term: Term) -> str:
+        return names[term] if isinstance(term, str) else constant(term)
+
+    def is_bound(term: Term) -> bool:
+        return not isinstance(term, str) or term in names
+
+    for literal in rule.body:
+        if isinstance(literal, Inequality):
+            continue
+        targets: list[str] = []
+        checks: list[str] = []
+        for index, arg in enumerate(literal.args):
+            if isinstance(arg, str) and arg not in names:
+                names[arg] = f"v{len(names)}"
+                targets.append(names[arg])
+            else:
+                targets.append(f"t{index}")
+                checks.append(f"t{index} != {code(arg)}")
+        predicate: str = constant((literal.name, len(literal.args)))
+        if targets:
+            lines.append(f"{indent}for {', '.join(targets)}, in db.get({predicate}, ()):")
+        else:
+            # An atom with no arguments holds or not, with nothing to bind
+            lines.append(f"{indent}if () in db.get({predicate}, ()):")
+        indent += "    "
+        for inequality in [i for i in inequalities if is_bound(i.left) and is_bound(i.right)]:
+            inequalities.remove(inequality)
+            checks.append(f"{code(inequality.left)} == {code(inequality.right)}")
+        if checks:
+            lines.append(f"{indent}if {' or '.join(checks)}:")
+            lines.append(f"{indent}    continue")
+
+    head: list[str] = []
+    for arg in rule.head.args:
+        if isinstance(arg, str):
+            if arg not in names:
+                # The head can never be instantiated
+                return no_matches
+            head.append(f"{constant(arg)}: {names[arg]}")
+    lines.append(f"{indent}yield {{{', '.join(head)}}}")
+
+    exec(compile("\n".join(lines), f"<rule {rule.head.name}>", "exec"), namespace)
+    return cast(Matcher, namespace["match"])
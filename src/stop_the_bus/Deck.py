@@ -1,36 +1,121 @@
 import itertools
 import random
-from collections import deque
-from collections.abc import Generator
+from collections.abc import Generator, Iterable, Iterator
 
-from stop_the_bus.Card import Card, Rank, Suit
+import numpy as np
+
+from stop_the_bus.Card import CARDS, DECK_SIZE, Card, Rank, Suit
 from stop_the_bus.Hand import Hand
 
-type Deck = deque[Card]
+type Rng = random.Random | np.random.Generator
+
+
+class Deck:
+    """A stack of cards, stored as card indices in a fixed 52-byte buffer with the top of the
+    stack at the end. Dealing and discarding move a cursor and shuffles permute the buffer in
+    place, so no per-card objects are allocated.
+    """
+
+    __slots__ = ("cards", "size")
+
+    def __init__(self, cards: Iterable[Card] = ()) -> None:
+        self.cards: bytearray = bytearray(DECK_SIZE)
+        self.size: int = 0
+        self.extend(cards)
+
+    def __len__(self) -> int:
+        return self.size
+
+    def __iter__(self) -> Iterator[Card]:
+        return (CARDS[index] for index in self.cards[: self.size])
+
+    def __getitem__(self, position: int) -> Card:
+        if position < 0:
+            position += self.size
+        if not 0 <= position < self.size:
+            raise IndexError("deck index out of range")
+        return CARDS[self.cards[position]]
+
+    def __contains__(self, card: object) -> bool:
+        return isinstance(card, Card) and self.cards.find(card.index, 0, self.size) >= 0
+
+    def __repr__(self) -> str:
+        return f"Deck({list(self)})"
 
+    @property
+    def indices(self) -> bytes:
+        """The card indices in the deck, from the bottom of the stack to the top."""
+        return bytes(self.cards[: self.size])
 
-DECK_SIZE: int = Rank.size() * Suit.size()
+    def pop(self) -> Card:
+        if self.size == 0:
+            raise IndexError("pop from an empty deck")
+        self.size -= 1
+        return CARDS[self.cards[self.size]]
+
+    def append(self, card: Card) -> None:
+        self.cards[self.size] = card.index
+        self.size += 1
+
+    def extend(self, cards: Iterable[Card]) -> None:
+        if isinstance(cards, Deck):
+            self.extend_indices(cards.cards[: cards.size])
+        else:
+            for card in cards:
+                self.append(card)
+
+    def extend_indices(self, indices: bytes | bytearray) -> None:
+        self.cards[self.size : self.size + len(indices)] = indices
+        self.size += len(indices)
+
+    def clear(self) -> None:
+        self.size = 0
+
+    def copy(self) -> "Deck":
+        deck: Deck = Deck()
+        deck.extend_indices(self.cards[: self.size])
+        return deck
+
+    def shuffle(self, rng: Rng | None = None) -> None:
+        """Shuffle the deck in place. Without an explicit generator this uses the global
+        `random` module, like `random.shuffle`.
+        """
+        if isinstance(rng, np.random.Generator):
+            rng.shuffle(np.frombuffer(self.cards, dtype=np.uint8, count=self.size))
+        else:
+            shuffle = random.shuffle if rng is None else rng.shuffle
+            shuffle(memoryview(self.cards)[: self.size])  # type: ignore[arg-type]
 
 
 def empty_deck() -> Deck:
-    return deque()
+    return Deck()
 
 
 def new_deck_order() -> Generator[Card, None, None]:
     for suit, rank in itertools.product([Suit.Spades, Suit.Diamonds], Rank):
-        yield Card(suit, rank)
+        yield Card.of(suit, rank)
     for suit, rank in itertools.product([Suit.Clubs, Suit.Hearts], reversed(Rank)):
-        yield Card(suit, rank)
+        yield Card.of(suit, rank)
+
+
+NEW_DECK_ORDER: bytes = bytes(card.index for card in new_deck_order())
 
 
 def standard_deck() -> Deck:
-    return deque(new_deck_order())
+    deck: Deck = Deck()
+    deck.extend_indices(NEW_DECK_ORDER)
+    return deck
+
+
+def shuffled_deck(rng: Rng | None = None) -> Deck:
+    deck: Deck = standard_deck()
+    deck.shuffle(rng)
+    return deck
 
 
-def shuffled_deck() -> Deck:
-    cards: list[Card] = list(new_deck_order())
-    random.shuffle(cards)
-    return deque(cards)
+# Independent generators for parallel simulations, reproducible from a single seed
+def spawn_rngs(seed: int, count: int) -> list[np.random.Generator]:
+    return [np.random.default_rng(child) for child in np.random.SeedSequence(seed).spawn(count)]
 
 
 def deal(deck: Deck, hand: Hand) -> Card:
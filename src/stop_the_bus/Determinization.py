@@ -0,0 +1,90 @@
+from dataclasses import dataclass
+
+import numpy as np
+import numpy.typing as npt
+
+from stop_the_bus.Card import CARDS, DECK_SIZE, NO_CARD
+from stop_the_bus.Game import Round, View
+from stop_the_bus.Hand import MAX_HAND_SIZE
+from stop_the_bus.VectorGame import IntArray, VectorGame
+
+
+@dataclass(frozen=True, slots=True)
+class Determinizations:
+    """Complete deals of a round that agree with everything one viewer knows: their own hand,
+    the discard pile, the cards other players are known to hold and the size of every hand and
+    of the deck. Only the other players' unknown cards and the order of the deck vary.
+    """
+
+    round: Round
+    viewer_index: int
+    # (count, seats, MAX_HAND_SIZE) card indices, padded with NO_CARD
+    hands: IntArray
+    # (count, deck size) card indices, from the bottom of the deck to the top
+    decks: npt.NDArray[np.uint8]
+
+    def __len__(self) -> int:
+        return len(self.hands)
+
+    def to_round(self, sample: int) -> Round:
+        """A clone of the round with the hidden cards dealt as in one sample."""
+        round: Round = self.round.clone()
+        for seat, hand in enumerate(round.hands):
+            if seat != self.viewer_index:
+                indices: list[int] = self.hands[sample, seat, : len(hand)].tolist()
+                hand.clear()
+                hand.extend(CARDS[index] for index in indices)
+        round.deck.clear()
+        round.deck.extend_indices(self.decks[sample].tobytes())
+        return round
+
+    def to_rounds(self) -> list[Round]:
+        return [self.to_round(sample) for sample in range(len(self))]
+
+    def to_vector_game(self, rng: np.random.Generator | None = None) -> VectorGame:
+        """A vector game with one table per sample."""
+        game: VectorGame = VectorGame.from_round(self.round, len(self), rng)
+        game.round.hands[:, : self.round.player_count] = self.hands
+        game.round.deck[:, : self.decks.shape[1]] = self.decks
+        return game
+
+
+def unseen_cards(view: View) -> npt.NDArray[np.uint8]:
+    """The cards the viewer cannot locate: in the deck or hidden in another player's hand."""
+    seen: npt.NDArray[np.bool_] = np.zeros(DECK_SIZE, dtype=np.bool_)
+    seen[np.frombuffer(view.hand.indices, dtype=np.uint8)] = True
+    seen[np.frombuffer(view.discard_pile.indices, dtype=np.uint8)] = True
+    for hand in view.certain_holds.values():
+        seen[np.frombuffer(hand.indices, dtype=np.uint8)] = True
+    return np.flatnonzero(~seen).astype(np.uint8)
+
+
+def sample_determinizations(
+    view: View, count: int, rng: np.random.Generator | None = None
+) -> Determinizations:
+    """Draw `count` deals consistent with `view`, each uniformly at random, in one batch."""
+    rng = np.random.default_rng() if rng is None else rng
+    round: Round = view.round
+    seats: int = round.player_count
+
+    hands: IntArray = np.full((count, seats, MAX_HAND_SIZE), NO_CARD, dtype=np.int64)
+    hidden_seats: list[int] = []
+    hidden_slots: list[int] = []
+    for seat, hand in enumerate(round.hands):
+        known: bytes = (
+            hand.indices if seat == view.player_index else round.certain_holds[seat].indices
+        )
+        hands[:, seat, : len(known)] = np.frombuffer(known, dtype=np.uint8)
+        hidden_seats.extend([seat] * (len(hand) - len(known)))
+        hidden_slots.extend(range(len(known), len(hand)))
+
+    unseen: npt.NDArray[np.uint8] = unseen_cards(view)
+    if len(unseen) != len(hidden_slots) + len(round.deck):
+        raise ValueError(
+            f"{len(unseen)} unseen cards cannot fill {len(hidden_slots)} hidden hand slots and "
+            f"a deck of {len(round.deck)}"
+        )
+
+    deals: npt.NDArray[np.uint8] = rng.permuted(np.tile(unseen, (count, 1)), axis=1)
+    hands[:, hidden_seats, hidden_slots] = deals[:, : len(hidden_slots)]
+    return Determinizations(round, view.player_index, hands, deals[:, len(hidden_slots) :])
@@ -0,0 +1,104 @@
+import logging
+import time
+from functools import cache
+from pathlib import Path
+
+import numpy as np
+import numpy.typing as npt
+import torch
+
+from stop_the_bus.Card import CARD_RANK_INDICES, CARD_SUIT_INDICES, DECK_SIZE
+from stop_the_bus.Encoding import (
+    DEFAULT_DEVICE,
+    DISCARD_OFFSET,
+    FLAG_OFFSET,
+    ViewModule,
+    hand_feature_matrix,
+)
+from stop_the_bus.Game import Phase
+from stop_the_bus.Hand import evaluate_hands, ranked_hands
+from stop_the_bus.TablePolicyAgent import (
+    BUS_STOPPED_CHOICES,
+    DISCARD_CHOICES,
+    HAND_ENTRY_COUNT,
+    PHASE_ENTRY_COUNTS,
+    PHASE_ENTRY_OFFSETS,
+    PHASE_HAND_SIZES,
+    TABLE_ENTRY_COUNT,
+    write_table,
+)
+
+# Hands evaluated per forward pass, each with every discard choice and bus flag
+DEFAULT_CHUNK_SIZE: int = 1024
+
+log: logging.Logger = logging.getLogger(__name__)
+
+
+# The encoded views of a phase for every discard choice and bus flag, with no hand, as
+# `encode_view` lays them out
+@cache
+def discard_templates(phase: Phase, device: torch.device = DEFAULT_DEVICE) -> torch.Tensor:
+    templates: torch.Tensor = torch.zeros(
+        (DISCARD_CHOICES, BUS_STOPPED_CHOICES, ViewModule.INPUT_DIM), device=device
+    )
+    for index in range(DECK_SIZE):
+        templates[index + 1, :, DISCARD_OFFSET + CARD_RANK_INDICES[index]] = 1
+        templates[
+            index + 1, :, DISCARD_OFFSET + ViewModule.DISCARD_RANK_DIM + CARD_SUIT_INDICES[index]
+        ] = 1
+    templates[:, :, FLAG_OFFSET + phase - Phase.DRAW] = 1
+    templates[:, 1, FLAG_OFFSET + len(Phase)] = 1
+    return templates
+
+
+def phase_actions(
+    net: ViewModule, phase: Phase, start: int = 0, stop: int | None = None
+) -> npt.NDArray[np.uint8]:
+    """The actions a greedy `NeuralAgent` with the network takes in a phase, for the hands
+    ranked from `start` up to `stop`, in table order. Views are encoded bit for bit as by
+    `encode_view`, but batching may round the logits differently from a single forward pass, so
+    actions whose logits tie to within rounding may differ from the agent's.
+    """
+    hands: npt.NDArray[np.int64] = ranked_hands(PHASE_HAND_SIZES[phase])[start:stop]
+    count: int = len(hands)
+    device: torch.device = net.device
+    with torch.no_grad():
+        hand_tensor: torch.Tensor = torch.zeros((count, DECK_SIZE), device=device)
+        hand_tensor.scatter_(1, torch.from_numpy(hands).to(device), 1)
+        views: torch.Tensor = discard_templates(phase, device).expand(count, -1, -1, -1).clone()
+        views[:, :, :, :DISCARD_OFFSET] = torch.cat(
+            (hand_tensor, hand_tensor @ hand_feature_matrix(device=device)), dim=1
+        )[:, None, None, :]
+        logits: torch.Tensor = net.head(phase)(net.backbone(views.view(-1, ViewModule.INPUT_DIM)))
+        if phase == Phase.STOP:
+            # Stopping is masked out where the viewer cannot stop the bus
+            can_stop: torch.Tensor = torch.from_numpy(evaluate_hands(hands).can_stop).to(device)
+            allowed: torch.Tensor = torch.zeros(
+                (count, DISCARD_CHOICES, BUS_STOPPED_CHOICES), dtype=torch.bool, device=device
+            )
+            allowed[:, :, 0] = can_stop[:, None]
+            logits[:, 0] = logits[:, 0].masked_fill(~allowed.view(-1), float("-inf"))
+        actions: torch.Tensor = logits.argmax(dim=1)
+    return actions.to(torch.uint8).cpu().numpy()
+
+
+def distill(net: ViewModule, path: str | Path, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+    """Evaluate a network over every input of a policy table and write the table to `path`, for
+    `TablePolicyAgent`. That is some 33 million views, which at the default network size takes
+    a couple of minutes on one CPU core.
+    """
+    net.eval()
+    actions: npt.NDArray[np.uint8] = np.empty(TABLE_ENTRY_COUNT, dtype=np.uint8)
+    for phase in Phase:
+        start_time: float = time.perf_counter()
+        offset: int = PHASE_ENTRY_OFFSETS[phase]
+        hand_count: int = PHASE_ENTRY_COUNTS[phase] // HAND_ENTRY_COUNT
+        for start in range(0, hand_count, chunk_size):
+            chunk: npt.NDArray[np.uint8] = phase_actions(net, phase, start, start + chunk_size)
+            begin: int = offset + start * HAND_ENTRY_COUNT
+            actions[begin : begin + len(chunk)] = chunk
+        log.info(
+            f"Distilled {PHASE_ENTRY_COUNTS[phase]:,} {phase.name} actions "
+            f"in {time.perf_counter() - start_time:.1f}s"
+        )
+    write_table(path, actions)
@@ -1,10 +1,30 @@
-from collections.abc import Callable
 import logging
+import time
+from collections.abc import Callable, Sequence
 from logging import Logger
 
-from stop_the_bus.Agent import Agent, Observer
+from stop_the_bus.Agent import (
+    Agent,
+    BatchObserver,
+    DiscardEvent,
+    DrawEvent,
+    Event,
+    Observer,
+    RoundStartEvent,
+    StopTheBusEvent,
+)
 from stop_the_bus.Card import Card
+from stop_the_bus.Deck import Rng
 from stop_the_bus.Game import Game, Round, View
+from stop_the_bus.Latency import (
+    GAME_AGENT,
+    PHASE_DEAL,
+    PHASE_END_ROUND,
+    PHASE_OBSERVE,
+    LatencyRecorder,
+    TimedAgent,
+    timed,
+)
 
 log: Logger = logging.getLogger(__name__)
 
@@ -12,97 +32,203 @@ log: Logger = logging.getLogger(__name__)
 DEFAULT_MAX_TURN_COUNT: int = 100
 
 
+# An observer callback, timed into `latencies` if there is a recorder
+def subscribe[**P](
+    callback: Callable[P, None], agent_id: int, latencies: LatencyRecorder | None
+) -> Callable[P, None]:
+    if latencies is None:
+        return callback
+    return timed(callback, latencies.histogram(agent_id, PHASE_OBSERVE))
+
+
+class Dispatcher:
+    """Delivers game events to the agents that observe them. Subscriptions are resolved once, to
+    a list of bound methods per event, so that an event costs one call per subscriber. Agents
+    that are `BatchObserver`s get each turn's events in one call when the turn ends, before
+    the acting agent's `on_turn_end`. With a latency recorder, every callback is timed.
+    """
+
+    __slots__ = (
+        "turn_starts",
+        "turn_ends",
+        "round_starts",
+        "draws",
+        "discards",
+        "stops",
+        "batches",
+        "pending",
+    )
+
+    def __init__(self, agents: Sequence[object], latencies: LatencyRecorder | None = None) -> None:
+        # Indexed by player, None for players that do not observe
+        self.turn_starts: list[Callable[[View], None] | None] = [None] * len(agents)
+        self.turn_ends: list[Callable[[View], None] | None] = [None] * len(agents)
+        self.round_starts: list[Callable[[], None]] = []
+        self.draws: list[tuple[int, Callable[[int, int, Card, bool], None]]] = []
+        self.discards: list[tuple[int, Callable[[int, int, Card], None]]] = []
+        self.stops: list[tuple[int, Callable[[int, int], None]]] = []
+        self.batches: list[tuple[int, Callable[[int, Sequence[Event]], None]]] = []
+        self.pending: list[Event] = []
+
+        for agent_id, agent in enumerate(agents):
+            if isinstance(agent, BatchObserver):
+                self.batches.append((agent_id, subscribe(agent.on_events, agent_id, latencies)))
+            elif isinstance(agent, Observer):
+                self.round_starts.append(subscribe(agent.on_round_start, agent_id, latencies))
+                self.draws.append((agent_id, subscribe(agent.on_draw, agent_id, latencies)))
+                self.discards.append((agent_id, subscribe(agent.on_discard, agent_id, latencies)))
+                self.stops.append((agent_id, subscribe(agent.on_stop_the_bus, agent_id, latencies)))
+            else:
+                continue
+            self.turn_starts[agent_id] = subscribe(agent.on_turn_start, agent_id, latencies)
+            self.turn_ends[agent_id] = subscribe(agent.on_turn_end, agent_id, latencies)
+
+    def round_start(self) -> None:
+        for on_round_start in self.round_starts:
+            on_round_start()
+        if self.batches:
+            self.pending.append(RoundStartEvent())
+
+    def turn_start(self, actor: int, view: View) -> None:
+        on_turn_start: Callable[[View], None] | None = self.turn_starts[actor]
+        if on_turn_start is not None:
+            on_turn_start(view)
+
+    def draw(self, actor: int, card: Card, from_deck: bool) -> None:
+        for agent_id, on_draw in self.draws:
+            on_draw(agent_id, actor, card, from_deck)
+        if self.batches:
+            self.pending.append(DrawEvent(actor, card, from_deck))
+
+    def discard(self, actor: int, card: Card) -> None:
+        for agent_id, on_discard in self.discards:
+            on_discard(agent_id, actor, card)
+        if self.batches:
+            self.pending.append(DiscardEvent(actor, card))
+
+    def stop_the_bus(self, actor: int) -> None:
+        for agent_id, on_stop_the_bus in self.stops:
+            on_stop_the_bus(agent_id, actor)
+        if self.batches:
+            self.pending.append(StopTheBusEvent(actor))
+
+    def turn_end(self, actor: int, view: View) -> None:
+        if self.pending:
+            events: list[Event] = self.pending
+            self.pending = []
+            for agent_id, on_events in self.batches:
+                on_events(agent_id, events)
+        on_turn_end: Callable[[View], None] | None = self.turn_ends[actor]
+        if on_turn_end is not None:
+            on_turn_end(view)
+
+
 class Driver:
-    __slots__ = ("agents", "game", "max_turn_count")
+    """Plays a game between agents, one per player.
+
+    Given a `latencies` recorder, the driver times every decision, observer callback, deal and
+    end of round into it, by agent and phase. Without one nothing is timed, as the agents and
+    callbacks are called directly.
+    """
+
+    __slots__ = (
+        "agents",
+        "deciders",
+        "game",
+        "max_turn_count",
+        "dispatcher",
+        "round_count",
+        "turn_count",
+        "eliminations",
+        "histories",
+        "latencies",
+    )
 
     def __init__(
-        self, agents: list[Agent], lives: int = 5, max_turn_count: int = DEFAULT_MAX_TURN_COUNT
+        self,
+        agents: list[Agent],
+        lives: int = 5,
+        max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+        rng: Rng | None = None,
+        keep_histories: bool = False,
+        latencies: LatencyRecorder | None = None,
     ) -> None:
         self.agents: list[Agent] = agents
-        self.game: Game = Game(len(agents), lives)
+        # The agents, or wrappers timing their decisions
+        self.deciders: list[Agent] = (
+            agents
+            if latencies is None
+            else [TimedAgent(agent, latencies, agent_id) for agent_id, agent in enumerate(agents)]
+        )
+        self.game: Game = Game(len(agents), lives, rng)
         self.max_turn_count: int = max_turn_count
-
-    def _broadcast(
-        self,
-        round: Round,
-        action: Callable[
-            [
-                Observer,
-                int,
-                int,
-            ],
-            None,
-        ],
-    ) -> None:
-        for agent_id, agent in enumerate(self.agents):
-            if isinstance(agent, Observer):
-                action(agent, agent_id, round.current_player)
+        self.dispatcher: Dispatcher = Dispatcher(agents, latencies)
+        self.round_count: int = 0
+        self.turn_count: int = 0
+        # Players in the order they ran out of lives, in player order within a round
+        self.eliminations: list[int] = []
+        # The move history of every round played, if kept
+        self.histories: list[list[int]] | None = [] if keep_histories else None
+        self.latencies: LatencyRecorder | None = latencies
 
     def drive(self) -> int:
         while self.game.live_player_count > 1:
             log.debug("Starting new round")
             log.debug(f"Dealer is player {self.game.dealer}")
+            start: int = time.perf_counter_ns()
             round: Round = self.game.start_round()
+            if self.latencies is not None:
+                self.latencies.record(GAME_AGENT, PHASE_DEAL, time.perf_counter_ns() - start)
+            self.round_count += 1
+            if self.histories is not None:
+                self.histories.append(round.history)
 
-            self._broadcast(round, lambda observer, agent_id, actor_id: observer.on_round_start())
+            self.dispatcher.round_start()
 
             self._drive_first_turn(round)
             while round.has_turns_remaining:
                 if round.turn > self.max_turn_count:
                     log.error("Maximum turn limit reached, aborting game")
+                    self.turn_count += round.turn
                     return -1
                 self._drive_turn(round)
+            self.turn_count += round.turn
+            start = time.perf_counter_ns()
             round.end_round()
+            if self.latencies is not None:
+                self.latencies.record(GAME_AGENT, PHASE_END_ROUND, time.perf_counter_ns() - start)
+            self.eliminations.extend(p for p in round.players if self.game.lives[p] <= 0)
             self.game.rotate_dealer()
         [winner] = self.game.live_players
         log.debug(f"Player {winner} wins the game!")
         return winner
 
     def _drive_discard(self, round: Round, view: View, agent: Agent) -> None:
-        card: Card = agent.discard(view)
-
-        self._broadcast(
-            round,
-            lambda observer, agent_id, actor_id: observer.on_discard(
-                agent=agent_id, actor=actor_id, card=card
-            ),
-        )
+        actor: int = round.current_player
+        self.dispatcher.discard(actor, agent.discard(view))
 
         if agent.stop_the_bus(view):
-            self._broadcast(
-                round,
-                lambda observer, agent_id, actor_id: observer.on_stop_the_bus(
-                    agent=agent_id, actor=actor_id
-                ),
-            )
+            self.dispatcher.stop_the_bus(actor)
 
-        if isinstance(agent, Observer):
-            agent.on_turn_end(view)
+        self.dispatcher.turn_end(actor, view)
 
         round.advance_turn()
 
     def _drive_first_turn(self, round: Round) -> None:
-        agent: Agent = self.agents[round.current_player]
+        agent: Agent = self.deciders[round.current_player]
         view: View = round.current_view()
 
-        if isinstance(agent, Observer):
-            agent.on_turn_start(view)
+        self.dispatcher.turn_start(round.current_player, view)
 
         self._drive_discard(round, view, agent)
 
     def _drive_turn(self, round: Round) -> None:
-        agent: Agent = self.agents[round.current_player]
+        agent: Agent = self.deciders[round.current_player]
         view: View = round.current_view()
 
-        if isinstance(agent, Observer):
-            agent.on_turn_start(view)
+        self.dispatcher.turn_start(round.current_player, view)
 
         card, from_deck = agent.draw(view)
-        self._broadcast(
-            round,
-            lambda observer, agent_id, actor_id: observer.on_draw(
-                agent=agent_id, actor=actor_id, card=card, from_deck=from_deck
-            ),
-        )
+        self.dispatcher.draw(round.current_player, card, from_deck)
 
         self._drive_discard(round, view, agent)
@@ -1,12 +1,20 @@
-from enum import IntEnum, auto
+from collections.abc import Sequence
+from functools import cache
 
 import torch
 from torch import nn
 
-from stop_the_bus.Card import Card, Rank, Suit
-from stop_the_bus.Deck import DECK_SIZE, standard_deck
-from stop_the_bus.Game import View
-from stop_the_bus.Hand import MAX_HAND_SIZE, Hand
+from stop_the_bus.Card import (
+    CARD_RANK_INDICES,
+    CARD_SCORES,
+    CARD_SUIT_INDICES,
+    DECK_SIZE,
+    Card,
+    Rank,
+    Suit,
+)
+from stop_the_bus.Game import Phase, View
+from stop_the_bus.Hand import MAX_HAND_SIZE, Hand, empty_hand
 
 DEFAULT_DEVICE: torch.device = torch.device("cpu")
 
@@ -22,7 +30,7 @@ def encode_hand(
 
 
 def decode_hand(tensor: torch.Tensor) -> Hand:
-    hand: Hand = []
+    hand: Hand = empty_hand()
     nonzero_indices: list[int] = tensor.nonzero(as_tuple=False).view(-1).tolist()  # type: ignore
 
     for i in nonzero_indices:
@@ -35,10 +43,10 @@ def encode_card(
     card: Card, dtype: torch.dtype = torch.float32, device: torch.device = DEFAULT_DEVICE
 ) -> torch.Tensor:
     rank_one_hot: torch.Tensor = torch.zeros(len(Rank), dtype=torch.float32, device=device)
-    rank_one_hot[card.rank.index] = 1
+    rank_one_hot[CARD_RANK_INDICES[card.index]] = 1
 
     suit_one_hot: torch.Tensor = torch.zeros(4, dtype=torch.float32, device=device)
-    suit_one_hot[card.suit.index] = 1
+    suit_one_hot[CARD_SUIT_INDICES[card.index]] = 1
 
     return torch.cat((rank_one_hot, suit_one_hot))
 
@@ -47,6 +55,12 @@ MAX_RANK_SUM: int = sum(
     r.score for r in sorted(Rank, key=lambda r: r.score, reverse=True)[:MAX_HAND_SIZE]
 )
 
+# Where each part of an encoded view starts: the hand, its rank counts, suit counts and suit rank
+# sums, the discard's rank then suit, and the phase flags then the bus-stopped flag
+HAND_FEATURE_OFFSET: int = DECK_SIZE
+DISCARD_OFFSET: int = HAND_FEATURE_OFFSET + Rank.size() + 2 * Suit.size()
+FLAG_OFFSET: int = DISCARD_OFFSET + Rank.size() + Suit.size()
+
 
 def decode_card(tensor: torch.Tensor) -> Card:
     rank_index: int = int(tensor[: Rank.size()].argmax().item())
@@ -55,9 +69,12 @@ def decode_card(tensor: torch.Tensor) -> Card:
     rank: Rank = Rank.from_index(rank_index)
     suit: Suit = Suit.from_index(suit_index)
 
-    return Card(suit, rank)
+    return Card.of(suit, rank)
 
 
+# Cached, since building the matrices costs far more than encoding a view with them. Callers
+# share the returned tensors, so must not modify them
+@cache
 def feature_matrices(
     dtype: torch.dtype = torch.float32, device: torch.device = DEFAULT_DEVICE
 ) -> tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
@@ -71,10 +88,10 @@ def feature_matrices(
         (DECK_SIZE, Suit.size()), dtype=dtype, device=device
     )
 
-    for card in standard_deck():
-        hand_rank_count_matrix[card.index, card.rank.index] = 1
-        hand_suit_count_matrix[card.index, card.suit.index] = 1
-        hand_rank_sum_matrix[card.index, card.suit.index] = float(card.score)
+    for index in range(DECK_SIZE):
+        hand_rank_count_matrix[index, CARD_RANK_INDICES[index]] = 1
+        hand_suit_count_matrix[index, CARD_SUIT_INDICES[index]] = 1
+        hand_rank_sum_matrix[index, CARD_SUIT_INDICES[index]] = float(CARD_SCORES[index])
 
     return (
         hand_rank_count_matrix / MAX_HAND_SIZE,
@@ -83,12 +100,6 @@ def feature_matrices(
     )
 
 
-class Phase(IntEnum):
-    DRAW = auto()
-    DISCARD = auto()
-    STOP = auto()
-
-
 def encode_view(
     view: View,
     phase: Phase,
@@ -133,6 +144,64 @@ def encode_view(
     )
 
 
+# The three hand feature matrices side by side, to compute every hand feature in one product
+@cache
+def hand_feature_matrix(
+    dtype: torch.dtype = torch.float32, device: torch.device = DEFAULT_DEVICE
+) -> torch.Tensor:
+    return torch.cat(feature_matrices(dtype=dtype, device=device), dim=1)
+
+
+def encode_views(
+    views: Sequence[View],
+    phases: Sequence[Phase],
+    dtype: torch.dtype = torch.float32,
+    device: torch.device = DEFAULT_DEVICE,
+    out: torch.Tensor | None = None,
+) -> torch.Tensor:
+    """Encode views in a batch, row i being `encode_view(views[i], phases[i])` bit for bit.
+    With `out`, a buffer of at least `len(views)` rows that is reused across calls, the rows
+    are written into its first `len(views)` rows and that slice is returned.
+    """
+    count: int = len(views)
+    batch: torch.Tensor = (
+        torch.empty((count, ViewModule.INPUT_DIM), dtype=dtype, device=device)
+        if out is None
+        else out[:count]
+    )
+    batch.zero_()
+
+    # Every one-hot entry of the batch, set in a single indexed write
+    rows: list[int] = []
+    columns: list[int] = []
+    for row, (view, phase) in enumerate(zip(views, phases, strict=True)):
+        for card in view.hand:
+            rows.append(row)
+            columns.append(card.index)
+        if view.discard_pile:
+            index: int = view.discard_pile[-1].index
+            rows += (row, row)
+            columns += (
+                DISCARD_OFFSET + CARD_RANK_INDICES[index],
+                DISCARD_OFFSET + ViewModule.DISCARD_RANK_DIM + CARD_SUIT_INDICES[index],
+            )
+        rows.append(row)
+        columns.append(FLAG_OFFSET + phase - Phase.DRAW)
+        if view.bus_is_stopped:
+            rows.append(row)
+            columns.append(FLAG_OFFSET + len(Phase))
+    batch[
+        torch.tensor(rows, dtype=torch.long, device=device),
+        torch.tensor(columns, dtype=torch.long, device=device),
+    ] = 1
+
+    batch[:, HAND_FEATURE_OFFSET:DISCARD_OFFSET] = batch[
+        :, :HAND_FEATURE_OFFSET
+    ] @ hand_feature_matrix(dtype=dtype, device=device)
+
+    return batch
+
+
 class ViewModule(nn.Module):
     # 52-dim multi-hot encoding of viewer's current hand
     HAND_DIM: int = DECK_SIZE
@@ -199,6 +268,15 @@ class ViewModule(nn.Module):
             nn.init.kaiming_uniform_(module.weight, nonlinearity="relu")
             nn.init.zeros_(module.bias)
 
+    def head(self, phase: Phase) -> nn.Linear:
+        match phase:
+            case Phase.DRAW:
+                return self.draw_head
+            case Phase.DISCARD:
+                return self.discard_head
+            case Phase.STOP:
+                return self.stop_head
+
     def forward(self, view: View, phase: Phase) -> torch.Tensor:
         view_tensor: torch.Tensor = encode_view(view, phase, device=self.device)
 
@@ -207,10 +285,4 @@ class ViewModule(nn.Module):
 
         x = self.backbone(view_tensor)
 
-        match phase:
-            case Phase.DRAW:
-                return self.draw_head(x)
-            case Phase.DISCARD:
-                return self.discard_head(x)
-            case Phase.STOP:
-                return self.stop_head(x)
+        return self.head(phase)(x)  # type: ignore[no-any-return]
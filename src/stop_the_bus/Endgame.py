@@ -0,0 +1,239 @@
+from collections.abc import Iterator
+from functools import cache
+
+import numpy as np
+
+from stop_the_bus.Canonicalization import (
+    SuitPermutation,
+    canonical_permutation,
+    card_mask,
+    relabel_card,
+    relabel_mask,
+)
+from stop_the_bus.Card import DECK_SIZE, NO_CARD, Rank
+from stop_the_bus.Determinization import Determinizations, sample_determinizations
+from stop_the_bus.Game import OTHER_PRILE_PENALTY, PRILE_OF_THREES_PENALTY, Round, View
+from stop_the_bus.Hand import (
+    HAND_TABLE,
+    PRILE_VALUE_OFFSET,
+    VALUE_MASK,
+    hand_mask,
+    prile_value,
+)
+
+DEFAULT_MAX_REMAINING_TURNS: int = 2
+DEFAULT_SAMPLES: int = 16
+DEFAULT_MAX_ENTRIES: int = 1_000_000
+DEFAULT_CANONICAL: bool = False
+
+ALL_CARDS_MASK: int = (1 << DECK_SIZE) - 1
+PRILE_OF_THREES_VALUE: int = prile_value(Rank.Three) + PRILE_VALUE_OFFSET
+
+# An endgame position, with every hand known and the deck as an unordered set of cards:
+#   (seat to move, turns remaining, hand mask of each seat, discard pile top, deck mask)
+type Position = tuple[int, int, tuple[int, ...], int, int]
+# The expected lives each seat loses from a position
+type Outcome = tuple[float, ...]
+
+
+# The indices of the cards in a mask, lowest first
+# e.g. 0b10110 -> 1, 2, 4
+def mask_cards(mask: int) -> Iterator[int]:
+    while mask:
+        low: int = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
+
+
+# The lives each seat loses when the round ends with hands of the given values, as in
+# `Round.penalties`. Only the values matter, since a hand is a prile exactly when its value is at
+# least PRILE_VALUE_OFFSET
+@cache
+def value_penalties(values: tuple[int, ...]) -> Outcome:
+    high_score: int = max(values)
+    winners: list[int] = [seat for seat, value in enumerate(values) if value == high_score]
+    if len(winners) == 1 and high_score >= PRILE_VALUE_OFFSET:
+        penalty: float = (
+            PRILE_OF_THREES_PENALTY if high_score == PRILE_OF_THREES_VALUE else OTHER_PRILE_PENALTY
+        )
+        return tuple(0.0 if seat == winners[0] else penalty for seat in range(len(values)))
+    low_score: int = min(values)
+    return tuple(1.0 if value == low_score else 0.0 for value in values)
+
+
+def mask_penalties(hands: tuple[int, ...]) -> Outcome:
+    return value_penalties(tuple(HAND_TABLE[hand] & VALUE_MASK for hand in hands))
+
+
+# The position of a round whose hands are all known, such as a determinization
+def round_position(round: Round) -> Position:
+    assert round.turns_remaining is not None
+    return (
+        round.current_index,
+        round.turns_remaining,
+        tuple(hand_mask(hand) for hand in round.hands),
+        round.discard_pile[-1].index if round.discard_pile else NO_CARD,
+        sum(1 << card.index for card in round.deck),
+    )
+
+
+# The relabelling of a position's suits shared by all its relabellings. Hand values do not depend
+# on suits, so neither do outcomes
+def canonical_position(position: Position) -> Position:
+    seat, remaining, hands, top, deck = position
+    permutation: SuitPermutation = canonical_permutation((*hands, card_mask(top), deck))
+    return (
+        seat,
+        remaining,
+        tuple(relabel_mask(hand, permutation) for hand in hands),
+        relabel_card(top, permutation),
+        relabel_mask(deck, permutation),
+    )
+
+
+class EndgameSolver:
+    """Exact expectimax for the last turns of a round, once the bus has been stopped. Each
+    remaining player in turn chooses the draw and discard that minimise their own expected lives
+    lost, with a chance node over the deck for every draw from it. Hidden hands are handled by
+    solving sampled determinizations of a view and averaging.
+
+    Solved positions are kept in a transposition table that persists across rounds and games,
+    so repeated positions are free. With `canonical`, positions are stored by their canonical
+    suit relabelling, so positions that differ only in suits share an entry. The search is
+    exponential in the turns remaining, so views with more than `max_remaining_turns` turns to
+    go are not solved.
+    """
+
+    __slots__ = ("max_remaining_turns", "max_entries", "canonical", "table", "hits", "misses")
+
+    def __init__(
+        self,
+        max_remaining_turns: int = DEFAULT_MAX_REMAINING_TURNS,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        canonical: bool = DEFAULT_CANONICAL,
+    ) -> None:
+        self.max_remaining_turns: int = max_remaining_turns
+        self.max_entries: int = max_entries
+        self.canonical: bool = canonical
+        self.table: dict[Position, Outcome] = {}
+        self.hits: int = 0
+        self.misses: int = 0
+
+    def can_solve(self, view: View) -> bool:
+        remaining: int | None = view.round.turns_remaining
+        return (
+            view.is_viewer_turn and remaining is not None and remaining <= self.max_remaining_turns
+        )
+
+    def outcome(self, position: Position) -> Outcome:
+        """The expected lives each seat loses from a position where the mover has yet to draw."""
+        key: Position = canonical_position(position) if self.canonical else position
+        outcome: Outcome | None = self.table.get(key)
+        if outcome is not None:
+            self.hits += 1
+            return outcome
+        self.misses += 1
+
+        # Ties between choices are broken by card order, which relabelling changes, so the
+        # canonical position is the one searched, for outcomes not to depend on search order
+        seat, remaining, hands, top, deck = key
+        if remaining == 0:
+            outcome = mask_penalties(hands)
+        else:
+            from_deck: Outcome = self._draw_from_deck_outcome(key)
+            from_pile: Outcome = self._discard_outcome(key, hands[seat] | 1 << top, deck)
+            outcome = from_deck if from_deck[seat] <= from_pile[seat] else from_pile
+
+        if len(self.table) >= self.max_entries:
+            self.table.clear()
+        self.table[key] = outcome
+        return outcome
+
+    def _draw_from_deck_outcome(self, position: Position) -> Outcome:
+        seat, _, hands, top, deck = position
+        if deck == 0:
+            # The deck is reshuffled from the discard pile, all but its top card
+            held: int = 0
+            for hand in hands:
+                held |= hand
+            deck = ALL_CARDS_MASK & ~held & ~(1 << top)
+
+        cards: list[int] = list(mask_cards(deck))
+        total: list[float] = [0.0] * len(hands)
+        for card in cards:
+            outcome: Outcome = self._discard_outcome(
+                position, hands[seat] | 1 << card, deck ^ 1 << card
+            )
+            for i, lost in enumerate(outcome):
+                total[i] += lost
+        return tuple(lost / len(cards) for lost in total)
+
+    def discard_outcomes(self, position: Position, hand: int, deck: int) -> dict[int, Outcome]:
+        """The outcome of each discard by the mover from their drawn-up `hand`, keyed by card."""
+        seat, remaining, hands, _, _ = position
+        outcomes: dict[int, Outcome] = {}
+        if remaining == 1:
+            # The last discard of the round goes straight to scoring
+            values: list[int] = [HAND_TABLE[other] & VALUE_MASK for other in hands]
+            for card in mask_cards(hand):
+                values[seat] = HAND_TABLE[hand ^ 1 << card] & VALUE_MASK
+                outcomes[card] = value_penalties(tuple(values))
+            return outcomes
+
+        next_seat: int = (seat + 1) % len(hands)
+        for card in mask_cards(hand):
+            next_hands: tuple[int, ...] = hands[:seat] + (hand ^ 1 << card,) + hands[seat + 1 :]
+            outcomes[card] = self.outcome((next_seat, remaining - 1, next_hands, card, deck))
+        return outcomes
+
+    def _discard_outcome(self, position: Position, hand: int, deck: int) -> Outcome:
+        seat: int = position[0]
+        return min(self.discard_outcomes(position, hand, deck).values(), key=lambda o: o[seat])
+
+    def _positions(self, view: View, samples: int, rng: np.random.Generator) -> list[Position]:
+        round: Round = view.round
+        assert round.turns_remaining is not None
+        determinizations: Determinizations = sample_determinizations(view, samples, rng)
+        top: int = round.discard_pile[-1].index if round.discard_pile else NO_CARD
+        positions: list[Position] = []
+        for sample in range(samples):
+            hands: tuple[int, ...] = tuple(
+                sum(1 << card for card in row if card != NO_CARD)
+                for row in determinizations.hands[sample].tolist()
+            )
+            deck: int = sum(1 << card for card in determinizations.decks[sample].tolist())
+            positions.append((view.player_index, round.turns_remaining, hands, top, deck))
+        return positions
+
+    def draw_values(
+        self, view: View, samples: int = DEFAULT_SAMPLES, rng: np.random.Generator | None = None
+    ) -> tuple[float, float]:
+        """The viewer's expected lives lost from drawing from the deck and from the discard pile,
+        averaged over `samples` determinizations of the view.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        seat: int = view.player_index
+        from_deck: float = 0.0
+        from_pile: float = 0.0
+        positions: list[Position] = self._positions(view, samples, rng)
+        for position in positions:
+            _, _, hands, top, deck = position
+            from_deck += self._draw_from_deck_outcome(position)[seat]
+            from_pile += self._discard_outcome(position, hands[seat] | 1 << top, deck)[seat]
+        return from_deck / len(positions), from_pile / len(positions)
+
+    def discard_values(
+        self, view: View, samples: int = DEFAULT_SAMPLES, rng: np.random.Generator | None = None
+    ) -> list[float]:
+        """The viewer's expected lives lost from discarding each slot of their drawn-up hand,
+        averaged over `samples` determinizations of the view.
+        """
+        rng = np.random.default_rng() if rng is None else rng
+        seat: int = view.player_index
+        hand: int = hand_mask(view.hand)
+        totals: dict[int, float] = dict.fromkeys(mask_cards(hand), 0.0)
+        positions: list[Position] = self._positions(view, samples, rng)
+        for position in positions:
+            for card, outcome in self.discard_outcomes(position, hand, position[4]).items():
+                totals[card] += outcome[seat]
+        return [totals[card.index] / len(positions) for card in view.hand]
@@ -0,0 +1,116 @@
+import numpy as np
+import numpy.typing as npt
+
+from stop_the_bus.Card import NO_CARD
+from stop_the_bus.Game import Phase, Round
+from stop_the_bus.Hand import MAX_HAND_SIZE
+
+# Every decision the Driver asks an agent for is one of a fixed set of actions:
+#   0       draw from the deck
+#   1       draw from the discard pile
+#   2-5     discard the card in hand slot 0-3
+#   6       stop the bus
+#   7       carry on without stopping the bus
+ACTION_DRAW_FROM_DECK: int = 0
+ACTION_DRAW_FROM_DISCARD: int = 1
+ACTION_DISCARD: int = 2
+ACTION_STOP_THE_BUS: int = ACTION_DISCARD + MAX_HAND_SIZE
+ACTION_CONTINUE: int = ACTION_STOP_THE_BUS + 1
+ACTION_COUNT: int = ACTION_CONTINUE + 1
+
+# An observation is the acting player's view of the round as small ints:
+#   0-3     card indices in hand, -1 for empty slots
+#   4       card index on top of the discard pile, or -1
+#   5       phase
+#   6       whether the bus has been stopped
+#   7       cards remaining in the deck
+OBSERVATION_DISCARD_TOP: int = MAX_HAND_SIZE
+OBSERVATION_PHASE: int = OBSERVATION_DISCARD_TOP + 1
+OBSERVATION_BUS_IS_STOPPED: int = OBSERVATION_PHASE + 1
+OBSERVATION_DECK_SIZE: int = OBSERVATION_BUS_IS_STOPPED + 1
+OBSERVATION_SIZE: int = OBSERVATION_DECK_SIZE + 1
+
+type ActionMask = npt.NDArray[np.bool_]
+type Observation = npt.NDArray[np.int8]
+
+
+class RoundEnv:
+    """Plays a round one action at a time, in the order the Driver asks agents for decisions:
+    draw (from the second turn on), discard, then stop the bus or carry on. The stop decision
+    is skipped when the bus cannot be stopped, since carrying on is the only legal action.
+    """
+
+    __slots__ = ("round", "phase")
+
+    def __init__(self, round: Round) -> None:
+        self.round: Round = round
+        self.phase: Phase = Phase.DRAW if round.turn > 0 else Phase.DISCARD
+
+    @property
+    def done(self) -> bool:
+        return not self.round.has_turns_remaining
+
+    @property
+    def current_player(self) -> int:
+        return self.round.current_player
+
+    def legal_actions(self) -> ActionMask:
+        mask: ActionMask = np.zeros(ACTION_COUNT, dtype=np.bool_)
+        if self.done:
+            return mask
+        match self.phase:
+            case Phase.DRAW:
+                mask[ACTION_DRAW_FROM_DECK] = True
+                mask[ACTION_DRAW_FROM_DISCARD] = len(self.round.discard_pile) > 0
+            case Phase.DISCARD:
+                mask[ACTION_DISCARD : ACTION_DISCARD + len(self.round.current_hand)] = True
+            case Phase.STOP:
+                mask[ACTION_STOP_THE_BUS] = True
+                mask[ACTION_CONTINUE] = True
+        return mask
+
+    def observe(self) -> Observation:
+        round: Round = self.round
+        observation: Observation = np.full(OBSERVATION_SIZE, NO_CARD, dtype=np.int8)
+        for slot, card in enumerate(round.current_hand):
+            observation[slot] = card.index
+        if round.discard_pile:
+            observation[OBSERVATION_DISCARD_TOP] = round.discard_pile[-1].index
+        observation[OBSERVATION_PHASE] = self.phase
+        observation[OBSERVATION_BUS_IS_STOPPED] = round.bus_is_stopped
+        observation[OBSERVATION_DECK_SIZE] = len(round.deck)
+        return observation
+
+    def step(self, action: int) -> tuple[Observation, list[int], bool]:
+        """Apply `action` for the current player. Returns the next player's observation, the
+        lives each player index loses (all zero until the round ends) and whether it has ended.
+        """
+        if not 0 <= action < ACTION_COUNT or not self.legal_actions()[action]:
+            raise ValueError(f"Illegal action {action} in phase {self.phase.name}")
+
+        round: Round = self.round
+        match self.phase:
+            case Phase.DRAW:
+                if action == ACTION_DRAW_FROM_DECK:
+                    round.draw_from_deck()
+                else:
+                    round.draw_from_discard()
+                self.phase = Phase.DISCARD
+            case Phase.DISCARD:
+                round.discard(action - ACTION_DISCARD)
+                if round.can_stop_the_bus():
+                    self.phase = Phase.STOP
+                else:
+                    self._end_turn()
+            case Phase.STOP:
+                if action == ACTION_STOP_THE_BUS:
+                    round.stop_the_bus()
+                self._end_turn()
+
+        if self.done:
+            return self.observe(), round.penalties(), True
+        return self.observe(), [0] * round.player_count, False
+
+    def _end_turn(self) -> None:
+        self.round.advance_turn()
+        self.phase = Phase.DRAW
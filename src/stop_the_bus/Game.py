@@ -1,43 +1,66 @@
 from __future__ import annotations
 
 import logging
-import random
-from collections import defaultdict, deque
+from collections import deque
 from collections.abc import Generator
 from dataclasses import dataclass
+from enum import IntEnum, auto
 
-from stop_the_bus.Card import Card, Rank
-from stop_the_bus.Deck import Deck, deal, empty_deck, shuffled_deck
+from stop_the_bus.Card import CARDS, Card, Rank
+from stop_the_bus.Deck import Deck, Rng, deal, empty_deck, shuffled_deck
 from stop_the_bus.Hand import (
     MIN_HAND_SIZE,
     Hand,
+    can_stop_the_bus,
     empty_hand,
-    flush_value,
     hand_value,
-    is_flush,
     is_prile,
 )
 
 log: logging.Logger = logging.getLogger(__name__)
 
 
-STOP_THE_BUS_HAND_VALUE_THRESHOLD: int = 21
 DEFAULT_INITIAL_LIVES: int = 5
 PRILE_OF_THREES_PENALTY: int = 2
 OTHER_PRILE_PENALTY: int = 1
 
+# Each entry of a round's move history packs one move into a single int:
+#   bits 0-2    move kind
+#   bits 3-5    draw from deck: whether the deck was reshuffled first
+#               discard: the hand slot the card was taken from
+#   bits 3+     stop the bus: the previous turns remaining plus one, or zero if there were none,
+#               which for many players does not fit in 3 bits
+#   bits 6+     discard: the card's position in the certain holds plus one, or zero if absent
+MOVE_DRAW_FROM_DECK: int = 0
+MOVE_DRAW_FROM_DISCARD: int = 1
+MOVE_DISCARD: int = 2
+MOVE_STOP_THE_BUS: int = 3
+MOVE_ADVANCE_TURN: int = 4
+MOVE_KIND_MASK: int = 0b111
+MOVE_FIELD_BITS: int = 3
+
+
+class Phase(IntEnum):
+    DRAW = auto()
+    DISCARD = auto()
+    STOP = auto()
+
 
 class Game:
     __slots__ = (
         "player_count",
         "lives",
         "dealer",
+        "rng",
     )
 
-    def __init__(self, player_count: int, lives: int = DEFAULT_INITIAL_LIVES) -> None:
+    def __init__(
+        self, player_count: int, lives: int = DEFAULT_INITIAL_LIVES, rng: Rng | None = None
+    ) -> None:
         self.player_count: int = player_count
         self.lives: list[int] = [lives] * player_count
         self.dealer: int = 0
+        self.rng: Rng | None = rng
 
     @property
     def live_players(self) -> Generator[int, None, None]:
@@ -55,7 +78,7 @@ class Game:
             return
         self.dealer = next(self.live_players)
 
-    def start_round(self) -> Round:
+    def start_round(self, rng: Rng | None = None) -> Round:
         log.debug(f"Dealing to players: {list(self.live_players)}")
         for i in range(self.player_count):
             if self.lives[i] > 0:
@@ -63,7 +86,7 @@ class Game:
                     f"Player {i} has {self.lives[i]} "
                     f"{'life' if self.lives[i] == 1 else 'lives'} remaining"
                 )
-        return Round(self, list(self.live_players))
+        return Round(self, list(self.live_players), self.rng if rng is None else rng)
 
 
 class Round:
@@ -76,17 +99,23 @@ class Round:
         "hands",
         "certain_holds",
         "turns_remaining",
+        "rng",
+        "history",
+        "reshuffles",
     )
 
-    def __init__(self, game: Game, players: list[int]) -> None:
+    def __init__(self, game: Game, players: list[int], rng: Rng | None = None) -> None:
         self.game: Game = game
-        self.deck: Deck = shuffled_deck()
+        self.rng: Rng | None = rng
+        self.deck: Deck = shuffled_deck(rng)
         self.discard_pile: Deck = empty_deck()
         self.players: list[int] = players
         self.turn: int = 0
         self.hands: list[Hand] = [empty_hand() for _ in players]
         self.certain_holds: list[Hand] = [empty_hand() for _ in players]
         self.turns_remaining: int | None = None
+        self.history: list[int] = []
+        self.reshuffles: list[bytes] = []
 
         for _ in range(MIN_HAND_SIZE):
             for hand in self.hands:
@@ -118,31 +147,89 @@ class Round:
     def has_turns_remaining(self) -> bool:
         return self.turns_remaining is None or self.turns_remaining > 0
 
+    def clone(self) -> Round:
+        """A copy of the round that can be played on independently. The game is shared, so
+        score a clone with `penalties` rather than `end_round`.
+        """
+        round: Round = Round.__new__(Round)
+        round.game = self.game
+        round.rng = self.rng
+        round.deck = self.deck.copy()
+        round.discard_pile = self.discard_pile.copy()
+        round.players = self.players
+        round.turn = self.turn
+        round.hands = [hand.copy() for hand in self.hands]
+        round.certain_holds = [hand.copy() for hand in self.certain_holds]
+        round.turns_remaining = self.turns_remaining
+        round.history = self.history.copy()
+        round.reshuffles = self.reshuffles.copy()
+        return round
+
+    def snapshot(self) -> RoundSnapshot:
+        return RoundSnapshot(
+            self.deck.indices,
+            self.discard_pile.indices,
+            tuple(hand.indices for hand in self.hands),
+            tuple(hand.indices for hand in self.certain_holds),
+            self.turn,
+            self.turns_remaining,
+            tuple(self.history),
+            tuple(self.reshuffles),
+        )
+
+    def restore(self, snapshot: RoundSnapshot) -> None:
+        """Return the round to the state it was in when `snapshot` was taken."""
+        self.deck.clear()
+        self.deck.extend_indices(snapshot.deck)
+        self.discard_pile.clear()
+        self.discard_pile.extend_indices(snapshot.discard_pile)
+        for hands, indices in (
+            (self.hands, snapshot.hands),
+            (self.certain_holds, snapshot.certain_holds),
+        ):
+            for hand, hand_indices in zip(hands, indices, strict=True):
+                hand.clear()
+                hand.extend(CARDS[index] for index in hand_indices)
+        self.turn = snapshot.turn
+        self.turns_remaining = snapshot.turns_remaining
+        self.history = list(snapshot.history)
+        self.reshuffles = list(snapshot.reshuffles)
+
     def current_view(self) -> View:
         return View(self, self.current_index)
 
     def discard(self, card_index: int) -> Card:
-        card: Card = self.current_hand.pop(card_index)
+        hand: Hand = self.current_hand
+        slot: int = card_index + len(hand) if card_index < 0 else card_index
+        card: Card = hand.pop(card_index)
         self.discard_pile.append(card)
-        if card in self.certain_holds[self.current_index]:
-            self.certain_holds[self.current_index].remove(card)
+        certain_holds: Hand = self.certain_holds[self.current_index]
+        hold_position: int = -1
+        if card in certain_holds:
+            hold_position = certain_holds.index(card)
+            certain_holds.pop(hold_position)
+        self.history.append(
+            MOVE_DISCARD | slot << MOVE_FIELD_BITS | (hold_position + 1) << (2 * MOVE_FIELD_BITS)
+        )
         log.debug(f"Player {self.current_player} discarded {card}")
         return card
 
     def draw_from_deck(self) -> Card:
-        if (len(self.deck)) == 0:
+        reshuffled: bool = len(self.deck) == 0
+        if reshuffled:
             log.warning("Deck is empty, reshuffling discard pile into deck")
+            self.reshuffles.append(self.discard_pile.indices)
             self.reshuffle(self.deck, self.discard_pile)
 
         card: Card = deal(self.deck, self.current_hand)
+        self.history.append(MOVE_DRAW_FROM_DECK | reshuffled << MOVE_FIELD_BITS)
         log.debug(f"Player {self.current_player} drew {card} from the deck")
         return card
 
     def reshuffle(self, deck: Deck, discard_pile: Deck) -> None:
         top_card: Card = discard_pile.pop()
-        cards: list[Card] = list(discard_pile)
-        random.shuffle(cards)
-        deck.extend(cards)
+        deck.extend(discard_pile)
+        deck.shuffle(self.rng)
         discard_pile.clear()
         discard_pile.append(top_card)
 
@@ -150,79 +237,104 @@ class Round:
         card: Card = self.discard_pile.pop()
         self.current_hand.append(card)
         self.certain_holds[self.current_index].append(card)
+        self.history.append(MOVE_DRAW_FROM_DISCARD)
         log.debug(f"Player {self.current_player} drew {card} from the discard pile")
         return card
 
     def stop_the_bus(self) -> bool:
+        previous: int = 0 if self.turns_remaining is None else self.turns_remaining + 1
+        self.history.append(MOVE_STOP_THE_BUS | previous << MOVE_FIELD_BITS)
         self.turns_remaining = self.player_count
         log.debug(f"Player {self.current_player} stopped the bus")
         return True
 
     def can_stop_the_bus(self) -> bool:
-        hand: Hand = self.current_hand
-        return not self.bus_is_stopped and (
-            (is_flush(hand) and flush_value(hand) >= STOP_THE_BUS_HAND_VALUE_THRESHOLD)
-            or is_prile(hand)
-        )
+        return not self.bus_is_stopped and can_stop_the_bus(self.current_hand)
 
     def advance_turn(self) -> None:
         self.turn += 1
         if self.turns_remaining is not None:
             self.turns_remaining -= 1
+        self.history.append(MOVE_ADVANCE_TURN)
 
-    def end_round(self) -> None:
-        for i, hand in enumerate(self.hands):
-            log.debug(f"Player {self.players[i]}'s hand: {hand}")
-
-        players_to_scores: dict[int, int] = {
-            player_index: hand_value(hand) for player_index, hand in enumerate(self.hands)
-        }
-
-        scores_to_player_indices: defaultdict[int, list[int]] = defaultdict(list)
-        for player_index, score in players_to_scores.items():
-            scores_to_player_indices[score].append(player_index)
-
-        high_score: int = max(scores_to_player_indices.keys())
-
-        winning_player_indices: list[int] = scores_to_player_indices[high_score]
+    def undo(self) -> None:
+        """Take back the most recent move, leaving the round exactly as it was before it. A
+        draw that reshuffled the deck also restores the deck and discard pile from before the
+        reshuffle; the generator that shuffled them is not rewound.
+        """
+        move: int = self.history.pop()
+        kind: int = move & MOVE_KIND_MASK
+        field: int = move >> MOVE_FIELD_BITS & MOVE_KIND_MASK
+
+        if kind == MOVE_ADVANCE_TURN:
+            self.turn -= 1
+            if self.turns_remaining is not None:
+                self.turns_remaining += 1
+        elif kind == MOVE_STOP_THE_BUS:
+            previous: int = move >> MOVE_FIELD_BITS
+            self.turns_remaining = None if previous == 0 else previous - 1
+        elif kind == MOVE_DISCARD:
+            card: Card = self.discard_pile.pop()
+            self.current_hand.insert(field, card)
+            hold_position: int = move >> (2 * MOVE_FIELD_BITS)
+            if hold_position > 0:
+                self.certain_holds[self.current_index].insert(hold_position - 1, card)
+        elif kind == MOVE_DRAW_FROM_DISCARD:
+            self.discard_pile.append(self.current_hand.pop())
+            self.certain_holds[self.current_index].pop()
+        else:
+            self.deck.append(self.current_hand.pop())
+            if field:
+                self.deck.clear()
+                self.discard_pile.clear()
+                self.discard_pile.extend_indices(self.reshuffles.pop())
+
+    def penalties(self) -> list[int]:
+        """The lives each player index loses if the round ends with the current hands. A prile
+        that wins outright costs every other player one life, or two for a prile of threes.
+        Otherwise the lowest hands lose a life each.
+        """
+        values: list[int] = [hand_value(hand) for hand in self.hands]
+        high_score: int = max(values)
+        winning_player_indices: list[int] = [i for i, v in enumerate(values) if v == high_score]
 
         if len(winning_player_indices) == 1:
-            [winning_player_index] = scores_to_player_indices[high_score]
-            log.debug(f"Player {self.players[winning_player_index]} wins the round!")
+            [winning_player_index] = winning_player_indices
             winning_hand: Hand = self.hands[winning_player_index]
             if is_prile(winning_hand):
-                [rank] = {card.rank for card in winning_hand}
-                self.prile_penalty(winning_player_index, rank)
-                return
-        else:
-            log.debug(
-                f"Players {[self.players[i] for i in winning_player_indices]} tie for the win"
-            )
+                rank: Rank = winning_hand[0].rank
+                penalty: int = (
+                    PRILE_OF_THREES_PENALTY if rank == Rank.Three else OTHER_PRILE_PENALTY
+                )
+                return [0 if i == winning_player_index else penalty for i in range(len(values))]
 
-        low_score: int = min(scores_to_player_indices.keys())
-        loser_indices: list[int] = scores_to_player_indices[low_score]
-        self.standard_penalty(loser_indices)
+        low_score: int = min(values)
+        return [1 if value == low_score else 0 for value in values]
 
-    def standard_penalty(self, loser_indices: list[int]) -> None:
-        if len(loser_indices) > 1:
-            log.debug(f"Players {[self.players[i] for i in loser_indices]} lose a life")
-        else:
-            log.debug(f"Player {self.players[loser_indices[0]]} loses a life")
+    def end_round(self) -> None:
+        for i, hand in enumerate(self.hands):
+            log.debug(f"Player {self.players[i]}'s hand: {hand}")
 
-        for i in loser_indices:
-            self.game.lives[self.players[i]] -= 1
+        for i, penalty in enumerate(self.penalties()):
+            if penalty > 0:
+                log.debug(
+                    f"Player {self.players[i]} loses {penalty} {'lives' if penalty > 1 else 'life'}"
+                )
+                self.game.lives[self.players[i]] -= penalty
 
-    def prile_penalty(self, winner_index: int, rank: Rank) -> None:
-        penalty: int = PRILE_OF_THREES_PENALTY if rank == Rank.Three else OTHER_PRILE_PENALTY
-        for i, player in enumerate(self.players):
-            if i != winner_index:
-                self.game.lives[player] -= penalty
 
-        losers: list[int] = [self.players[i] for i in range(self.player_count) if i != winner_index]
-        if len(losers) > 1:
-            log.debug(f"Players {losers} lose {penalty} {'lives' if penalty > 1 else 'life'}")
-        else:
-            log.debug(f"Player {losers[0]} loses {penalty} {'lives' if penalty > 1 else 'life'}")
+@dataclass(frozen=True, slots=True)
+class RoundSnapshot:
+    """The card ids and counters of a round, enough to restore it in place."""
+
+    deck: bytes
+    discard_pile: bytes
+    hands: tuple[bytes, ...]
+    certain_holds: tuple[bytes, ...]
+    turn: int
+    turns_remaining: int | None
+    history: tuple[int, ...]
+    reshuffles: tuple[bytes, ...]
 
 
 @dataclass(frozen=True, slots=True)
@@ -1,43 +1,175 @@
+import itertools
+import math
 from collections import defaultdict
-
-from stop_the_bus.Card import Card, Rank, Suit
+from collections.abc import Iterable, Sequence
+from dataclasses import dataclass
+from functools import cache
+from typing import Self, SupportsIndex, overload
+
+import numpy as np
+import numpy.typing as npt
+
+from stop_the_bus.Card import (
+    CARD_RANK_INDICES,
+    CARD_SCORES,
+    CARD_SUIT_INDICES,
+    DECK_SIZE,
+    Card,
+    Rank,
+    Suit,
+)
 from stop_the_bus.Datalog import Database
 
-type Hand = list[Card]
-
-
 MAX_HAND_SIZE: int = 4
 MIN_HAND_SIZE: int = 3
 
+STOP_THE_BUS_HAND_VALUE_THRESHOLD: int = 21
+PRILE_VALUE_OFFSET: int = 32
+
+
+class Hand(list[Card]):
+    """An ordered list of cards that also keeps a 52-bit mask of the cards it holds, and tallies
+    of its cards per suit and per rank. The tallies are updated as cards are added and removed,
+    so hand features are read from them rather than recomputed from the cards.
+    """
+
+    __slots__ = (
+        "mask",
+        "suit_counts",
+        "suit_score_sums",
+        "rank_counts",
+        "distinct_suit_count",
+        "distinct_rank_count",
+    )
+
+    def __init__(self, cards: Iterable[Card] = ()) -> None:
+        super().__init__()
+        self._clear_tallies()
+        self.extend(cards)
+
+    def _clear_tallies(self) -> None:
+        self.mask: int = 0
+        self.suit_counts: list[int] = [0] * Suit.size()
+        self.suit_score_sums: list[int] = [0] * Suit.size()
+        self.rank_counts: list[int] = [0] * Rank.size()
+        self.distinct_suit_count: int = 0
+        self.distinct_rank_count: int = 0
+
+    def _retally(self) -> None:
+        self._clear_tallies()
+        for card in self:
+            self._tally(card)
+
+    def _tally(self, card: Card) -> None:
+        index: int = card.index
+        suit: int = CARD_SUIT_INDICES[index]
+        rank: int = CARD_RANK_INDICES[index]
+        self.mask |= 1 << index
+        if self.suit_counts[suit] == 0:
+            self.distinct_suit_count += 1
+        if self.rank_counts[rank] == 0:
+            self.distinct_rank_count += 1
+        self.suit_counts[suit] += 1
+        self.suit_score_sums[suit] += card.score
+        self.rank_counts[rank] += 1
+
+    def _untally(self, card: Card) -> None:
+        index: int = card.index
+        suit: int = CARD_SUIT_INDICES[index]
+        rank: int = CARD_RANK_INDICES[index]
+        self.mask &= ~(1 << index)
+        self.suit_counts[suit] -= 1
+        self.suit_score_sums[suit] -= card.score
+        self.rank_counts[rank] -= 1
+        if self.suit_counts[suit] == 0:
+            self.distinct_suit_count -= 1
+        if self.rank_counts[rank] == 0:
+            self.distinct_rank_count -= 1
+
+    def append(self, card: Card) -> None:
+        super().append(card)
+        self._tally(card)
+
+    def insert(self, index: SupportsIndex, card: Card) -> None:
+        super().insert(index, card)
+        self._tally(card)
+
+    def extend(self, cards: Iterable[Card]) -> None:
+        for card in cards:
+            self.append(card)
+
+    def pop(self, index: SupportsIndex = -1) -> Card:
+        card: Card = super().pop(index)
+        self._untally(card)
+        return card
+
+    def remove(self, card: Card) -> None:
+        super().remove(card)
+        self._untally(card)
+
+    def clear(self) -> None:
+        super().clear()
+        self._clear_tallies()
+
+    def copy(self) -> "Hand":
+        hand: Hand = Hand.__new__(Hand)
+        list.extend(hand, self)
+        hand.mask = self.mask
+        hand.suit_counts = self.suit_counts.copy()
+        hand.suit_score_sums = self.suit_score_sums.copy()
+        hand.rank_counts = self.rank_counts.copy()
+        hand.distinct_suit_count = self.distinct_suit_count
+        hand.distinct_rank_count = self.distinct_rank_count
+        return hand
+
+    @property
+    def indices(self) -> bytes:
+        """The card indices in the hand, in hand order."""
+        return bytes(card.index for card in self)
+
+    @overload
+    def __setitem__(self, key: SupportsIndex, value: Card) -> None: ...
+
+    @overload
+    def __setitem__(self, key: slice, value: Iterable[Card]) -> None: ...
+
+    def __setitem__(self, key: SupportsIndex | slice, value: Card | Iterable[Card]) -> None:
+        super().__setitem__(key, value)  # type: ignore[index, assignment]
+        self._retally()
+
+    def __delitem__(self, key: SupportsIndex | slice) -> None:
+        super().__delitem__(key)
+        self._retally()
+
+    def __iadd__(self, cards: Iterable[Card]) -> Self:  # type: ignore[override, misc]
+        self.extend(cards)
+        return self
+
+    def __imul__(self, count: SupportsIndex) -> Self:
+        super().__imul__(count)
+        self._retally()
+        return self
+
+    def __reduce__(self) -> tuple[type["Hand"], tuple[list[Card]]]:
+        return Hand, (list(self),)
+
+
+def as_hand(cards: Iterable[Card]) -> Hand:
+    return cards if isinstance(cards, Hand) else Hand(cards)
+
 
 def empty_hand() -> Hand:
-    return []
+    return Hand()
 
 
 def single_high(hand: Hand) -> int:
     return max(card.score for card in hand)
 
 
-def is_flush(hand: Hand) -> bool:
-    return compute_distinct_suit_count(compute_distinct_suits(hand)) == 1
-
-
-def flush_value(hand: Hand) -> int:
-    return sum(card.score for card in hand)
-
-
 def suit_value(hand: Hand, suit: Suit) -> int:
     return sum(card.score for card in hand if card.suit == suit)
 
 
-def maximum_suit_value(hand: Hand) -> int:
-    return max(suit_value(hand, suit) for suit in Suit)
-
-
-def is_prile(hand: Hand) -> bool:
-    return len({card.rank for card in hand}) == 1
-
-
 def prile_value(rank: Rank) -> int:
     match rank:
         case Rank.Three:
@@ -50,12 +182,241 @@ def prile_value(rank: Rank) -> int:
             return int(rank.value) - 3
 
 
+# Each entry of the hand table packs every per-hand quantity into a single int:
+#   bits 0-5    hand value
+#   bits 6-11   maximum suit value
+#   bits 12-17  flush value
+#   bit 18      flush
+#   bit 19      prile
+#   bit 20      eligible to stop the bus
+VALUE_BITS: int = 6
+VALUE_MASK: int = (1 << VALUE_BITS) - 1
+MAXIMUM_SUIT_VALUE_SHIFT: int = VALUE_BITS
+FLUSH_VALUE_SHIFT: int = 2 * VALUE_BITS
+FLUSH_BIT: int = 1 << (3 * VALUE_BITS)
+PRILE_BIT: int = FLUSH_BIT << 1
+CAN_STOP_BIT: int = FLUSH_BIT << 2
+
+
+def hand_mask(hand: list[Card]) -> int:
+    if isinstance(hand, Hand):
+        return hand.mask
+    mask: int = 0
+    for card in hand:
+        mask |= 1 << card.index
+    return mask
+
+
+CARD_SCORE_ARRAY: npt.NDArray[np.int64] = np.array(CARD_SCORES, dtype=np.int64)
+CARD_SUIT_INDEX_ARRAY: npt.NDArray[np.int64] = np.array(CARD_SUIT_INDICES, dtype=np.int64)
+CARD_RANK_INDEX_ARRAY: npt.NDArray[np.int64] = np.array(CARD_RANK_INDICES, dtype=np.int64)
+PRILE_VALUE_ARRAY: npt.NDArray[np.int64] = np.array([prile_value(rank) for rank in Rank])
+
+
+@dataclass(frozen=True, slots=True)
+class HandEvaluation:
+    """Per-hand results of `evaluate_hands`, one array element per hand."""
+
+    value: npt.NDArray[np.int64]
+    maximum_suit_value: npt.NDArray[np.int64]
+    flush_value: npt.NDArray[np.int64]
+    is_flush: npt.NDArray[np.bool_]
+    is_prile: npt.NDArray[np.bool_]
+    can_stop: npt.NDArray[np.bool_]
+
+
+def evaluate_hands(cards: npt.ArrayLike) -> HandEvaluation:
+    """Evaluate a batch of hands with vectorised operations only. `cards` is an (N, 3) or (N, 4)
+    array of card indices, as given by `Card.index`, with one hand per row.
+    """
+    cards = np.asarray(cards, dtype=np.int64)
+    if cards.ndim != 2 or not MIN_HAND_SIZE <= cards.shape[1] <= MAX_HAND_SIZE:
+        raise ValueError(f"Expected an (N, 3) or (N, 4) array of card indices, got {cards.shape}")
+
+    scores: npt.NDArray[np.int64] = CARD_SCORE_ARRAY[cards]
+    suits: npt.NDArray[np.int64] = CARD_SUIT_INDEX_ARRAY[cards]
+    ranks: npt.NDArray[np.int64] = CARD_RANK_INDEX_ARRAY[cards]
+
+    suit_sums: npt.NDArray[np.int64] = np.stack(
+        [np.where(suits == suit, scores, 0).sum(axis=1) for suit in range(Suit.size())], axis=1
+    )
+    maximum_suit_values: npt.NDArray[np.int64] = suit_sums.max(axis=1)
+    flush_values: npt.NDArray[np.int64] = scores.sum(axis=1)
+    flushes: npt.NDArray[np.bool_] = (suits == suits[:, :1]).all(axis=1)
+    priles: npt.NDArray[np.bool_] = (ranks == ranks[:, :1]).all(axis=1)
+    values: npt.NDArray[np.int64] = np.where(
+        priles, PRILE_VALUE_ARRAY[ranks[:, 0]] + PRILE_VALUE_OFFSET, maximum_suit_values
+    )
+    can_stops: npt.NDArray[np.bool_] = (
+        flushes & (flush_values >= STOP_THE_BUS_HAND_VALUE_THRESHOLD)
+    ) | priles
+
+    return HandEvaluation(
+        value=values,
+        maximum_suit_value=maximum_suit_values,
+        flush_value=flush_values,
+        is_flush=flushes,
+        is_prile=priles,
+        can_stop=can_stops,
+    )
+
+
+def _pack_entries(evaluation: HandEvaluation) -> npt.NDArray[np.int64]:
+    return (
+        evaluation.value
+        | (evaluation.maximum_suit_value << MAXIMUM_SUIT_VALUE_SHIFT)
+        | (evaluation.flush_value << FLUSH_VALUE_SHIFT)
+        | np.where(evaluation.is_flush, FLUSH_BIT, 0)
+        | np.where(evaluation.is_prile, PRILE_BIT, 0)
+        | np.where(evaluation.can_stop, CAN_STOP_BIT, 0)
+    )
+
+
+def build_hand_table() -> dict[int, int]:
+    table: dict[int, int] = {}
+    for size in (MIN_HAND_SIZE, MAX_HAND_SIZE):
+        cards: npt.NDArray[np.int64] = np.fromiter(
+            itertools.chain.from_iterable(itertools.combinations(range(DECK_SIZE), size)),
+            dtype=np.int64,
+        ).reshape(-1, size)
+        masks: npt.NDArray[np.int64] = np.bitwise_or.reduce(np.left_shift(1, cards), axis=1)
+        table.update(
+            zip(masks.tolist(), _pack_entries(evaluate_hands(cards)).tolist(), strict=True)
+        )
+    return table
+
+
+# A map from the card mask of every 3- and 4-card hand to its packed table entry
+HAND_TABLE: dict[int, int] = build_hand_table()
+
+
+# BINOMIALS[k][n] is n choose k
+BINOMIALS: tuple[tuple[int, ...], ...] = tuple(
+    tuple(math.comb(n, k) for n in range(DECK_SIZE)) for k in range(MAX_HAND_SIZE + 1)
+)
+
+
+# The position of a hand among all hands of its size, ranked by the combinatorial number system
+# over its sorted card indices. Hands are in colexicographic order, that of their highest card,
+# then their next highest and so on
+# e.g. (0, 1, 2) -> 0, (0, 1, 3) -> 1, (0, 2, 3) -> 2, (49, 50, 51) -> 22099
+def hand_rank(indices: Sequence[int]) -> int:
+    return sum(BINOMIALS[k + 1][index] for k, index in enumerate(sorted(indices)))
+
+
+# Every hand of the given size, as its sorted card indices, in order of `hand_rank`
+@cache
+def ranked_hands(size: int) -> npt.NDArray[np.int64]:
+    hands: npt.NDArray[np.int64] = np.array(
+        list(itertools.combinations(range(DECK_SIZE), size)), dtype=np.int64
+    )
+    binomials: npt.NDArray[np.int64] = np.array(BINOMIALS, dtype=np.int64)
+    ranks: npt.NDArray[np.int64] = binomials[np.arange(1, size + 1), hands].sum(axis=1)
+    ordered: npt.NDArray[np.int64] = np.empty_like(hands)
+    ordered[ranks] = hands
+    return ordered
+
+
+# `hand_rank` of each row of an (N, 3) array of card indices, in any order within a row
+# e.g. [2, 0, 1] -> 0, [0, 1, 3] -> 1, [49, 50, 51] -> 22099
+def three_card_hand_indices(cards: npt.NDArray[np.int64]) -> npt.NDArray[np.int64]:
+    first, second, third = cards[:, 0], cards[:, 1], cards[:, 2]
+    smaller: npt.NDArray[np.int64] = np.minimum(first, second)
+    larger: npt.NDArray[np.int64] = np.maximum(first, second)
+    low: npt.NDArray[np.int64] = np.minimum(smaller, third)
+    high: npt.NDArray[np.int64] = np.maximum(larger, third)
+    middle: npt.NDArray[np.int64] = first + second + third - low - high
+    return np.asarray(
+        low + middle * (middle - 1) // 2 + high * (high - 1) * (high - 2) // 6, dtype=np.int64
+    )
+
+
+def build_three_card_entries() -> npt.NDArray[np.int64]:
+    return _pack_entries(evaluate_hands(ranked_hands(MIN_HAND_SIZE)))
+
+
+# The packed table entry of every 3-card hand, indexed by `hand_rank`
+THREE_CARD_ENTRIES: npt.NDArray[np.int64] = build_three_card_entries()
+
+
+def three_card_entries(cards: npt.ArrayLike) -> npt.NDArray[np.int64]:
+    """The packed table entries of an (N, 3) array of card indices with one hand per row. A single
+    gather, so much cheaper than `evaluate_hands` for the 3-card hands that simulations score.
+    """
+    return THREE_CARD_ENTRIES[three_card_hand_indices(np.asarray(cards, dtype=np.int64))]
+
+
+# The packed table entry for the hand, or None if the hand is not a 3- or 4-card hand
+def hand_entry(hand: Hand) -> int | None:
+    if not MIN_HAND_SIZE <= len(hand) <= MAX_HAND_SIZE:
+        return None
+    return HAND_TABLE.get(hand_mask(hand))
+
+
+def is_flush(hand: Hand) -> bool:
+    entry: int | None = hand_entry(hand)
+    return scan_is_flush(hand) if entry is None else bool(entry & FLUSH_BIT)
+
+
+def flush_value(hand: Hand) -> int:
+    entry: int | None = hand_entry(hand)
+    return scan_flush_value(hand) if entry is None else (entry >> FLUSH_VALUE_SHIFT) & VALUE_MASK
+
+
+def maximum_suit_value(hand: Hand) -> int:
+    entry: int | None = hand_entry(hand)
+    return (
+        scan_maximum_suit_value(hand)
+        if entry is None
+        else (entry >> MAXIMUM_SUIT_VALUE_SHIFT) & VALUE_MASK
+    )
+
+
+def is_prile(hand: Hand) -> bool:
+    entry: int | None = hand_entry(hand)
+    return scan_is_prile(hand) if entry is None else bool(entry & PRILE_BIT)
+
+
 def hand_value(hand: Hand) -> int:
-    if is_prile(hand):
+    entry: int | None = hand_entry(hand)
+    return scan_hand_value(hand) if entry is None else entry & VALUE_MASK
+
+
+def can_stop_the_bus(hand: Hand) -> bool:
+    entry: int | None = hand_entry(hand)
+    return scan_can_stop_the_bus(hand) if entry is None else bool(entry & CAN_STOP_BIT)
+
+
+# Direct evaluation by scanning the cards of the hand. These define the rules that the hand
+# table is checked against, and handle hands that are not in the table
+def scan_is_flush(hand: Hand) -> bool:
+    return len({card.suit for card in hand}) == 1
+
+
+def scan_flush_value(hand: Hand) -> int:
+    return sum(card.score for card in hand)
+
+
+def scan_maximum_suit_value(hand: Hand) -> int:
+    return max(suit_value(hand, suit) for suit in Suit)
+
+
+def scan_is_prile(hand: Hand) -> bool:
+    return len({card.rank for card in hand}) == 1
+
+
+def scan_hand_value(hand: Hand) -> int:
+    if scan_is_prile(hand):
         [rank] = {card.rank for card in hand}
-        return prile_value(rank) + 32
+        return prile_value(rank) + PRILE_VALUE_OFFSET
     else:
-        return maximum_suit_value(hand)
+        return scan_maximum_suit_value(hand)
+
+
+def scan_can_stop_the_bus(hand: Hand) -> bool:
+    return (
+        scan_is_flush(hand) and scan_flush_value(hand) >= STOP_THE_BUS_HAND_VALUE_THRESHOLD
+    ) or scan_is_prile(hand)
 
 
 # A map from card indices to their ranks
@@ -70,7 +431,9 @@ def compute_card_indices_to_suits(hand: Hand) -> dict[int, Suit]:
     return {index: card.suit for index, card in enumerate(hand)}
 
 
-# A map from ranks to the list of card indices with that rank
+# A map from ranks to the list of card indices with that rank. This one stays a scan of the
+# cards: pop(index) shifts every later card down a position, so a map from ranks to positions
+# can't be kept up to date incrementally the way the tallies are
 # e.g. [2D, 4H, 2S, 5C] -> {Rank.Two: [0, 2], Rank.Four: [1], Rank.Five: [3]}
 def compute_rank_to_card_indices(hand: Hand) -> dict[Rank, list[int]]:
     rank_to_card_indices: dict[Rank, list[int]] = {}
@@ -79,6 +442,12 @@ def compute_rank_to_card_indices(hand: Hand) -> dict[Rank, list[int]]:
     return rank_to_card_indices
 
 
+# The indices of the cards with the given rank, from a single scan of the hand
+# e.g. [2D, 4H, 2S, 5C], Rank.Two -> [0, 2]
+def compute_card_indices_with_rank(hand: Hand, rank: Rank) -> list[int]:
+    return [index for index, card in enumerate(hand) if card.rank is rank]
+
+
 # A map from suits to the list of card indices with that suit
 # e.g. [2D, AD, 3S, 4C] -> {Suit.Diamonds: [0, 1], Suit.Spades: [2], Suit.Clubs: [3]}
 def compute_suit_to_card_indices(hand: Hand) -> dict[Suit, list[int]]:
@@ -94,6 +463,16 @@ def compute_rank_to_counts(rank_to_card_indices: dict[Rank, list[int]]) -> dict[
     return {rank: len(indices) for rank, indices in rank_to_card_indices.items()}
 
 
+# A map from ranks to the count of cards with that rank, read from the hand's rank tallies
+# e.g. [2D, 4H, 2S, 5C] -> {Rank.Two: 2, Rank.Four: 1, Rank.Five: 1}
+def compute_hand_rank_to_counts(hand: Hand) -> dict[Rank, int]:
+    return {
+        Rank.from_index(rank): count
+        for rank, count in enumerate(as_hand(hand).rank_counts)
+        if count
+    }
+
+
 # A map from suits to the count of cards with that suit
 # e.g. [2D, AD, 3S, 4C] -> {Suit.Diamonds: 2, Suit.Spades: 1, Suit.Clubs: 1}
 def compute_suit_to_counts(suit_to_card_indices: dict[Suit, list[int]]) -> dict[Suit, int]:
@@ -103,16 +482,18 @@ def compute_suit_to_counts(suit_to_card_indices: dict[Suit, list[int]]) -> dict[
 # A map from suits to the sum of scores of cards with that suit
 # e.g. [2D, AD, 3S, 4C] -> {Suit.Diamonds: 13, Suit.Spades: 3, Suit.Clubs: 4}
 def compute_suit_to_suit_score_sums(hand: Hand) -> dict[Suit, int]:
+    hand = as_hand(hand)
     return {
-        suit: sum(card.score for card in hand if card.suit == suit)
-        for suit in {card.suit for card in hand}
+        Suit.from_index(suit): hand.suit_score_sums[suit]
+        for suit, count in enumerate(hand.suit_counts)
+        if count
     }
 
 
 # The set of ranks in the hand
 # e.g. [2D, 4H, 2S, 5C] -> {Rank.Two, Rank.Four, Rank.Five}
 def compute_distinct_ranks(hand: Hand) -> set[Rank]:
-    return {card.rank for card in hand}
+    return {Rank.from_index(rank) for rank, count in enumerate(as_hand(hand).rank_counts) if count}
 
 
 # The number of different ranks in the hand
@@ -124,7 +505,7 @@ def compute_distinct_rank_count(distinct_ranks: set[Rank]) -> int:
 # The set of suits in the hand
 # e.g. [2D, AD, 3S, 4C] -> {Suit.Diamonds, Suit.Spades, Suit.Clubs}
 def compute_distinct_suits(hand: Hand) -> set[Suit]:
-    return {card.suit for card in hand}
+    return {Suit.from_index(suit) for suit, count in enumerate(as_hand(hand).suit_counts) if count}
 
 
 # The number of different suits in the hand
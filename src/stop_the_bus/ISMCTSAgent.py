@@ -0,0 +1,265 @@
+from __future__ import annotations
+
+import math
+import time
+
+import numpy as np
+
+from stop_the_bus.Card import Card
+from stop_the_bus.Determinization import sample_determinizations
+from stop_the_bus.Endgame import EndgameSolver
+from stop_the_bus.Environment import (
+    ACTION_CONTINUE,
+    ACTION_COUNT,
+    ACTION_DISCARD,
+    ACTION_DRAW_FROM_DECK,
+    ACTION_DRAW_FROM_DISCARD,
+    ACTION_STOP_THE_BUS,
+)
+from stop_the_bus.Game import Phase, Round, View
+from stop_the_bus.Hand import MAX_HAND_SIZE, MIN_HAND_SIZE, VALUE_MASK, three_card_entries
+from stop_the_bus.VectorGame import BoolArray, IntArray, VectorGame, VectorRound
+
+DEFAULT_PLAYOUTS: int = 4096
+DEFAULT_BATCH_SIZE: int = 256
+DEFAULT_EXPLORATION: float = 1.0
+DEFAULT_MAX_ROLLOUT_TURNS: int = 60
+
+# A playout in flight counts as a loss of one life until its result is known, so that the
+# playouts of one batch spread across the children instead of all following the same path
+VIRTUAL_LOSS: float = -1.0
+
+DRAW_ACTIONS: list[int] = [ACTION_DRAW_FROM_DECK, ACTION_DRAW_FROM_DISCARD]
+STOP_ACTIONS: list[int] = [ACTION_STOP_THE_BUS, ACTION_CONTINUE]
+
+# The hand slots kept when each slot of a four-card hand is discarded
+KEPT_SLOTS: list[list[int]] = [
+    [slot for slot in range(MAX_HAND_SIZE) if slot != discarded]
+    for discarded in range(MAX_HAND_SIZE)
+]
+
+
+class Node:
+    """Statistics for one of the searching player's decisions, shared by every determinization
+    that reaches it. `available` counts how often the action was legal when its parent was
+    visited, which replaces the parent's visit count in the exploration term.
+    """
+
+    __slots__ = ("children", "visits", "total", "available")
+
+    def __init__(self) -> None:
+        self.children: list[Node | None] = [None] * ACTION_COUNT
+        self.visits: int = 0
+        self.total: float = 0.0
+        self.available: int = 0
+
+    def child(self, action: int) -> Node:
+        child: Node | None = self.children[action]
+        if child is None:
+            child = self.children[action] = Node()
+        return child
+
+    def select(self, actions: list[int], exploration: float) -> int:
+        best_action: int = actions[0]
+        best_score: float = -math.inf
+        for action in actions:
+            child: Node = self.child(action)
+            child.available += 1
+            if child.visits == 0:
+                score: float = math.inf
+            else:
+                score = child.total / child.visits + exploration * math.sqrt(
+                    math.log(child.available) / child.visits
+                )
+            if score > best_score:
+                best_action, best_score = action, score
+        chosen: Node = self.child(best_action)
+        chosen.visits += 1
+        chosen.total += VIRTUAL_LOSS
+        return best_action
+
+    def most_visited(self, actions: list[int]) -> int:
+        return max(actions, key=lambda action: self.child(action).visits)
+
+
+# The value of the best three cards left after each possible discard from four-card hands
+def discard_values(hands: IntArray) -> IntArray:
+    kept: IntArray = hands[:, KEPT_SLOTS].reshape(-1, MIN_HAND_SIZE)
+    return (three_card_entries(kept) & VALUE_MASK).reshape(-1, MAX_HAND_SIZE)
+
+
+def rollout(game: VectorGame, max_turn_count: int) -> IntArray:
+    """Finish the current round at every table with a greedy policy: take the discard pile's top
+    card when it improves the hand, discard the card that leaves the best hand and stop the bus
+    as soon as allowed. Rounds still going after `max_turn_count` more turns are scored as they
+    stand. Returns the lives lost, indexed by table and seat.
+    """
+    round: VectorRound = game.round
+    last_turn: IntArray = round.turn + max_turn_count
+    while True:
+        active: BoolArray = round.has_turns_remaining & (round.turn < last_turn)
+        if not active.any():
+            break
+
+        hands: IntArray = round.current_hand.copy()
+        current_values: IntArray = three_card_entries(hands[:, :MIN_HAND_SIZE]) & VALUE_MASK
+        hands[:, MIN_HAND_SIZE] = np.maximum(round.discard_top, 0)
+        from_pile: BoolArray = active & (discard_values(hands).max(axis=1) > current_values)
+        round.draw_from_discard(from_pile)
+        round.draw_from_deck(active & ~from_pile)
+
+        round.discard(discard_values(round.current_hand).argmax(axis=1), active)
+        round.stop_the_bus(active & round.can_stop_the_bus())
+        round.advance_turn(active)
+
+    return round.end_round(game.playing)
+
+
+class ISMCTSAgent:
+    """Information-set Monte Carlo tree search over the agent's own decisions in a turn: draw,
+    discard and stop the bus. Each playout deals the hidden cards anew with
+    `sample_determinizations`, descends the tree and finishes the round with `rollout`. Playouts
+    run in batches, one VectorGame table per playout. The subtree below the chosen action is
+    kept for the next decision of the same turn.
+
+    With an `endgame` solver, decisions after the bus has been stopped are solved exactly
+    whenever the solver can handle the turns remaining.
+    """
+
+    __slots__ = (
+        "playouts",
+        "time_budget",
+        "batch_size",
+        "exploration",
+        "max_rollout_turns",
+        "rng",
+        "endgame",
+        "_subtree",
+        "_subtree_round",
+        "_subtree_turn",
+    )
+
+    def __init__(
+        self,
+        playouts: int = DEFAULT_PLAYOUTS,
+        time_budget: float | None = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        exploration: float = DEFAULT_EXPLORATION,
+        max_rollout_turns: int = DEFAULT_MAX_ROLLOUT_TURNS,
+        rng: np.random.Generator | None = None,
+        endgame: EndgameSolver | None = None,
+    ) -> None:
+        self.playouts: int = playouts
+        self.time_budget: float | None = time_budget
+        self.batch_size: int = batch_size
+        self.exploration: float = exploration
+        self.max_rollout_turns: int = max_rollout_turns
+        self.rng: np.random.Generator = np.random.default_rng() if rng is None else rng
+        self.endgame: EndgameSolver | None = endgame
+        self._subtree: Node | None = None
+        # The round and turn the subtree was kept for. The round itself is held, rather than its
+        # id, since ids are reused once objects are collected
+        self._subtree_round: Round | None = None
+        self._subtree_turn: int | None = None
+
+    def _root(self, view: View) -> Node:
+        if (
+            self._subtree is not None
+            and self._subtree_round is view.round
+            and self._subtree_turn == view.turn
+        ):
+            return self._subtree
+        self._subtree_round = view.round
+        self._subtree_turn = view.turn
+        return Node()
+
+    def _keep(self, root: Node, action: int) -> None:
+        self._subtree = root.child(action)
+
+    def _forget(self) -> None:
+        self._subtree = None
+        self._subtree_round = None
+        self._subtree_turn = None
+
+    def _select(self, nodes: list[Node], actions: list[int], where: BoolArray) -> IntArray:
+        chosen: IntArray = np.full(len(nodes), -1, dtype=np.int64)
+        for table in np.flatnonzero(where).tolist():
+            action: int = nodes[table].select(actions, self.exploration)
+            nodes[table] = nodes[table].child(action)
+            chosen[table] = action
+        return chosen
+
+    def _playout_batch(self, view: View, root: Node, phase: Phase, count: int) -> None:
+        game: VectorGame = sample_determinizations(view, count, self.rng).to_vector_game(self.rng)
+        round: VectorRound = game.round
+        nodes: list[Node] = [root] * count
+        paths: list[list[Node]] = [[] for _ in range(count)]
+        everywhere: BoolArray = np.ones(count, dtype=np.bool_)
+
+        def descend(actions: list[int], where: BoolArray) -> IntArray:
+            chosen: IntArray = self._select(nodes, actions, where)
+            for table in np.flatnonzero(where).tolist():
+                paths[table].append(nodes[table])
+            return chosen
+
+        if phase == Phase.DRAW:
+            drawn: IntArray = descend(DRAW_ACTIONS, everywhere)
+            round.draw_from_deck(drawn == ACTION_DRAW_FROM_DECK)
+            round.draw_from_discard(drawn == ACTION_DRAW_FROM_DISCARD)
+        if phase != Phase.STOP:
+            hand_size: int = len(view.hand) + (phase == Phase.DRAW)
+            slots: list[int] = [ACTION_DISCARD + slot for slot in range(hand_size)]
+            round.discard(descend(slots, everywhere) - ACTION_DISCARD)
+        can_stop: BoolArray = round.can_stop_the_bus()
+        round.stop_the_bus(descend(STOP_ACTIONS, can_stop) == ACTION_STOP_THE_BUS)
+        round.advance_turn()
+
+        rewards: list[int] = (-rollout(game, self.max_rollout_turns)[:, view.player_index]).tolist()
+        for path, reward in zip(paths, rewards, strict=True):
+            for node in path:
+                node.total += reward - VIRTUAL_LOSS
+
+    def _search(self, view: View, phase: Phase) -> Node:
+        root: Node = self._root(view)
+        deadline: float = (
+            math.inf if self.time_budget is None else time.perf_counter() + self.time_budget
+        )
+        remaining: int = self.playouts
+        while remaining > 0 and time.perf_counter() < deadline:
+            count: int = min(self.batch_size, remaining)
+            self._playout_batch(view, root, phase, count)
+            remaining -= count
+        return root
+
+    def draw(self, view: View) -> tuple[Card, bool]:
+        if self.endgame is not None and self.endgame.can_solve(view):
+            from_deck, from_pile = self.endgame.draw_values(view, rng=self.rng)
+            action: int = (
+                ACTION_DRAW_FROM_DECK if from_deck <= from_pile else ACTION_DRAW_FROM_DISCARD
+            )
+            self._forget()
+        else:
+            root: Node = self._search(view, Phase.DRAW)
+            action = root.most_visited(DRAW_ACTIONS)
+            self._keep(root, action)
+        if action == ACTION_DRAW_FROM_DECK:
+            return view.round.draw_from_deck(), True
+        return view.round.draw_from_discard(), False
+
+    def discard(self, view: View) -> Card:
+        if self.endgame is not None and self.endgame.can_solve(view):
+            values: list[float] = self.endgame.discard_values(view, rng=self.rng)
+            self._forget()
+            return view.round.discard(values.index(min(values)))
+        root: Node = self._search(view, Phase.DISCARD)
+        action: int = root.most_visited([ACTION_DISCARD + slot for slot in range(len(view.hand))])
+        self._keep(root, action)
+        return view.round.discard(action - ACTION_DISCARD)
+
+    def stop_the_bus(self, view: View) -> bool:
+        if not view.can_stop_the_bus:
+            self._forget()
+            return False
+        root: Node = self._search(view, Phase.STOP)
+        self._forget()
+        return root.most_visited(STOP_ACTIONS) == ACTION_STOP_THE_BUS and view.round.stop_the_bus()
@@ -0,0 +1,241 @@
+import asyncio
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from dataclasses import dataclass
+from types import TracebackType
+
+import torch
+
+from stop_the_bus.Encoding import ViewModule, encode_views
+from stop_the_bus.Game import Phase, View
+
+DEFAULT_MAX_BATCH_SIZE: int = 64
+DEFAULT_MAX_WAIT: float = 0.002
+
+log: logging.Logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True, slots=True)
+class InferenceRequest:
+    # A view, or one already encoded
+    view: View | torch.Tensor
+    phase: Phase
+    future: Future[torch.Tensor]
+
+
+@dataclass(frozen=True, slots=True)
+class AsyncInferenceRequest:
+    view: View | torch.Tensor
+    phase: Phase
+    future: asyncio.Future[torch.Tensor]
+
+
+class InferenceServer:
+    """Runs a ViewModule for many games at once, gathering their pending decisions into batches
+    of up to `max_batch_size`, waiting at most `max_wait` seconds after the first request of a
+    batch for more to arrive. Each batch is one pass through the backbone, then one pass
+    through the head of each phase present. Views are encoded together when their batch is run,
+    so must not change until their results are ready.
+
+    Callers in threads use `infer` or `submit`, served by a worker thread: use the server as a
+    context manager, or call `start` and `stop`. Coroutines use `infer_async`, which batches
+    within the running event loop and needs no worker, so one event loop should use it at a
+    time.
+    """
+
+    __slots__ = (
+        "net",
+        "max_batch_size",
+        "max_wait",
+        "requests",
+        "worker",
+        "pending",
+        "flush_handle",
+        "buffer",
+        "batch_count",
+        "request_count",
+    )
+
+    def __init__(
+        self,
+        net: ViewModule,
+        max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+        max_wait: float = DEFAULT_MAX_WAIT,
+    ) -> None:
+        self.net: ViewModule = net
+        self.net.eval()
+        self.max_batch_size: int = max_batch_size
+        self.max_wait: float = max_wait
+        # None asks the worker to stop once the requests before it are served
+        self.requests: queue.SimpleQueue[InferenceRequest | None] = queue.SimpleQueue()
+        self.worker: threading.Thread | None = None
+        self.pending: list[AsyncInferenceRequest] = []
+        self.flush_handle: asyncio.TimerHandle | None = None
+        # The encoded batches of `infer_async`. The worker thread has a buffer of its own
+        self.buffer: torch.Tensor = self._new_buffer()
+        self.batch_count: int = 0
+        self.request_count: int = 0
+
+    def __enter__(self) -> "InferenceServer":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.stop()
+
+    @property
+    def mean_batch_size(self) -> float:
+        return self.request_count / self.batch_count if self.batch_count else 0.0
+
+    def start(self) -> None:
+        if self.worker is None:
+            self.worker = threading.Thread(target=self._serve, name="InferenceServer", daemon=True)
+            self.worker.start()
+
+    def stop(self) -> None:
+        if self.worker is not None:
+            self.requests.put(None)
+            self.worker.join()
+            self.worker = None
+
+    def submit(self, view: View, phase: Phase) -> Future[torch.Tensor]:
+        """Queue a view for inference. The future's result is the logits of the phase's head,
+        with shape (1, actions), as returned by `ViewModule.forward`.
+        """
+        return self._submit(view, phase)
+
+    def submit_encoded(self, view_tensor: torch.Tensor, phase: Phase) -> Future[torch.Tensor]:
+        return self._submit(view_tensor, phase)
+
+    def _submit(self, view: View | torch.Tensor, phase: Phase) -> Future[torch.Tensor]:
+        if self.worker is None:
+            # Nothing would serve the request, so its future would never complete
+            raise RuntimeError("InferenceServer is not started")
+        future: Future[torch.Tensor] = Future()
+        self.requests.put(InferenceRequest(view, phase, future))
+        return future
+
+    def infer(self, view: View, phase: Phase) -> torch.Tensor:
+        return self.submit(view, phase).result()
+
+    async def infer_async(self, view: View, phase: Phase) -> torch.Tensor:
+        return await self._infer_async(view, phase)
+
+    async def infer_encoded_async(self, view_tensor: torch.Tensor, phase: Phase) -> torch.Tensor:
+        return await self._infer_async(view_tensor, phase)
+
+    async def _infer_async(self, view: View | torch.Tensor, phase: Phase) -> torch.Tensor:
+        loop: asyncio.AbstractEventLoop = asyncio.get_running_loop()
+        future: asyncio.Future[torch.Tensor] = loop.create_future()
+        self.pending.append(AsyncInferenceRequest(view, phase, future))
+        if len(self.pending) >= self.max_batch_size:
+            self._flush()
+        elif self.flush_handle is None:
+            self.flush_handle = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _new_buffer(self) -> torch.Tensor:
+        return torch.empty((self.max_batch_size, ViewModule.INPUT_DIM), device=self.net.device)
+
+    def _encode(
+        self, views: list[View | torch.Tensor], phases: list[Phase], buffer: torch.Tensor
+    ) -> torch.Tensor:
+        unencoded: list[View] = [view for view in views if isinstance(view, View)]
+        if len(unencoded) == len(views):
+            return encode_views(unencoded, phases, device=self.net.device, out=buffer)
+        batch: torch.Tensor = buffer[: len(views)]
+        rows: list[int] = [i for i, view in enumerate(views) if isinstance(view, View)]
+        batch[rows] = encode_views(unencoded, [phases[i] for i in rows], device=self.net.device)
+        for i, view in enumerate(views):
+            if isinstance(view, torch.Tensor):
+                batch[i] = view
+        return batch
+
+    def _forward(
+        self, views: list[View | torch.Tensor], phases: list[Phase], buffer: torch.Tensor
+    ) -> list[torch.Tensor]:
+        self.batch_count += 1
+        self.request_count += len(phases)
+        rows: dict[Phase, list[int]] = {}
+        for i, phase in enumerate(phases):
+            rows.setdefault(phase, []).append(i)
+        results: dict[int, torch.Tensor] = {}
+        with torch.no_grad():
+            x: torch.Tensor = self.net.backbone(self._encode(views, phases, buffer))
+            for phase, phase_rows in rows.items():
+                logits: torch.Tensor = self.net.head(phase)(x[phase_rows])
+                for row, i in enumerate(phase_rows):
+                    results[i] = logits[row : row + 1]
+        return [results[i] for i in range(len(phases))]
+
+    def _flush(self) -> None:
+        if self.flush_handle is not None:
+            self.flush_handle.cancel()
+            self.flush_handle = None
+        # Requests whose decisions were cancelled, such as by an AsyncDriver timeout, are dropped
+        batch: list[AsyncInferenceRequest] = [
+            request for request in self.pending if not request.future.cancelled()
+        ]
+        self.pending = []
+        if not batch:
+            return
+        try:
+            results: list[torch.Tensor] = self._forward(
+                [request.view for request in batch],
+                [request.phase for request in batch],
+                self.buffer,
+            )
+        except Exception as error:
+            log.exception("Inference batch failed")
+            for request in batch:
+                request.future.set_exception(error)
+            return
+        for request, result in zip(batch, results, strict=True):
+            request.future.set_result(result)
+
+    def _serve(self) -> None:
+        buffer: torch.Tensor = self._new_buffer()
+        stopping: bool = False
+        while not stopping:
+            request: InferenceRequest | None = self.requests.get()
+            if request is None:
+                break
+            batch: list[InferenceRequest] = [request]
+            deadline: float = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    request = self.requests.get(timeout=max(deadline - time.perf_counter(), 0))
+                except queue.Empty:
+                    break
+                if request is None:
+                    stopping = True
+                    break
+                batch.append(request)
+            self._run_batch(batch, buffer)
+
+    def _run_batch(self, batch: list[InferenceRequest], buffer: torch.Tensor) -> None:
+        # Requests cancelled while queued are dropped
+        live: list[InferenceRequest] = [
+            request for request in batch if request.future.set_running_or_notify_cancel()
+        ]
+        if not live:
+            return
+        try:
+            results: list[torch.Tensor] = self._forward(
+                [request.view for request in live], [request.phase for request in live], buffer
+            )
+        except Exception as error:
+            log.exception("Inference batch failed")
+            for request in live:
+                request.future.set_exception(error)
+            return
+        for request, result in zip(live, results, strict=True):
+            request.future.set_result(result)
@@ -0,0 +1,177 @@
+import time
+from collections.abc import Callable
+from typing import Any
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.Card import Card
+from stop_the_bus.Game import View
+
+PHASE_DRAW: str = "draw"
+PHASE_DISCARD: str = "discard"
+PHASE_STOP_THE_BUS: str = "stop_the_bus"
+PHASE_OBSERVE: str = "observe"
+PHASE_DEAL: str = "deal"
+PHASE_END_ROUND: str = "end_round"
+
+# The agent that dealing and scoring are recorded against, as no agent makes them
+GAME_AGENT: int = -1
+
+# Values below 2**SUB_BUCKET_BITS nanoseconds get a bucket each. Above that, every power of two
+# is split into 2**SUB_BUCKET_BITS buckets, so a bucket's bounds are within 1/16 of each other
+SUB_BUCKET_BITS: int = 4
+SUB_BUCKET_COUNT: int = 1 << SUB_BUCKET_BITS
+
+PERCENTILES: tuple[float, ...] = (50.0, 90.0, 99.0, 99.9)
+
+
+# e.g. 15 -> 15, 16 -> 16, 33 -> 32 (the bucket [32, 33]), 1000 -> 111 (the bucket [992, 1023])
+def bucket_index(value: int) -> int:
+    if value < SUB_BUCKET_COUNT:
+        return value
+    shift: int = value.bit_length() - SUB_BUCKET_BITS - 1
+    return shift * SUB_BUCKET_COUNT + (value >> shift)
+
+
+# The smallest and largest values in a bucket
+def bucket_bounds(index: int) -> tuple[int, int]:
+    if index < SUB_BUCKET_COUNT:
+        return index, index
+    shift: int = index // SUB_BUCKET_COUNT - 1
+    top: int = index - shift * SUB_BUCKET_COUNT
+    return top << shift, ((top + 1) << shift) - 1
+
+
+class LatencyHistogram:
+    """Latencies in nanoseconds, counted in log-linear buckets in the style of HdrHistogram.
+    Recording is constant time and memory grows with the log of the largest latency.
+    """
+
+    __slots__ = ("buckets", "count", "total", "min", "max")
+
+    def __init__(self) -> None:
+        self.buckets: dict[int, int] = {}
+        self.count: int = 0
+        self.total: int = 0
+        self.min: int = 0
+        self.max: int = 0
+
+    def record(self, value: int) -> None:
+        index: int = bucket_index(value)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        self.max = max(self.max, value)
+        self.count += 1
+        self.total += value
+
+    def merge(self, other: "LatencyHistogram") -> None:
+        if other.count == 0:
+            return
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """The largest latency in the bucket holding the given percentile, capped at the
+        largest latency recorded.
+        """
+        target: float = self.count * percentile / 100
+        seen: int = 0
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if seen >= target:
+                return min(bucket_bounds(index)[1], self.max)
+        return self.max
+
+    def export(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "total_ns": self.total,
+            "min_ns": self.min,
+            "max_ns": self.max,
+            "mean_ns": self.mean,
+            **{f"p{percentile:g}_ns": self.percentile(percentile) for percentile in PERCENTILES},
+            # Each bucket's smallest latency and count, in increasing order of latency
+            "buckets": [
+                [bucket_bounds(index)[0], self.buckets[index]] for index in sorted(self.buckets)
+            ],
+        }
+
+
+class LatencyRecorder:
+    """Latency histograms keyed by agent and phase, filled in by a `Driver` given the recorder.
+    Dealing and scoring are recorded against GAME_AGENT. One recorder can be shared by the
+    drivers of many games, or recorders merged afterwards.
+    """
+
+    __slots__ = ("histograms",)
+
+    def __init__(self) -> None:
+        self.histograms: dict[tuple[int, str], LatencyHistogram] = {}
+
+    def histogram(self, agent: int, phase: str) -> LatencyHistogram:
+        histogram: LatencyHistogram | None = self.histograms.get((agent, phase))
+        if histogram is None:
+            histogram = self.histograms[agent, phase] = LatencyHistogram()
+        return histogram
+
+    def record(self, agent: int, phase: str, value: int) -> None:
+        self.histogram(agent, phase).record(value)
+
+    def merge(self, other: "LatencyRecorder") -> None:
+        for (agent, phase), histogram in other.histograms.items():
+            self.histogram(agent, phase).merge(histogram)
+
+    def export(self) -> dict[str, dict[str, dict[str, Any]]]:
+        """The histograms as plain data, ready for `json.dump`, keyed by agent then phase."""
+        exported: dict[str, dict[str, dict[str, Any]]] = {}
+        for (agent, phase), histogram in sorted(self.histograms.items()):
+            key: str = "game" if agent == GAME_AGENT else str(agent)
+            exported.setdefault(key, {})[phase] = histogram.export()
+        return exported
+
+
+class TimedAgent:
+    """Times an agent's decisions into a recorder."""
+
+    __slots__ = ("agent", "draws", "discards", "stops")
+
+    def __init__(self, agent: Agent, recorder: LatencyRecorder, agent_id: int) -> None:
+        self.agent: Agent = agent
+        self.draws: LatencyHistogram = recorder.histogram(agent_id, PHASE_DRAW)
+        self.discards: LatencyHistogram = recorder.histogram(agent_id, PHASE_DISCARD)
+        self.stops: LatencyHistogram = recorder.histogram(agent_id, PHASE_STOP_THE_BUS)
+
+    def draw(self, view: View) -> tuple[Card, bool]:
+        start: int = time.perf_counter_ns()
+        drawn: tuple[Card, bool] = self.agent.draw(view)
+        self.draws.record(time.perf_counter_ns() - start)
+        return drawn
+
+    def discard(self, view: View) -> Card:
+        start: int = time.perf_counter_ns()
+        card: Card = self.agent.discard(view)
+        self.discards.record(time.perf_counter_ns() - start)
+        return card
+
+    def stop_the_bus(self, view: View) -> bool:
+        start: int = time.perf_counter_ns()
+        stopped: bool = self.agent.stop_the_bus(view)
+        self.stops.record(time.perf_counter_ns() - start)
+        return stopped
+
+
+def timed[**P](callback: Callable[P, None], histogram: LatencyHistogram) -> Callable[P, None]:
+    def timed_callback(*args: P.args, **kwargs: P.kwargs) -> None:
+        start: int = time.perf_counter_ns()
+        callback(*args, **kwargs)
+        histogram.record(time.perf_counter_ns() - start)
+
+    return timed_callback
@@ -1,22 +1,111 @@
 import logging
+from collections import OrderedDict
 
 import torch
+from torch import nn
 
 from stop_the_bus.Agent import Agent
-from stop_the_bus.Card import Card
-from stop_the_bus.Encoding import Phase, ViewModule
-from stop_the_bus.Game import View
+from stop_the_bus.Card import DECK_SIZE, Card
+from stop_the_bus.Encoding import ViewModule
+from stop_the_bus.Game import Phase, View
+from stop_the_bus.Hand import hand_mask
+from stop_the_bus.InferenceServer import InferenceServer
 
 DEFAULT_GREEDY: bool = True
 DEFAULT_TEMPERATURE: float = 1.0
 DEFAULT_EPSILON: float = 0.0
+DEFAULT_CACHE_SIZE: int = 0
+
+# The bits of a decision key above the hand mask: the discard's index plus one, 0 for an empty
+# discard pile, then the phase, whether the bus is stopped and whether the viewer can stop it
+KEY_DISCARD_SHIFT: int = DECK_SIZE
+KEY_PHASE_SHIFT: int = KEY_DISCARD_SHIFT + (DECK_SIZE + 1).bit_length()
+KEY_BUS_STOPPED_SHIFT: int = KEY_PHASE_SHIFT + max(Phase).bit_length()
+KEY_CAN_STOP_SHIFT: int = KEY_BUS_STOPPED_SHIFT + 1
 
 
 log: logging.Logger = logging.getLogger(__name__)
 
 
+# Everything a greedy NeuralAgent's decision depends on, packed into an int: what `encode_view`
+# reads, and for STOP whether the viewer can stop the bus, which masks its choice
+def decision_key(view: View, phase: Phase) -> int:
+    key: int = hand_mask(view.hand)
+    if view.discard_pile:
+        key |= (view.discard_pile[-1].index + 1) << KEY_DISCARD_SHIFT
+    key |= phase << KEY_PHASE_SHIFT
+    key |= view.bus_is_stopped << KEY_BUS_STOPPED_SHIFT
+    if phase == Phase.STOP:
+        key |= view.can_stop_the_bus << KEY_CAN_STOP_SHIFT
+    return key
+
+
+class DecisionCache:
+    """The actions chosen for the most recent `capacity` decision keys, least recently used
+    first. Entries are dropped when the weights version they were chosen under changes.
+    """
+
+    __slots__ = ("capacity", "actions", "version", "hits", "misses")
+
+    def __init__(self, capacity: int) -> None:
+        self.capacity: int = capacity
+        self.actions: OrderedDict[int, int] = OrderedDict()
+        self.version: int | None = None
+        self.hits: int = 0
+        self.misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        lookups: int = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def clear(self) -> None:
+        self.actions.clear()
+        self.version = None
+
+    def get(self, key: int, version: int) -> int | None:
+        if version != self.version:
+            self.actions.clear()
+            self.version = version
+        action: int | None = self.actions.get(key)
+        if action is None:
+            self.misses += 1
+            return None
+        self.actions.move_to_end(key)
+        self.hits += 1
+        return action
+
+    def put(self, key: int, action: int, version: int) -> None:
+        # An action chosen while the weights changed, such as during an awaited forward pass,
+        # is stale
+        if version != self.version:
+            return
+        self.actions[key] = action
+        if len(self.actions) > self.capacity:
+            self.actions.popitem(last=False)
+
+
 class NeuralAgent:
-    __slots__ = ("net", "device", "greedy", "temperature", "epsilon")
+    """Acts on the logits of a ViewModule. With a `server`, forward passes go through it, to be
+    batched with those of other agents playing in other threads.
+
+    With a `cache_size`, a greedy agent with no exploration remembers the actions it chose for
+    its most recent decision keys, and repeats them without encoding the view or running the
+    network. Changes to the weights, in place as by an optimizer step or `load_state_dict`, are
+    seen through the version counters of the parameters and empty the cache. Writes the
+    counters miss, such as through a parameter's `.data`, need a call to `invalidate`.
+    """
+
+    __slots__ = (
+        "net",
+        "device",
+        "greedy",
+        "temperature",
+        "epsilon",
+        "server",
+        "cache",
+        "parameters",
+    )
 
     def __init__(
         self,
@@ -24,6 +113,8 @@ class NeuralAgent:
         greedy: bool = DEFAULT_GREEDY,
         temperature: float = DEFAULT_TEMPERATURE,
         epsilon: float = DEFAULT_EPSILON,
+        server: InferenceServer | None = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
     ) -> None:
         self.device: torch.device = net.device
         self.net: ViewModule = net
@@ -31,8 +122,29 @@ class NeuralAgent:
         self.greedy: bool = greedy
         self.temperature: float = temperature
         self.epsilon: float = epsilon
+        self.server: InferenceServer | None = server
+        self.cache: DecisionCache | None = DecisionCache(cache_size) if cache_size > 0 else None
+        self.parameters: list[nn.Parameter] = list(net.parameters())
+
+    @property
+    def weights_version(self) -> int:
+        # `Tensor._version` is private and undocumented: autograd increments it on every in-place
+        # change to a tensor, so the sum only grows, but writes that bypass autograd, through
+        # `.data` or a `detach()`ed alias, leave it unchanged. Such writes call `invalidate`
+        return sum(parameter._version for parameter in self.parameters)
+
+    def invalidate(self) -> None:
+        """Forget every cached decision, as after a change to the weights."""
+        if self.cache is not None:
+            self.cache.clear()
+
+    @property
+    def is_deterministic(self) -> bool:
+        return self.greedy and self.epsilon == 0.0
 
     def _forward(self, view: View, phase: Phase) -> torch.Tensor:
+        if self.server is not None:
+            return self.server.infer(view, phase)
         with torch.no_grad():
             return self.net(view, phase)
 
@@ -64,9 +176,43 @@ class NeuralAgent:
 
         return int(torch.multinomial(p, num_samples=1).item())
 
+    def _action(self, view: View, phase: Phase, logits: torch.Tensor) -> int:
+        match phase:
+            case Phase.DRAW:
+                return self._act(logits, None)
+            case Phase.DISCARD:
+                valid_mask: torch.Tensor = torch.zeros(
+                    logits.shape[-1], dtype=torch.bool, device=logits.device
+                )
+                valid_mask[: len(view.hand)] = True
+                return self._act(logits, mask=valid_mask)
+            case Phase.STOP:
+                mask: torch.Tensor = torch.tensor(
+                    [view.can_stop_the_bus, True], device=logits.device
+                )
+                return self._act(logits, mask=mask)
+
+    def _decide(self, view: View, phase: Phase) -> int:
+        if self.cache is None or not self.is_deterministic:
+            return self._action(view, phase, self._forward(view, phase))
+        key: int = decision_key(view, phase)
+        version: int = self.weights_version
+        action: int | None = self.cache.get(key, version)
+        if action is None:
+            action = self._action(view, phase, self._forward(view, phase))
+            self.cache.put(key, action, version)
+        return action
+
     def draw(self, view: View) -> tuple[Card, bool]:
-        logits: torch.Tensor = self._forward(view, Phase.DRAW)
-        action: int = self._act(logits, None)
+        return self._draw(view, self._decide(view, Phase.DRAW))
+
+    def discard(self, view: View) -> Card:
+        return self._discard(view, self._decide(view, Phase.DISCARD))
+
+    def stop_the_bus(self, view: View) -> bool:
+        return self._stop_the_bus(view, self._decide(view, Phase.STOP))
+
+    def _draw(self, view: View, action: int) -> tuple[Card, bool]:
         take_deck: bool = action == 0
 
         if take_deck:
@@ -74,23 +220,47 @@ class NeuralAgent:
 
         return view.round.draw_from_discard(), take_deck
 
-    def discard(self, view: View) -> Card:
-        logits: torch.Tensor = self._forward(view, Phase.DISCARD)
-        valid_mask: torch.Tensor = torch.zeros(
-            logits.shape[-1], dtype=torch.bool, device=logits.device
-        )
-        valid_mask[: len(view.hand)] = True
-        index: int = self._act(logits, mask=valid_mask)
+    def _discard(self, view: View, action: int) -> Card:
+        return view.round.discard(action)
 
-        return view.round.discard(index)
-
-    def stop_the_bus(self, view: View) -> bool:
-        logits: torch.Tensor = self._forward(view, Phase.STOP)
-        mask: torch.Tensor = torch.tensor([view.can_stop_the_bus, True], device=logits.device)
-        action: int = self._act(logits, mask=mask)
+    def _stop_the_bus(self, view: View, action: int) -> bool:
         return action == 0 and view.round.stop_the_bus()
 
 
+class AsyncNeuralAgent:
+    """A NeuralAgent for `AsyncDriver`, awaiting its forward passes from an InferenceServer so
+    that the tables of one event loop are batched together. The agent's decision cache, if any,
+    is consulted first.
+    """
+
+    __slots__ = ("agent", "server")
+
+    def __init__(self, agent: NeuralAgent, server: InferenceServer) -> None:
+        self.agent: NeuralAgent = agent
+        self.server: InferenceServer = server
+
+    async def _decide(self, view: View, phase: Phase) -> int:
+        agent: NeuralAgent = self.agent
+        if agent.cache is None or not agent.is_deterministic:
+            return agent._action(view, phase, await self.server.infer_async(view, phase))
+        key: int = decision_key(view, phase)
+        version: int = agent.weights_version
+        action: int | None = agent.cache.get(key, version)
+        if action is None:
+            action = agent._action(view, phase, await self.server.infer_async(view, phase))
+            agent.cache.put(key, action, version)
+        return action
+
+    async def draw(self, view: View) -> tuple[Card, bool]:
+        return self.agent._draw(view, await self._decide(view, Phase.DRAW))
+
+    async def discard(self, view: View) -> Card:
+        return self.agent._discard(view, await self._decide(view, Phase.DISCARD))
+
+    async def stop_the_bus(self, view: View) -> bool:
+        return self.agent._stop_the_bus(view, await self._decide(view, Phase.STOP))
+
+
 class SupervisedNeuralAgent:
     def __init__(
         self,
@@ -0,0 +1,31 @@
+import random
+
+from stop_the_bus.Card import Card
+from stop_the_bus.Game import View
+
+DEFAULT_STOP_PROBABILITY: float = 0.5
+
+
+class RandomAgent:
+    """Draws, discards and stops the bus uniformly at random, as a baseline opponent."""
+
+    __slots__ = ("rng", "stop_probability")
+
+    def __init__(
+        self, seed: int | None = None, stop_probability: float = DEFAULT_STOP_PROBABILITY
+    ) -> None:
+        self.rng: random.Random = random.Random(seed)
+        self.stop_probability: float = stop_probability
+
+    def draw(self, view: View) -> tuple[Card, bool]:
+        if self.rng.random() < 0.5:
+            return view.round.draw_from_deck(), True
+        return view.round.draw_from_discard(), False
+
+    def discard(self, view: View) -> Card:
+        return view.round.discard(self.rng.randrange(len(view.hand)))
+
+    def stop_the_bus(self, view: View) -> bool:
+        if view.can_stop_the_bus and self.rng.random() < self.stop_probability:
+            return view.round.stop_the_bus()
+        return False
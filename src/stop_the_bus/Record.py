@@ -0,0 +1,154 @@
+import mmap
+import random
+import struct
+from collections.abc import Iterator, Sequence
+from dataclasses import dataclass
+from pathlib import Path
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.Deck import deal
+from stop_the_bus.Driver import DEFAULT_MAX_TURN_COUNT, Driver
+from stop_the_bus.Game import (
+    DEFAULT_INITIAL_LIVES,
+    MOVE_ADVANCE_TURN,
+    MOVE_DISCARD,
+    MOVE_DRAW_FROM_DECK,
+    MOVE_DRAW_FROM_DISCARD,
+    MOVE_FIELD_BITS,
+    MOVE_KIND_MASK,
+    MOVE_STOP_THE_BUS,
+    Game,
+    Round,
+)
+from stop_the_bus.Hand import Hand
+from stop_the_bus.Tournament import GameResult
+
+# Each turn of a game is recorded as one byte:
+#   bits 0-1    where the card was drawn from, or RECORD_NO_DRAW on the first turn of a round
+#   bits 2-3    the hand slot discarded
+#   bit 4       whether the bus was stopped
+RECORD_NO_DRAW: int = 0
+RECORD_DRAW_FROM_DECK: int = 1
+RECORD_DRAW_FROM_DISCARD: int = 2
+RECORD_DRAW_MASK: int = 0b11
+RECORD_SLOT_SHIFT: int = 2
+RECORD_SLOT_MASK: int = 0b11
+RECORD_STOP: int = 1 << 4
+
+# Each record in a file is a header followed by one byte per turn:
+#   seed (u64), player count (u8), lives (u8), turn count (u32), little-endian
+RECORD_HEADER: struct.Struct = struct.Struct("<QBBI")
+
+
+@dataclass(frozen=True, slots=True)
+class GameRecord:
+    """Everything needed to replay a game: the seed of the `random.Random` that shuffled its
+    decks and every turn's actions, across all its rounds.
+    """
+
+    seed: int
+    player_count: int
+    lives: int
+    actions: bytes
+
+    def to_bytes(self) -> bytes:
+        header: bytes = RECORD_HEADER.pack(
+            self.seed, self.player_count, self.lives, len(self.actions)
+        )
+        return header + self.actions
+
+
+# The actions of each turn of a round, from its move history
+def encode_history(history: Sequence[int]) -> bytes:
+    actions: bytearray = bytearray()
+    action: int = RECORD_NO_DRAW
+    for move in history:
+        kind: int = move & MOVE_KIND_MASK
+        if kind == MOVE_DRAW_FROM_DECK:
+            action = RECORD_DRAW_FROM_DECK
+        elif kind == MOVE_DRAW_FROM_DISCARD:
+            action = RECORD_DRAW_FROM_DISCARD
+        elif kind == MOVE_DISCARD:
+            action |= (move >> MOVE_FIELD_BITS & MOVE_KIND_MASK) << RECORD_SLOT_SHIFT
+        elif kind == MOVE_STOP_THE_BUS:
+            action |= RECORD_STOP
+        elif kind == MOVE_ADVANCE_TURN:
+            actions.append(action)
+            action = RECORD_NO_DRAW
+    return bytes(actions)
+
+
+def record_game(
+    agents: list[Agent],
+    seed: int,
+    lives: int = DEFAULT_INITIAL_LIVES,
+    max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+) -> tuple[int, GameRecord]:
+    """Play a game with decks shuffled by `random.Random(seed)`, returning the winner as
+    `Driver.drive` does and the game's record.
+    """
+    driver: Driver = Driver(agents, lives, max_turn_count, random.Random(seed), keep_histories=True)
+    winner: int = driver.drive()
+    assert driver.histories is not None
+    actions: bytes = b"".join(encode_history(history) for history in driver.histories)
+    return winner, GameRecord(seed, len(agents), lives, actions)
+
+
+def replay(record: GameRecord) -> GameResult:
+    """Re-deal a recorded game and apply its actions. Rounds are dealt as by `Game.start_round`
+    and moves are made on their decks and hands directly, skipping the logging and move history
+    of `Game` and `Round`'s methods, which cost far more than the moves themselves. A record
+    that stops mid-round, because the game hit the turn limit, replays as aborted with winner -1.
+    """
+    game: Game = Game(record.player_count, record.lives, random.Random(record.seed))
+    round: Round = Round(game, list(game.live_players), game.rng)
+    rounds: int = 1
+    turns: int = 0
+    eliminations: list[int] = []
+    for action in record.actions:
+        hand: Hand = round.hands[round.turn % len(round.players)]
+        draw: int = action & RECORD_DRAW_MASK
+        if draw == RECORD_DRAW_FROM_DECK:
+            if len(round.deck) == 0:
+                round.reshuffle(round.deck, round.discard_pile)
+            deal(round.deck, hand)
+        elif draw == RECORD_DRAW_FROM_DISCARD:
+            hand.append(round.discard_pile.pop())
+        round.discard_pile.append(hand.pop(action >> RECORD_SLOT_SHIFT & RECORD_SLOT_MASK))
+        if action & RECORD_STOP:
+            round.turns_remaining = len(round.players)
+        round.turn += 1
+        if round.turns_remaining is not None:
+            round.turns_remaining -= 1
+            if round.turns_remaining == 0:
+                turns += round.turn
+                for i, penalty in enumerate(round.penalties()):
+                    game.lives[round.players[i]] -= penalty
+                eliminations.extend(p for p in round.players if game.lives[p] <= 0)
+                if game.live_player_count <= 1:
+                    [winner] = game.live_players
+                    return GameResult(record.seed, winner, rounds, turns, tuple(eliminations))
+                game.rotate_dealer()
+                round = Round(game, list(game.live_players), game.rng)
+                rounds += 1
+    return GameResult(record.seed, -1, rounds, turns + round.turn, tuple(eliminations))
+
+
+def append_records(path: str | Path, records: Sequence[GameRecord]) -> None:
+    with open(path, "ab") as file:
+        file.write(b"".join(record.to_bytes() for record in records))
+
+
+def read_records(path: str | Path) -> Iterator[GameRecord]:
+    """The records in a file, in the order they were appended, read through a memory map."""
+    with open(path, "rb") as file:
+        if Path(path).stat().st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            offset: int = 0
+            while offset < len(buffer):
+                seed, player_count, lives, turn_count = RECORD_HEADER.unpack_from(buffer, offset)
+                offset += RECORD_HEADER.size
+                actions: bytes = buffer[offset : offset + turn_count]
+                offset += turn_count
+                yield GameRecord(seed, player_count, lives, actions)
@@ -0,0 +1,139 @@
+import mmap
+from collections.abc import Sequence
+from math import comb
+from pathlib import Path
+from types import TracebackType
+
+import numpy as np
+import numpy.typing as npt
+
+from stop_the_bus.Card import DECK_SIZE, Card
+from stop_the_bus.Game import Phase, View
+from stop_the_bus.Hand import MAX_HAND_SIZE, MIN_HAND_SIZE, hand_rank
+
+# A policy table holds the action a greedy agent takes for every input its network can be given
+# in the phases a `Driver` asks for, two bits per action, four actions per byte with the first in
+# the low bits. Each phase is a section, for hands of the size held in that phase:
+#   DRAW       3 cards, before drawing
+#   DISCARD    4 cards
+#   STOP       3 cards, after discarding
+# and within a section, actions are in order of
+#   (hand rank * DISCARD_CHOICES + discard choice) * BUS_STOPPED_CHOICES + bus stopped
+# where hands are ranked by `Hand.hand_rank` and the discard choice is the top card's index plus
+# one, or 0 for an empty discard pile
+PHASE_HAND_SIZES: dict[Phase, int] = {
+    Phase.DRAW: MIN_HAND_SIZE,
+    Phase.DISCARD: MAX_HAND_SIZE,
+    Phase.STOP: MIN_HAND_SIZE,
+}
+DISCARD_CHOICES: int = DECK_SIZE + 1
+BUS_STOPPED_CHOICES: int = 2
+HAND_ENTRY_COUNT: int = DISCARD_CHOICES * BUS_STOPPED_CHOICES
+PHASE_ENTRY_COUNTS: dict[Phase, int] = {
+    phase: comb(DECK_SIZE, size) * HAND_ENTRY_COUNT for phase, size in PHASE_HAND_SIZES.items()
+}
+PHASE_ENTRY_OFFSETS: dict[Phase, int] = {
+    phase: sum(PHASE_ENTRY_COUNTS[earlier] for earlier in Phase if earlier < phase)
+    for phase in Phase
+}
+TABLE_ENTRY_COUNT: int = sum(PHASE_ENTRY_COUNTS.values())
+
+ACTION_BITS: int = 2
+ACTION_MASK: int = (1 << ACTION_BITS) - 1
+ACTIONS_PER_BYTE: int = 8 // ACTION_BITS
+
+TABLE_MAGIC: bytes = b"STBT"
+TABLE_SIZE: int = len(TABLE_MAGIC) + -(-TABLE_ENTRY_COUNT // ACTIONS_PER_BYTE)
+
+
+# The position of a decision's action within its phase's section
+def table_entry(hand: Sequence[Card], discard_top: Card | None, bus_is_stopped: bool) -> int:
+    discard: int = 0 if discard_top is None else discard_top.index + 1
+    rank: int = hand_rank([card.index for card in hand])
+    return (rank * DISCARD_CHOICES + discard) * BUS_STOPPED_CHOICES + bus_is_stopped
+
+
+def write_table(path: str | Path, actions: npt.NDArray[np.uint8]) -> None:
+    """Write a policy table from its actions, TABLE_ENTRY_COUNT of them in table order."""
+    if actions.shape != (TABLE_ENTRY_COUNT,):
+        raise ValueError(f"Expected {TABLE_ENTRY_COUNT} actions, got {actions.shape}")
+    if (actions > ACTION_MASK).any():
+        raise ValueError(f"Actions must fit in {ACTION_BITS} bits")
+    padded: npt.NDArray[np.uint8] = np.zeros(
+        (TABLE_SIZE - len(TABLE_MAGIC)) * ACTIONS_PER_BYTE, dtype=np.uint8
+    )
+    padded[:TABLE_ENTRY_COUNT] = actions
+    shifts: npt.NDArray[np.uint8] = np.arange(0, 8, ACTION_BITS, dtype=np.uint8)
+    packed: npt.NDArray[np.uint8] = np.bitwise_or.reduce(
+        padded.reshape(-1, ACTIONS_PER_BYTE) << shifts, axis=1
+    ).astype(np.uint8)
+    with open(path, "wb") as file:
+        file.write(TABLE_MAGIC)
+        file.write(packed.tobytes())
+
+
+class PolicyTable:
+    """A policy table read through a memory map, so that processes reading the same file share
+    its pages. Close it, or use it as a context manager, once done.
+    """
+
+    __slots__ = ("buffer",)
+
+    def __init__(self, path: str | Path) -> None:
+        with open(path, "rb") as file:
+            self.buffer: mmap.mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.buffer) != TABLE_SIZE or self.buffer[: len(TABLE_MAGIC)] != TABLE_MAGIC:
+            self.buffer.close()
+            raise ValueError(f"{path} is not a policy table")
+
+    def __enter__(self) -> "PolicyTable":
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        traceback: TracebackType | None,
+    ) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.buffer.close()
+
+    def action(self, view: View, phase: Phase) -> int:
+        if len(view.hand) != PHASE_HAND_SIZES[phase]:
+            raise ValueError(f"No {phase.name} actions for hands of {len(view.hand)} cards")
+        index: int = PHASE_ENTRY_OFFSETS[phase] + table_entry(
+            view.hand, view.discard_pile[-1] if view.discard_pile else None, view.bus_is_stopped
+        )
+        byte: int = self.buffer[len(TABLE_MAGIC) + index // ACTIONS_PER_BYTE]
+        return byte >> (index % ACTIONS_PER_BYTE * ACTION_BITS) & ACTION_MASK
+
+
+class TablePolicyAgent:
+    """Plays the decisions of a policy table, as distilled from a network by
+    `Distillation.distill`, with no network, so without torch.
+    """
+
+    __slots__ = ("table",)
+
+    def __init__(self, table: PolicyTable) -> None:
+        self.table: PolicyTable = table
+
+    def draw(self, view: View) -> tuple[Card, bool]:
+        take_deck: bool = self.table.action(view, Phase.DRAW) == 0
+
+        if take_deck:
+            return view.round.draw_from_deck(), take_deck
+
+        return view.round.draw_from_discard(), take_deck
+
+    def discard(self, view: View) -> Card:
+        return view.round.discard(self.table.action(view, Phase.DISCARD))
+
+    def stop_the_bus(self, view: View) -> bool:
+        return (
+            self.table.action(view, Phase.STOP) == 0
+            and view.can_stop_the_bus
+            and view.round.stop_the_bus()
+        )
@@ -0,0 +1,125 @@
+import logging
+import multiprocessing
+import random
+from collections.abc import Callable, Sequence
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+
+import numpy as np
+
+from stop_the_bus.Agent import Agent
+from stop_the_bus.Driver import DEFAULT_MAX_TURN_COUNT, Driver
+from stop_the_bus.Game import DEFAULT_INITIAL_LIVES
+from stop_the_bus.Log import setup_logging
+
+DEFAULT_CHUNK_SIZE: int = 64
+DEFAULT_WORKER_LOG_LEVEL: int = logging.WARNING
+
+# Builds one player's agent from a seed. Factories are sent to worker processes, so they must be
+# picklable: a class, a module-level function or a functools.partial of one
+type AgentFactory = Callable[[int], Agent]
+
+
+@dataclass(frozen=True, slots=True)
+class GameResult:
+    """The outcome of one game, with `winner` -1 if the game was aborted at the turn limit."""
+
+    seed: int
+    winner: int
+    rounds: int
+    turns: int
+    eliminations: tuple[int, ...]
+
+
+@dataclass(frozen=True, slots=True)
+class Chunk:
+    """A batch of consecutive games played by one worker with one set of agents."""
+
+    factories: Sequence[AgentFactory]
+    agent_seed: int
+    game_seeds: list[int]
+    lives: int
+    max_turn_count: int
+
+
+def play_chunk(chunk: Chunk) -> list[GameResult]:
+    agent_seeds: list[int] = (
+        np.random.SeedSequence(chunk.agent_seed).generate_state(len(chunk.factories)).tolist()
+    )
+    agents: list[Agent] = [
+        factory(seed) for factory, seed in zip(chunk.factories, agent_seeds, strict=True)
+    ]
+    results: list[GameResult] = []
+    for seed in chunk.game_seeds:
+        driver: Driver = Driver(agents, chunk.lives, chunk.max_turn_count, random.Random(seed))
+        winner: int = driver.drive()
+        results.append(
+            GameResult(
+                seed, winner, driver.round_count, driver.turn_count, tuple(driver.eliminations)
+            )
+        )
+    return results
+
+
+def chunks(
+    factories: Sequence[AgentFactory],
+    game_count: int,
+    seed: int,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    lives: int = DEFAULT_INITIAL_LIVES,
+    max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+) -> list[Chunk]:
+    """Split a tournament into chunks. Every game and every chunk's agents get their own seed
+    from `seed`, so results depend only on `seed` and `chunk_size`, not on how the chunks are
+    scheduled across workers.
+    """
+    game_seeds: list[int] = np.random.SeedSequence(seed).generate_state(game_count).tolist()
+    chunk_count: int = -(-game_count // chunk_size)
+    agent_seeds: list[np.random.SeedSequence] = np.random.SeedSequence(seed).spawn(chunk_count)
+    return [
+        Chunk(
+            factories,
+            int(agent_seed.generate_state(1)[0]),
+            game_seeds[i * chunk_size : (i + 1) * chunk_size],
+            lives,
+            max_turn_count,
+        )
+        for i, agent_seed in enumerate(agent_seeds)
+    ]
+
+
+def _initialize_worker(log_level: int) -> None:
+    setup_logging(level=log_level)
+
+
+def run_tournament(
+    factories: Sequence[AgentFactory],
+    game_count: int,
+    seed: int = 0,
+    workers: int | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    lives: int = DEFAULT_INITIAL_LIVES,
+    max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+    log_level: int = DEFAULT_WORKER_LOG_LEVEL,
+) -> list[GameResult]:
+    """Play `game_count` games between agents built from `factories`, one per player, across a
+    pool of `workers` processes (all cores by default). Results are in game order. Workers log
+    at `log_level`, since debug logging every game dominates the cost of playing it. Workers are
+    spawned rather than forked, as the logging listener thread makes forking unsafe.
+    """
+    work: list[Chunk] = chunks(factories, game_count, seed, chunk_size, lives, max_turn_count)
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_initialize_worker,
+        initargs=(log_level,),
+    ) as executor:
+        return [result for results in executor.map(play_chunk, work) for result in results]
+
+
+def win_counts(results: Sequence[GameResult], player_count: int) -> list[int]:
+    counts: list[int] = [0] * player_count
+    for result in results:
+        if result.winner >= 0:
+            counts[result.winner] += 1
+    return counts
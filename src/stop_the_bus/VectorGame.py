@@ -0,0 +1,441 @@
+from __future__ import annotations
+
+import numpy as np
+import numpy.typing as npt
+
+from stop_the_bus.Card import DECK_SIZE, NO_CARD, Rank
+from stop_the_bus.Deck import NEW_DECK_ORDER
+from stop_the_bus.Driver import DEFAULT_MAX_TURN_COUNT
+from stop_the_bus.Game import (
+    DEFAULT_INITIAL_LIVES,
+    OTHER_PRILE_PENALTY,
+    PRILE_OF_THREES_PENALTY,
+    Round,
+)
+from stop_the_bus.Hand import (
+    CAN_STOP_BIT,
+    CARD_RANK_INDEX_ARRAY,
+    MAX_HAND_SIZE,
+    MIN_HAND_SIZE,
+    PRILE_BIT,
+    VALUE_MASK,
+    evaluate_hands,
+    three_card_entries,
+)
+
+type IntArray = npt.NDArray[np.int64]
+type BoolArray = npt.NDArray[np.bool_]
+
+NO_PLAYER: int = -1
+NO_WINNER: int = -1
+BUS_NOT_STOPPED: int = -1
+
+
+class VectorGame:
+    """Many independent games of Stop the Bus played in lockstep. Each of the `table_count`
+    tables follows the rules of `Game`, with its state held in NumPy arrays indexed by table.
+    """
+
+    __slots__ = (
+        "table_count",
+        "player_count",
+        "lives",
+        "dealer",
+        "rng",
+        "max_turn_count",
+        "over",
+        "winner",
+        "round",
+    )
+
+    def __init__(
+        self,
+        table_count: int,
+        player_count: int,
+        lives: int = DEFAULT_INITIAL_LIVES,
+        rng: np.random.Generator | None = None,
+        max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+    ) -> None:
+        self.table_count: int = table_count
+        self.player_count: int = player_count
+        self.lives: IntArray = np.full((table_count, player_count), lives, dtype=np.int64)
+        self.dealer: IntArray = np.zeros(table_count, dtype=np.int64)
+        self.rng: np.random.Generator = np.random.default_rng() if rng is None else rng
+        self.max_turn_count: int = max_turn_count
+        self.over: BoolArray = np.zeros(table_count, dtype=np.bool_)
+        self.winner: IntArray = np.full(table_count, NO_WINNER, dtype=np.int64)
+        self.round: VectorRound = VectorRound(self)
+        self.round.deal(self.playing)
+
+    @staticmethod
+    def from_rounds(
+        rounds: list[Round],
+        rng: np.random.Generator | None = None,
+        max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+    ) -> VectorGame:
+        """A vector game with one table per round, copying each round's game and round state."""
+        game: VectorGame = VectorGame(
+            len(rounds), rounds[0].game.player_count, rng=rng, max_turn_count=max_turn_count
+        )
+        game.lives[:] = [round.game.lives for round in rounds]
+        game.dealer[:] = [round.game.dealer for round in rounds]
+        for table, round in enumerate(rounds):
+            game.round.load(table, round)
+        return game
+
+    @staticmethod
+    def from_round(
+        round: Round,
+        table_count: int,
+        rng: np.random.Generator | None = None,
+        max_turn_count: int = DEFAULT_MAX_TURN_COUNT,
+    ) -> VectorGame:
+        """A vector game with `table_count` tables that all start from a copy of one round."""
+        game: VectorGame = VectorGame.from_rounds([round], rng, max_turn_count)
+        copies: VectorGame = VectorGame(
+            table_count, game.player_count, rng=game.rng, max_turn_count=max_turn_count
+        )
+        copies.lives[:] = game.lives
+        copies.dealer[:] = game.dealer
+        for name in VectorRound.__slots__:
+            if name != "game":
+                getattr(copies.round, name)[:] = getattr(game.round, name)
+        return copies
+
+    @property
+    def playing(self) -> BoolArray:
+        return ~self.over
+
+    @property
+    def live_player_count(self) -> IntArray:
+        return np.asarray((self.lives > 0).sum(axis=1), dtype=np.int64)
+
+    def live_players(self) -> tuple[IntArray, IntArray]:
+        """Each table's live players in seating order, starting after the dealer and padded with
+        NO_PLAYER, and the number of live players at each table.
+        """
+        order: IntArray = (self.dealer[:, None] + 1 + np.arange(self.player_count)) % (
+            self.player_count
+        )
+        alive: BoolArray = np.take_along_axis(self.lives, order, axis=1) > 0
+        by_liveness: IntArray = np.argsort(~alive, axis=1, kind="stable")
+        players: IntArray = np.take_along_axis(order, by_liveness, axis=1)
+        players[~np.take_along_axis(alive, by_liveness, axis=1)] = NO_PLAYER
+        return players, np.asarray(alive.sum(axis=1), dtype=np.int64)
+
+    def rotate_dealer(self, where: BoolArray) -> None:
+        players, counts = self.live_players()
+        rotate: BoolArray = where & (counts > 0)
+        self.dealer[rotate] = players[rotate, 0]
+
+    def finish_rounds(self) -> BoolArray:
+        """End every round that has no turns remaining, rotate those tables' dealers and deal
+        them a new round, or finish their game if at most one player is left alive. Games whose
+        round has run past `max_turn_count` are aborted without a winner. Returns the tables
+        whose round ended.
+        """
+        playing: BoolArray = self.playing
+        aborted: BoolArray = (
+            playing & self.round.has_turns_remaining & (self.round.turn > self.max_turn_count)
+        )
+        self.over |= aborted
+
+        ended: BoolArray = playing & ~self.round.has_turns_remaining
+        self.round.end_round(ended)
+        self.rotate_dealer(ended)
+
+        players, counts = self.live_players()
+        finished: BoolArray = ended & (counts <= 1)
+        self.winner[finished & (counts == 1)] = players[finished & (counts == 1), 0]
+        self.over |= finished
+
+        self.round.deal(ended & ~finished)
+        return ended
+
+
+class VectorRound:
+    """The current round at every table of a `VectorGame`, held as arrays indexed by table and
+    seat. Seat i is the i-th player dealt to, as in `Round.players`. Every action applies to
+    the current seat of each table selected by the `where` mask.
+    """
+
+    __slots__ = (
+        "game",
+        "players",
+        "seat_count",
+        "deck",
+        "deck_size",
+        "discard_pile",
+        "discard_pile_size",
+        "hands",
+        "hand_size",
+        "certain_holds",
+        "turn",
+        "turns_remaining",
+    )
+
+    def __init__(self, game: VectorGame) -> None:
+        tables: int = game.table_count
+        self.game: VectorGame = game
+        self.players: IntArray = np.full((tables, game.player_count), NO_PLAYER, dtype=np.int64)
+        self.seat_count: IntArray = np.zeros(tables, dtype=np.int64)
+        self.deck: npt.NDArray[np.uint8] = np.zeros((tables, DECK_SIZE), dtype=np.uint8)
+        self.deck_size: IntArray = np.zeros(tables, dtype=np.int64)
+        self.discard_pile: npt.NDArray[np.uint8] = np.zeros((tables, DECK_SIZE), dtype=np.uint8)
+        self.discard_pile_size: IntArray = np.zeros(tables, dtype=np.int64)
+        self.hands: IntArray = np.full(
+            (tables, game.player_count, MAX_HAND_SIZE), NO_CARD, dtype=np.int64
+        )
+        self.hand_size: IntArray = np.zeros((tables, game.player_count), dtype=np.int64)
+        self.certain_holds: npt.NDArray[np.uint64] = np.zeros(
+            (tables, game.player_count), dtype=np.uint64
+        )
+        self.turn: IntArray = np.zeros(tables, dtype=np.int64)
+        self.turns_remaining: IntArray = np.full(tables, BUS_NOT_STOPPED, dtype=np.int64)
+
+    def deal(self, where: BoolArray) -> None:
+        """Start a new round at the selected tables: seat the live players, shuffle a fresh
+        deck and deal three cards to each seat, plus a fourth to the first seat.
+        """
+        tables: IntArray = np.flatnonzero(where)
+        if tables.size == 0:
+            return
+
+        players, counts = self.game.live_players()
+        self.players[tables] = players[tables]
+        self.seat_count[tables] = counts[tables]
+
+        decks: npt.NDArray[np.uint8] = np.tile(
+            np.frombuffer(NEW_DECK_ORDER, dtype=np.uint8), (tables.size, 1)
+        )
+        self.deck[tables] = self.game.rng.permuted(decks, axis=1)
+
+        seats: IntArray = np.arange(self.game.player_count)
+        seated: BoolArray = seats[None, :] < counts[tables, None]
+        self.hands[tables] = NO_CARD
+        for slot in range(MIN_HAND_SIZE):
+            positions: IntArray = DECK_SIZE - 1 - (slot * counts[tables, None] + seats[None, :])
+            dealt: IntArray = np.take_along_axis(
+                self.deck[tables], np.maximum(positions, 0), axis=1
+            ).astype(np.int64)
+            self.hands[tables, :, slot] = np.where(seated, dealt, NO_CARD)
+        self.hands[tables, 0, MIN_HAND_SIZE] = self.deck[
+            tables, DECK_SIZE - 1 - MIN_HAND_SIZE * counts[tables]
+        ]
+
+        self.hand_size[tables] = np.where(seated, MIN_HAND_SIZE, 0)
+        self.hand_size[tables, 0] = MAX_HAND_SIZE
+        self.deck_size[tables] = DECK_SIZE - MIN_HAND_SIZE * counts[tables] - 1
+        self.discard_pile_size[tables] = 0
+        self.certain_holds[tables] = 0
+        self.turn[tables] = 0
+        self.turns_remaining[tables] = BUS_NOT_STOPPED
+
+    def load(self, table: int, round: Round) -> None:
+        """Copy the state of a scalar round into one table."""
+        self.players[table] = NO_PLAYER
+        self.players[table, : round.player_count] = round.players
+        self.seat_count[table] = round.player_count
+        self.deck[table, : len(round.deck)] = np.frombuffer(round.deck.indices, dtype=np.uint8)
+        self.deck_size[table] = len(round.deck)
+        self.discard_pile[table, : len(round.discard_pile)] = np.frombuffer(
+            round.discard_pile.indices, dtype=np.uint8
+        )
+        self.discard_pile_size[table] = len(round.discard_pile)
+        self.hands[table] = NO_CARD
+        self.hand_size[table] = 0
+        self.certain_holds[table] = 0
+        for seat, hand in enumerate(round.hands):
+            self.hands[table, seat, : len(hand)] = [card.index for card in hand]
+            self.hand_size[table, seat] = len(hand)
+            for card in round.certain_holds[seat]:
+                self.certain_holds[table, seat] |= np.uint64(1) << np.uint64(card.index)
+        self.turn[table] = round.turn
+        self.turns_remaining[table] = (
+            BUS_NOT_STOPPED if round.turns_remaining is None else round.turns_remaining
+        )
+
+    @property
+    def current_index(self) -> IntArray:
+        return np.asarray(self.turn % np.maximum(self.seat_count, 1), dtype=np.int64)
+
+    @property
+    def current_player(self) -> IntArray:
+        return np.take_along_axis(self.players, self.current_index[:, None], axis=1)[:, 0]
+
+    @property
+    def current_hand(self) -> IntArray:
+        tables: IntArray = np.arange(self.game.table_count)
+        return self.hands[tables, self.current_index]
+
+    @property
+    def current_hand_size(self) -> IntArray:
+        tables: IntArray = np.arange(self.game.table_count)
+        return self.hand_size[tables, self.current_index]
+
+    @property
+    def discard_top(self) -> IntArray:
+        """The top card of each table's discard pile, or NO_CARD if the pile is empty."""
+        tables: IntArray = np.arange(self.game.table_count)
+        top: IntArray = self.discard_pile[tables, np.maximum(self.discard_pile_size - 1, 0)].astype(
+            np.int64
+        )
+        return np.where(self.discard_pile_size > 0, top, NO_CARD)
+
+    @property
+    def is_first_turn(self) -> BoolArray:
+        return np.equal(self.turn, 0)
+
+    @property
+    def bus_is_stopped(self) -> BoolArray:
+        return np.not_equal(self.turns_remaining, BUS_NOT_STOPPED)
+
+    @property
+    def has_turns_remaining(self) -> BoolArray:
+        return np.not_equal(self.turns_remaining, 0)
+
+    def _select(self, where: BoolArray | None) -> tuple[IntArray, IntArray]:
+        selected: BoolArray = self.game.playing if where is None else where & self.game.playing
+        tables: IntArray = np.flatnonzero(selected)
+        return tables, self.current_index[tables]
+
+    def _add_to_hands(self, tables: IntArray, seats: IntArray, cards: IntArray) -> None:
+        self.hands[tables, seats, self.hand_size[tables, seats]] = cards
+        self.hand_size[tables, seats] += 1
+
+    def _push_discard(self, tables: IntArray, cards: IntArray) -> None:
+        self.discard_pile[tables, self.discard_pile_size[tables]] = cards
+        self.discard_pile_size[tables] += 1
+
+    def _pop_discard(self, tables: IntArray) -> IntArray:
+        self.discard_pile_size[tables] -= 1
+        return self.discard_pile[tables, self.discard_pile_size[tables]].astype(np.int64)
+
+    def reshuffle(self, table: int) -> None:
+        """Shuffle all but the top card of one table's discard pile back into its deck."""
+        size: int = int(self.discard_pile_size[table])
+        top: np.uint8 = self.discard_pile[table, size - 1]
+        self.deck[table, : size - 1] = self.game.rng.permutation(
+            self.discard_pile[table, : size - 1]
+        )
+        self.deck_size[table] = size - 1
+        self.discard_pile[table, 0] = top
+        self.discard_pile_size[table] = 1
+
+    def draw_from_deck(self, where: BoolArray | None = None) -> IntArray:
+        """Draw the top card of the deck into the current hand at each selected table. Returns
+        the drawn cards, with NO_CARD at tables that did not draw.
+        """
+        tables, seats = self._select(where)
+        for table in tables[self.deck_size[tables] == 0]:
+            self.reshuffle(int(table))
+
+        self.deck_size[tables] -= 1
+        cards: IntArray = self.deck[tables, self.deck_size[tables]].astype(np.int64)
+        self._add_to_hands(tables, seats, cards)
+
+        drawn: IntArray = np.full(self.game.table_count, NO_CARD, dtype=np.int64)
+        drawn[tables] = cards
+        return drawn
+
+    def draw_from_discard(self, where: BoolArray | None = None) -> IntArray:
+        """Draw the top card of the discard pile into the current hand at each selected table,
+        recording it as a certain hold. Returns the drawn cards, with NO_CARD elsewhere.
+        """
+        tables, seats = self._select(where)
+        cards: IntArray = self._pop_discard(tables)
+        self._add_to_hands(tables, seats, cards)
+        self.certain_holds[tables, seats] |= np.left_shift(np.uint64(1), cards.astype(np.uint64))
+
+        drawn: IntArray = np.full(self.game.table_count, NO_CARD, dtype=np.int64)
+        drawn[tables] = cards
+        return drawn
+
+    def discard(self, slots: npt.ArrayLike, where: BoolArray | None = None) -> IntArray:
+        """Discard the card at the given hand slot of the current hand at each selected table,
+        shifting the later cards down like `list.pop`. `slots` has one entry per table. Returns
+        the discarded cards, with NO_CARD elsewhere.
+        """
+        tables, seats = self._select(where)
+        chosen: IntArray = np.asarray(slots, dtype=np.int64)[tables]
+        hands: IntArray = self.hands[tables, seats]
+        cards: IntArray = hands[np.arange(tables.size), chosen]
+
+        positions: IntArray = np.arange(MAX_HAND_SIZE)[None, :]
+        sources: IntArray = positions + (positions >= chosen[:, None])
+        shifted: IntArray = np.take_along_axis(
+            hands, np.minimum(sources, MAX_HAND_SIZE - 1), axis=1
+        )
+        shifted[sources >= MAX_HAND_SIZE] = NO_CARD
+        self.hands[tables, seats] = shifted
+        self.hand_size[tables, seats] -= 1
+
+        self._push_discard(tables, cards)
+        self.certain_holds[tables, seats] &= ~np.left_shift(np.uint64(1), cards.astype(np.uint64))
+
+        discarded: IntArray = np.full(self.game.table_count, NO_CARD, dtype=np.int64)
+        discarded[tables] = cards
+        return discarded
+
+    def stop_the_bus(self, where: BoolArray | None = None) -> None:
+        tables, _ = self._select(where)
+        self.turns_remaining[tables] = self.seat_count[tables]
+
+    def can_stop_the_bus(self) -> BoolArray:
+        """Whether the current player at each table may stop the bus with their current hand."""
+        hands: IntArray = self.current_hand
+        sizes: IntArray = self.current_hand_size
+        eligible: BoolArray = np.zeros(self.game.table_count, dtype=np.bool_)
+        tables: IntArray = np.flatnonzero(sizes == MIN_HAND_SIZE)
+        if tables.size:
+            eligible[tables] = three_card_entries(hands[tables, :MIN_HAND_SIZE]) & CAN_STOP_BIT
+        tables = np.flatnonzero(sizes == MAX_HAND_SIZE)
+        if tables.size:
+            eligible[tables] = evaluate_hands(hands[tables]).can_stop
+        return eligible & ~self.bus_is_stopped & self.game.playing
+
+    def advance_turn(self, where: BoolArray | None = None) -> None:
+        tables, _ = self._select(where)
+        self.turn[tables] += 1
+        stopped: IntArray = tables[self.turns_remaining[tables] > 0]
+        self.turns_remaining[stopped] -= 1
+
+    def end_round(self, where: BoolArray) -> IntArray:
+        """Score the selected tables' rounds with the rules of `Round.end_round` and take the
+        lives lost from each player. Returns the lives lost, indexed by table and seat.
+        """
+        tables: IntArray = np.flatnonzero(where)
+        seat_count: int = self.game.player_count
+        penalties: IntArray = np.zeros((self.game.table_count, seat_count), dtype=np.int64)
+        if tables.size == 0:
+            return penalties
+
+        seated: BoolArray = np.arange(seat_count)[None, :] < self.seat_count[tables, None]
+        hands: IntArray = np.where(seated[:, :, None], self.hands[tables, :, :MIN_HAND_SIZE], 0)
+        entries: IntArray = three_card_entries(hands.reshape(-1, MIN_HAND_SIZE))
+        values: IntArray = (entries & VALUE_MASK).reshape(tables.size, seat_count)
+        is_prile: BoolArray = (entries & PRILE_BIT != 0).reshape(tables.size, seat_count)
+
+        high: IntArray = np.where(seated, values, np.iinfo(np.int64).min).max(axis=1)
+        low: IntArray = np.where(seated, values, np.iinfo(np.int64).max).min(axis=1)
+        winners: BoolArray = seated & (values == high[:, None])
+        winner: IntArray = np.argmax(winners, axis=1)
+        rows: IntArray = np.arange(tables.size)
+        prile_win: BoolArray = (winners.sum(axis=1) == 1) & is_prile[rows, winner]
+
+        winning_rank: IntArray = CARD_RANK_INDEX_ARRAY[hands[rows, winner, 0]]
+        prile_penalty: IntArray = np.where(
+            winning_rank == Rank.Three.index, PRILE_OF_THREES_PENALTY, OTHER_PRILE_PENALTY
+        )
+        losers: BoolArray = np.where(
+            prile_win[:, None], seated & ~winners, seated & (values == low[:, None])
+        )
+        lost: IntArray = np.where(losers, np.where(prile_win, prile_penalty, 1)[:, None], 0).astype(
+            np.int64
+        )
+
+        penalties[tables] = lost
+        players: IntArray = self.players[tables]
+        table_rows, seats = np.nonzero(seated)
+        self.game.lives[tables[table_rows], players[table_rows, seats]] -= lost[table_rows, seats]
+        return penalties
@@ -1,36 +1,159 @@
+import asyncio
+import itertools
+import json
+import math
+import os
+import pickle
+import random
+import subprocess
+import sys
 from collections import deque
-from collections.abc import Sequence
+from collections.abc import Callable, Sequence
+from concurrent.futures import Future
+from pathlib import Path
 
 import hypothesis.strategies as st
+import numpy as np
+import numpy.typing as npt
+import pytest
 import torch
 from hypothesis import given
 from hypothesis.strategies import from_type
 
-from stop_the_bus.Card import Card, Rank, Suit
-from stop_the_bus.Datalog import Database, query
+from stop_the_bus.Agent import (
+    Agent,
+    DiscardEvent,
+    DrawEvent,
+    Event,
+    RoundStartEvent,
+    StopTheBusEvent,
+)
+from stop_the_bus.AsyncDriver import AsyncDriver, drive_tables
+from stop_the_bus.Canonicalization import (
+    Situation,
+    canonicalize,
+    invert_permutation,
+    relabel_card,
+    relabel_mask,
+    relabel_situation,
+)
+from stop_the_bus.Card import DECK_SIZE, NO_CARD, Card, Rank, Suit
+from stop_the_bus.Datalog import (
+    SCAN_LIMIT,
+    Atom,
+    Database,
+    Indexes,
+    Inequality,
+    Literal,
+    Rule,
+    Subst,
+    compile_rule,
+    match,
+    plan,
+    query,
+    solve,
+)
 from stop_the_bus.Deck import Deck, deal, standard_deck
+from stop_the_bus.Determinization import Determinizations, sample_determinizations
+from stop_the_bus.Distillation import phase_actions
+from stop_the_bus.Driver import Driver
 from stop_the_bus.Encoding import (
     MAX_RANK_SUM,
+    ViewModule,
     decode_card,
     decode_hand,
     encode_card,
     encode_hand,
+    encode_view,
+    encode_views,
     feature_matrices,
 )
-from stop_the_bus.Game import Game, Round, View
+from stop_the_bus.Endgame import (
+    EndgameSolver,
+    Position,
+    mask_cards,
+    mask_penalties,
+    round_position,
+)
+from stop_the_bus.Environment import (
+    ACTION_CONTINUE,
+    ACTION_DISCARD,
+    ACTION_DRAW_FROM_DECK,
+    ACTION_DRAW_FROM_DISCARD,
+    ACTION_STOP_THE_BUS,
+    OBSERVATION_PHASE,
+    RoundEnv,
+)
+from stop_the_bus.Game import Game, Phase, Round, View
 from stop_the_bus.Hand import (
+    HAND_TABLE,
     MAX_HAND_SIZE,
+    MIN_HAND_SIZE,
     Hand,
+    as_hand,
+    can_stop_the_bus,
+    compute_card_indices_with_rank,
     compute_distinct_suit_count,
     compute_distinct_suits,
+    compute_hand_rank_to_counts,
+    compute_rank_to_card_indices,
+    compute_rank_to_counts,
     database_from_hand,
+    evaluate_hands,
     flush_value,
+    hand_mask,
+    hand_rank,
     hand_value,
     is_flush,
     is_prile,
+    maximum_suit_value,
+    ranked_hands,
+    scan_can_stop_the_bus,
+    scan_flush_value,
+    scan_hand_value,
+    scan_is_flush,
+    scan_is_prile,
+    scan_maximum_suit_value,
     single_high,
+    three_card_entries,
+    three_card_hand_indices,
 )
-from stop_the_bus.SimpleAgent import RULE_3_SUIT_3_RANK_3_PRILE
+from stop_the_bus.InferenceServer import InferenceServer
+from stop_the_bus.ISMCTSAgent import ISMCTSAgent
+from stop_the_bus.Latency import (
+    GAME_AGENT,
+    PHASE_DEAL,
+    PHASE_DISCARD,
+    PHASE_DRAW,
+    PHASE_END_ROUND,
+    PHASE_OBSERVE,
+    PHASE_STOP_THE_BUS,
+    LatencyHistogram,
+    LatencyRecorder,
+    bucket_bounds,
+    bucket_index,
+)
+from stop_the_bus.NeuralAgent import AsyncNeuralAgent, NeuralAgent
+from stop_the_bus.RandomAgent import RandomAgent
+from stop_the_bus.Record import GameRecord, append_records, read_records, record_game, replay
+from stop_the_bus.SimpleAgent import MATCH_3_SUIT_3_RANK_3_PRILE, RULE_3_SUIT_3_RANK_3_PRILE
+from stop_the_bus.TablePolicyAgent import (
+    HAND_ENTRY_COUNT,
+    PHASE_ENTRY_OFFSETS,
+    TABLE_ENTRY_COUNT,
+    PolicyTable,
+    TablePolicyAgent,
+    write_table,
+)
+from stop_the_bus.Tournament import (
+    AgentFactory,
+    GameResult,
+    chunks,
+    play_chunk,
+    run_tournament,
+    win_counts,
+)
+from stop_the_bus.VectorGame import VectorGame
 
 # from stop_the_bus.SimpleAgent import SimpleAgent
 
@@ -73,7 +196,7 @@ def known_high_card_hand(draw: st.DrawFn) -> tuple[Hand, Card]:
             unique=True,
         )
     )
-    hand: Hand = other_cards + [high_card]
+    hand: Hand = Hand([*other_cards, high_card])
 
     assert len(hand) == 3 or len(hand) == 4
     assert high_card in hand
@@ -88,7 +211,7 @@ def fixed_suit_count_hand(draw: st.DrawFn, suit_count: int) -> Hand:
     suits: deque[Suit] = deque(
         draw(st.lists(from_type(Suit), min_size=suit_count, max_size=suit_count, unique=True))
     )
-    hand: Hand = []
+    hand: Hand = Hand()
     hand_size: int = draw(st.integers(min_value=max(suit_count, 3), max_value=4))
     while len(hand) < hand_size:
         suit: Suit = suits.pop()
@@ -124,7 +247,7 @@ def known_suit_count_hand(draw: st.DrawFn) -> tuple[Hand, int]:
 @st.composite
 def known_flush_hand(draw: st.DrawFn) -> Hand:
     suit: Suit = draw(from_type(Suit))
-    hand: list[Card] = draw(st.lists(card_of_suit(suit=suit), min_size=3, max_size=4, unique=True))
+    hand: Hand = Hand(draw(st.lists(card_of_suit(suit=suit), min_size=3, max_size=4, unique=True)))
 
     assert len(hand) == 3 or len(hand) == 4
     assert len({card.suit for card in hand}) == 1
@@ -152,7 +275,7 @@ def known_prile_hand(draw: st.DrawFn) -> Hand:
     suits: list[Suit] = draw(
         st.lists(from_type(Suit), min_size=suit_count, max_size=suit_count, unique=True)
     )
-    hand: Hand = [Card(s, rank) for s in suits]
+    hand: Hand = Hand(Card(s, rank) for s in suits)
 
     assert len(hand) == 3 or len(hand) == 4
     assert len({card.rank for card in hand}) == 1
@@ -172,7 +295,7 @@ def known_not_prile_hand(draw: st.DrawFn, hand_size: int | None = None) -> Hand:
         st.lists(from_type(Rank), min_size=len(counts), max_size=len(counts), unique=True)
     )
 
-    hand: list[Card] = []
+    hand: Hand = Hand()
     for r, k in zip(ranks, counts, strict=True):
         suits: list[Suit] = draw(st.lists(from_type(Suit), min_size=k, max_size=k, unique=True))
         hand.extend(Card(s, r) for s in suits)
@@ -187,7 +310,7 @@ def known_not_prile_hand(draw: st.DrawFn, hand_size: int | None = None) -> Hand:
 @st.composite
 def known_prile_of_threes(draw: st.DrawFn) -> Hand:
     suits: list[Suit] = draw(st.lists(from_type(Suit), min_size=3, max_size=4, unique=True))
-    hand: Hand = [Card(s, Rank.Three) for s in suits]
+    hand: Hand = Hand(Card(s, Rank.Three) for s in suits)
 
     assert len(hand) == 3 or len(hand) == 4
     assert len({card.rank for card in hand}) == 1
@@ -205,7 +328,7 @@ def known_prile_of_not_threes(draw: st.DrawFn, hand_size: int | None = None) ->
         st.lists(from_type(Suit), min_size=hand_size or 3, max_size=4, unique=True)
     )
     rank: Rank = draw(st.sampled_from([r for r in Rank if r != Rank.Three]))
-    hand: Hand = [Card(s, rank) for s in suits]
+    hand: Hand = Hand(Card(s, rank) for s in suits)
 
     assert len(hand) == 3 or len(hand) == 4
     assert len({card.rank for card in hand}) == 1
@@ -219,12 +342,12 @@ def known_prile_of_not_threes(draw: st.DrawFn, hand_size: int | None = None) ->
 
 @st.composite
 def deck(draw: st.DrawFn, min_size: int = 0, max_size: int = 52) -> Deck:
-    return deque(draw(st.lists(from_type(Card), min_size=min_size, max_size=max_size, unique=True)))
+    return Deck(draw(st.lists(from_type(Card), min_size=min_size, max_size=max_size, unique=True)))
 
 
 @st.composite
 def hand(draw: st.DrawFn) -> Hand:
-    return draw(st.lists(from_type(Card), min_size=0, max_size=4, unique=True))
+    return Hand(draw(st.lists(from_type(Card), min_size=0, max_size=4, unique=True)))
 
 
 @st.composite
@@ -293,9 +416,9 @@ def is_prile_of_threes(hand: Hand) -> bool:
 
 @given(
     known_prile_of_threes(),
-    st.lists(from_type(Card), min_size=3, max_size=4, unique=True).filter(
-        lambda h: not is_prile_of_threes(h)
-    ),
+    st.lists(from_type(Card), min_size=3, max_size=4, unique=True)
+    .map(Hand)
+    .filter(lambda h: not is_prile_of_threes(h)),
 )
 def test_prile_of_threes_beats_everything(prile_of_threes: Hand, other_hand: Hand) -> None:
     assert hand_value(prile_of_threes) > hand_value(other_hand)
@@ -308,6 +431,90 @@ def test_prile_of_not_threes_beats_non_prile(
     assert hand_value(prile_of_not_threes) > hand_value(not_prile_hand)
 
 
+@given(st.lists(from_type(Card), min_size=0, max_size=4, unique=True))
+def test_hand_table_matches_scan(hand: Hand) -> None:
+    assert hand_value(hand) == scan_hand_value(hand)
+    assert is_flush(hand) == scan_is_flush(hand)
+    assert is_prile(hand) == scan_is_prile(hand)
+    assert flush_value(hand) == scan_flush_value(hand)
+    assert maximum_suit_value(hand) == scan_maximum_suit_value(hand)
+    assert can_stop_the_bus(hand) == scan_can_stop_the_bus(hand)
+
+
+@given(st.lists(st.lists(from_type(Card), min_size=3, max_size=3, unique=True), min_size=1))
+def test_three_card_entries_match_hand_table(hands: list[list[Card]]) -> None:
+    entries: list[int] = three_card_entries(
+        [[card.index for card in hand] for hand in hands]
+    ).tolist()
+    assert entries == [HAND_TABLE[hand_mask(hand)] for hand in hands]
+
+
+@pytest.mark.parametrize("size", [MIN_HAND_SIZE, MAX_HAND_SIZE])
+def test_ranked_hands_are_in_hand_rank_order(size: int) -> None:
+    hands: npt.NDArray[np.int64] = ranked_hands(size)
+    assert len(hands) == math.comb(DECK_SIZE, size)
+    for rank in [0, 1, 2, len(hands) // 3, len(hands) - 1]:
+        assert hand_rank(hands[rank].tolist()) == rank
+    if size == MIN_HAND_SIZE:
+        shuffled: npt.NDArray[np.int64] = np.random.default_rng(0).permuted(hands, axis=1)
+        assert three_card_hand_indices(shuffled).tolist() == list(range(len(hands)))
+
+
+@given(
+    st.lists(
+        st.lists(from_type(Card), min_size=4, max_size=4, unique=True), min_size=1, max_size=20
+    ),
+    st.sampled_from([3, 4]),
+)
+def test_evaluate_hands_matches_scalar(cards: list[list[Card]], size: int) -> None:
+    hands: list[Hand] = [Hand(hand[:size]) for hand in cards]
+    evaluation = evaluate_hands([[card.index for card in hand] for hand in hands])
+
+    assert evaluation.value.tolist() == [scan_hand_value(hand) for hand in hands]
+    assert evaluation.maximum_suit_value.tolist() == [scan_maximum_suit_value(h) for h in hands]
+    assert evaluation.flush_value.tolist() == [scan_flush_value(hand) for hand in hands]
+    assert evaluation.is_flush.tolist() == [scan_is_flush(hand) for hand in hands]
+    assert evaluation.is_prile.tolist() == [scan_is_prile(hand) for hand in hands]
+    assert evaluation.can_stop.tolist() == [scan_can_stop_the_bus(hand) for hand in hands]
+
+
+def _tallies(hand: Hand) -> tuple[object, ...]:
+    return (
+        hand.mask,
+        hand.suit_counts,
+        hand.suit_score_sums,
+        hand.rank_counts,
+        hand.distinct_suit_count,
+        hand.distinct_rank_count,
+    )
+
+
+@given(st.lists(from_type(Card), min_size=1, max_size=8, unique=True), st.data())
+def test_hand_tallies_follow_mutations(cards: list[Card], data: st.DataObject) -> None:
+    hand: Hand = Hand()
+    for card in cards:
+        hand.append(card)
+        if data.draw(st.booleans()):
+            hand.pop(data.draw(st.integers(min_value=0, max_value=len(hand) - 1)))
+        if hand and data.draw(st.booleans()):
+            hand.remove(data.draw(st.sampled_from(hand)))
+
+        assert _tallies(hand) == _tallies(Hand(list(hand)))
+        assert hand.mask == hand_mask(list(hand))
+        assert hand.distinct_suit_count == len({card.suit for card in hand})
+        assert hand.distinct_rank_count == len({card.rank for card in hand})
+
+
+@given(hand())
+def test_rank_features_match_rank_to_card_indices(hand: Hand) -> None:
+    rank_to_card_indices: dict[Rank, list[int]] = compute_rank_to_card_indices(hand)
+
+    assert compute_hand_rank_to_counts(hand) == compute_rank_to_counts(rank_to_card_indices)
+    for rank in Rank:
+        indices: list[int] = compute_card_indices_with_rank(hand, rank)
+        assert indices == rank_to_card_indices.get(rank, [])
+
+
 def test_standard_deck() -> None:
     deck: Deck = standard_deck()
 
@@ -315,6 +522,16 @@ def test_standard_deck() -> None:
     assert len(set(deck)) == 52
 
 
+@given(from_type(Card))
+def test_card_pool(card: Card) -> None:
+    pooled: Card = Card.from_index(card.index)
+
+    assert pooled == card
+    assert pooled is Card.of(card.suit, card.rank)
+    assert pooled is pickle.loads(pickle.dumps(card))
+    assert all(card is Card.from_index(card.index) for card in standard_deck())
+
+
 @given(deck(min_size=1), hand())
 def test_deal(deck: Deck, hand: Hand) -> None:
     deck_size: int = len(deck)
@@ -327,6 +544,30 @@ def test_deal(deck: Deck, hand: Hand) -> None:
     assert len(hand) == hand_size + 1
 
 
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=6))
+def test_seeded_rounds_are_reproducible(seed: int, player_count: int) -> None:
+    for make_rng in (random.Random, np.random.default_rng):
+        [first, second] = [Game(player_count, rng=make_rng(seed)).start_round() for _ in range(2)]
+        assert first.hands == second.hands
+        assert first.deck.indices == second.deck.indices
+
+
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=6))
+def test_reshuffle_keeps_every_card(seed: int, player_count: int) -> None:
+    round: Round = Game(player_count, rng=np.random.default_rng(seed)).start_round()
+    round.discard(0)
+    while round.deck:
+        round.discard_pile.append(round.deck.pop())
+    top_card: Card = round.discard_pile[-1]
+
+    card: Card = round.draw_from_deck()
+
+    assert list(round.discard_pile) == [top_card]
+    assert card in round.current_hand
+    all_cards: list[Card] = [*round.deck, *round.discard_pile, *itertools.chain(*round.hands)]
+    assert len(all_cards) == len(set(all_cards)) == len(standard_deck())
+
+
 EXPECTED_FIRST_PLAYER_HAND_COUNT: int = 4
 EXPECTED_OTHER_PLAYER_HAND_COUNT: int = 3
 
@@ -546,21 +787,27 @@ def test_end_round_handles_tie_without_prile() -> None:
 
     round: Round = game.start_round()
 
-    hand_a: Hand = [
-        Card(Suit.Spades, Rank.Ace),
-        Card(Suit.Spades, Rank.King),
-        Card(Suit.Spades, Rank.Queen),
-    ]
-    hand_b: Hand = [
-        Card(Suit.Hearts, Rank.Ace),
-        Card(Suit.Hearts, Rank.King),
-        Card(Suit.Hearts, Rank.Queen),
-    ]
-    hand_c: Hand = [
-        Card(Suit.Spades, Rank.Five),
-        Card(Suit.Spades, Rank.Seven),
-        Card(Suit.Spades, Rank.Nine),
-    ]
+    hand_a: Hand = Hand(
+        [
+            Card(Suit.Spades, Rank.Ace),
+            Card(Suit.Spades, Rank.King),
+            Card(Suit.Spades, Rank.Queen),
+        ]
+    )
+    hand_b: Hand = Hand(
+        [
+            Card(Suit.Hearts, Rank.Ace),
+            Card(Suit.Hearts, Rank.King),
+            Card(Suit.Hearts, Rank.Queen),
+        ]
+    )
+    hand_c: Hand = Hand(
+        [
+            Card(Suit.Spades, Rank.Five),
+            Card(Suit.Spades, Rank.Seven),
+            Card(Suit.Spades, Rank.Nine),
+        ]
+    )
 
     assert hand_value(hand_a) == hand_value(hand_b)
     assert hand_value(hand_a) > hand_value(hand_c)
@@ -628,6 +875,42 @@ def test_hand_features(hand: Hand) -> None:
     torch.testing.assert_close(suit_rank_sum_features, expected_suit_rank_sum_features)
 
 
+@pytest.mark.parametrize("dtype", [torch.float32, torch.float64])
+def test_encode_views_matches_encode_view(dtype: torch.dtype) -> None:
+    # Views with and without a discard pile, before and after the bus is stopped
+    views: list[View] = []
+    phases: list[Phase] = []
+    for seed in range(20):
+        rng: random.Random = random.Random(seed)
+        round: Round = Game(3, rng=rng).start_round()
+        for turn in range(8):
+            views.append(round.current_view())
+            phases.append(rng.choice(list(Phase)))
+            if turn > 0:
+                round.draw_from_deck()
+            round.discard(rng.randrange(len(round.current_hand)))
+            if round.can_stop_the_bus() and rng.random() < 0.2:
+                round.stop_the_bus()
+            round.advance_turn()
+            if not round.has_turns_remaining:
+                break
+
+    expected: torch.Tensor = torch.stack(
+        [encode_view(view, phase, dtype=dtype) for view, phase in zip(views, phases, strict=True)]
+    )
+    assert expected.dtype == dtype
+    assert torch.equal(encode_views(views, phases, dtype=dtype), expected)
+
+    # Reusing a larger buffer for batches of any size
+    buffer: torch.Tensor = torch.full((len(views) + 1, ViewModule.INPUT_DIM), -1.0, dtype=dtype)
+    for start in range(0, len(views), 7):
+        batch: torch.Tensor = encode_views(
+            views[start : start + 7], phases[start : start + 7], dtype=dtype, out=buffer
+        )
+        assert batch.data_ptr() == buffer.data_ptr()
+        assert torch.equal(batch, expected[start : start + 7])
+
+
 @st.composite
 def distinct_suits(draw: st.DrawFn, count: int) -> list[Suit]:
     return draw(st.lists(from_type(Suit), min_size=count, max_size=count, unique=True))
@@ -655,7 +938,7 @@ def hand_three_suit_3_rank_3_prile(draw: st.DrawFn) -> tuple[Hand, Card, Card]:
         Card(suit3, rank2),
     ]
 
-    return draw(st.permutations(cards)), card1, card2
+    return Hand(draw(st.permutations(cards))), card1, card2
 
 
 @given(hand_three_suit_3_rank_3_prile())
@@ -664,3 +947,904 @@ def test_query(data: tuple[Hand, Card, Card]) -> None:
     database: Database = database_from_hand(hand)
     results = query(database, RULE_3_SUIT_3_RANK_3_PRILE)
     assert len(results) == 1
+
+
+def _results(substs: list[Subst]) -> set[frozenset[tuple[str, object]]]:
+    return {frozenset(subst.items()) for subst in substs}
+
+
+@given(st.lists(from_type(Card), min_size=3, max_size=4, unique=True))
+def test_compiled_rule_matches_query(cards: list[Card]) -> None:
+    database: Database = database_from_hand(as_hand(cards))
+    assert _results(list(MATCH_3_SUIT_3_RANK_3_PRILE(database))) == _results(
+        query(database, RULE_3_SUIT_3_RANK_3_PRILE)
+    )
+
+
+def test_compiled_rule_checks_constants_repeats_and_inequalities() -> None:
+    database: Database = database_from_hand(
+        as_hand(
+            [
+                Card(Suit.Spades, Rank.Three),
+                Card(Suit.Spades, Rank.Four),
+                Card(Suit.Hearts, Rank.Three),
+            ]
+        )
+    )
+    # Inequalities are checked once bound, wherever they are in the body
+    same_suit: Rule = Rule(
+        Atom("same_suit", ("i", "j", Rank.Three)),
+        (
+            Inequality("i", "j"),
+            Atom("card", ("i", "suit", "rank")),
+            Atom("card", ("j", "suit", "other_rank")),
+        ),
+    )
+    assert _results(list(compile_rule(same_suit)(database))) == _results(query(database, same_suit))
+    assert _results(list(compile_rule(same_suit)(database))) == {
+        frozenset({("i", 0), ("j", 1)}),
+        frozenset({("i", 1), ("j", 0)}),
+    }
+
+    # Repeated variables within an atom, and an inequality on a variable no atom binds
+    threes: Rule = Rule(
+        Atom("three", ("i",)),
+        (Atom("card", ("i", "suit", Rank.Three)), Inequality("suit", "unbound")),
+    )
+    assert _results(list(compile_rule(threes)(database))) == _results(query(database, threes))
+    assert _results(list(compile_rule(threes)(database))) == {
+        frozenset({("i", 0)}),
+        frozenset({("i", 2)}),
+    }
+    diagonal: Rule = Rule(Atom("diagonal", ("i",)), (Atom("card", ("i", "i", "rank")),))
+    diagonal_database: Database = database_from_hand(as_hand([]))
+    diagonal_database[("card", 3)] = {(0, 1, 2), (1, 1, 2)}
+    assert list(compile_rule(diagonal)(diagonal_database)) == [{"i": 1}]
+
+    # Rules that can never match
+    for body in [
+        (Atom("card", ("i", "suit", "rank")), Inequality("suit", "suit")),
+        (Atom("card", ("i", "suit", "rank")), Inequality(Rank.Three, Rank.Three)),
+        (Atom("card", ("j", "suit", "rank")),),
+        (Atom("missing", ("i",)),),
+    ]:
+        assert list(compile_rule(Rule(Atom("never", ("i",)), body))(database)) == []
+
+    # Atoms with no arguments
+    flags: Database = database_from_hand(as_hand([]))
+    flags[("flag", 0)] = {()}
+    flags[("h", 0)] = set()
+    flagged: Rule = Rule(Atom("h", ()), (Atom("flag", ()),))
+    assert list(compile_rule(flagged)(flags)) == [{}]
+    assert _results(list(compile_rule(flagged)(flags))) == _results(query(flags, flagged))
+    unflagged: Rule = Rule(Atom("h", ()), (Atom("other_flag", ()),))
+    assert list(compile_rule(unflagged)(flags)) == []
+    flagged_cards: Rule = Rule(
+        Atom("flagged", ("i",)), (Atom("flag", ()), Atom("card", ("i", "suit", "rank")))
+    )
+    assert _results(list(compile_rule(flagged_cards)(flags | database))) == _results(
+        [{"i": 0}, {"i": 1}, {"i": 2}]
+    )
+
+
+# Facts of the same shape as `database_from_hand`'s over random hands, after a hand with a pair
+# and a three
+def _hands_database(rng: random.Random, hand_count: int) -> Database:
+    database: Database = database_from_hand(as_hand([]))
+    deck: list[Card] = list(standard_deck())
+    hands: list[list[Card]] = [
+        [
+            Card(Suit.Spades, Rank.Three),
+            Card(Suit.Spades, Rank.Seven),
+            Card(Suit.Hearts, Rank.Seven),
+            Card(Suit.Diamonds, Rank.Two),
+        ]
+    ]
+    hands.extend(rng.sample(deck, MAX_HAND_SIZE) for _ in range(hand_count))
+    for hand, cards in enumerate(hands):
+        for index, card in enumerate(cards):
+            database[("card", 4)].add((hand, index, card.suit, card.rank))
+    return database
+
+
+PAIR_WITH_A_THREE: tuple[Literal, ...] = (
+    Inequality("i", "j"),
+    Inequality("k", "i"),
+    Inequality("k", "j"),
+    Atom("card", ("hand", "i", "suit_i", "rank")),
+    Atom("card", ("hand", "j", "suit_j", "rank")),
+    Atom("card", ("hand", "k", "suit_k", Rank.Three)),
+    Inequality("rank", Rank.Three),
+    Inequality("suit_k", "unbound"),
+)
+
+
+# With no random hands, the facts are few enough to be scanned in body order
+@pytest.mark.parametrize("hand_count", [0, 100])
+def test_solve_matches_a_join_in_body_order(hand_count: int) -> None:
+    database: Database = _hands_database(random.Random(hand_count), hand_count)
+    assert (len(database[("card", 4)]) > SCAN_LIMIT) == (hand_count > 0)
+
+    # Joining in body order by scans, with the inequalities moved after the atoms, as `solve`
+    # joined before planning
+    envs: list[Subst] = [{}]
+    for literal in (*PAIR_WITH_A_THREE[3:], *PAIR_WITH_A_THREE[:3]):
+        envs = [result for env in envs for result in match(database, env, literal)]
+
+    assert envs
+    assert _results(solve(database, PAIR_WITH_A_THREE)) == _results(envs)
+
+
+def test_plan_joins_selective_atoms_first() -> None:
+    indexes: Indexes = Indexes(_hands_database(random.Random(0), 100))
+    assert plan(indexes, PAIR_WITH_A_THREE) == (
+        Atom("card", ("hand", "k", "suit_k", Rank.Three)),
+        Atom("card", ("hand", "i", "suit_i", "rank")),
+        Inequality("k", "i"),
+        Inequality("rank", Rank.Three),
+        Atom("card", ("hand", "j", "suit_j", "rank")),
+        Inequality("i", "j"),
+        Inequality("k", "j"),
+        Inequality("suit_k", "unbound"),
+    )
+
+
+def test_indexes_follow_their_relations() -> None:
+    database: Database = database_from_hand(as_hand([]))
+    database[("card", 4)] = {(0, index, Suit.Spades, Rank.Three) for index in range(4)}
+    indexes: Indexes = Indexes(database)
+    assert len(list(indexes.lookup(("card", 4), (1,), (5,)))) == 0
+    assert indexes.distinct(("card", 4), 2) == 1
+
+    database[("card", 4)].add((0, 5, Suit.Hearts, Rank.Three))
+    assert list(indexes.lookup(("card", 4), (1,), (5,))) == [(0, 5, Suit.Hearts, Rank.Three)]
+    assert indexes.distinct(("card", 4), 2) == 2
+
+    database[("card", 4)] = set()
+    assert list(indexes.lookup(("card", 4), (1,), (5,))) == []
+    assert list(indexes.lookup(("missing", 1), (0,), (5,))) == []
+
+
+def _round_state(round: Round) -> tuple[object, ...]:
+    return (
+        round.deck.indices,
+        round.discard_pile.indices,
+        [hand.indices for hand in round.hands],
+        [hand.indices for hand in round.certain_holds],
+        [(hand.mask, tuple(hand.suit_counts), tuple(hand.rank_counts)) for hand in round.hands],
+        round.turn,
+        round.turns_remaining,
+    )
+
+
+def _play_random_turns(round: Round, rng: random.Random, turn_count: int) -> None:
+    for _ in range(turn_count):
+        if not round.has_turns_remaining:
+            return
+        if round.turn > 0:
+            if rng.random() < 0.5:
+                round.draw_from_deck()
+            else:
+                round.draw_from_discard()
+        round.discard(rng.randrange(len(round.current_hand)))
+        if not round.bus_is_stopped and rng.random() < 0.1:
+            round.stop_the_bus()
+        round.advance_turn()
+
+
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=6))
+def test_clone_and_restore_are_independent_of_play(seed: int, player_count: int) -> None:
+    rng: random.Random = random.Random(seed)
+    round: Round = Game(player_count, rng=random.Random(seed)).start_round()
+    _play_random_turns(round, rng, rng.randrange(20))
+
+    state: tuple[object, ...] = _round_state(round)
+    clone: Round = round.clone()
+    snapshot = round.snapshot()
+    assert _round_state(clone) == state
+
+    _play_random_turns(clone, rng, 60)
+    assert _round_state(round) == state
+    assert clone.game is round.game
+
+    _play_random_turns(round, rng, 60)
+    round.restore(snapshot)
+    assert _round_state(round) == state
+
+
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=6))
+def test_end_round_applies_penalties(seed: int, player_count: int) -> None:
+    game: Game = Game(player_count, rng=random.Random(seed))
+    round: Round = game.start_round()
+    penalties: list[int] = round.penalties()
+    expected_lives: list[int] = game.lives.copy()
+    for i, penalty in enumerate(penalties):
+        expected_lives[round.players[i]] -= penalty
+
+    round.end_round()
+    assert game.lives == expected_lives
+
+
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=4))
+def test_undo_reverses_every_move(seed: int, player_count: int) -> None:
+    rng: random.Random = random.Random(seed)
+    round: Round = Game(player_count, rng=random.Random(seed)).start_round()
+    states: list[tuple[object, ...]] = []
+
+    def move(apply: Callable[[], object]) -> None:
+        states.append(_round_state(round))
+        apply()
+
+    # Long enough without stopping the bus that the deck runs out and is reshuffled
+    while round.has_turns_remaining:
+        if round.turn > 0:
+            move(round.draw_from_deck if rng.random() < 0.7 else round.draw_from_discard)
+        move(lambda: round.discard(rng.randrange(-len(round.current_hand), 4)))
+        if round.turn >= 120 and not round.bus_is_stopped and rng.random() < 0.2:
+            move(round.stop_the_bus)
+        move(round.advance_turn)
+
+    assert round.reshuffles
+    while states:
+        round.undo()
+        assert _round_state(round) == states.pop()
+    assert not round.history
+
+
+# The turns remaining before stopping the bus must survive undo for any number of players
+def test_undo_restores_turns_remaining_for_many_players() -> None:
+    round: Round = Game(9, rng=random.Random(0)).start_round()
+    round.stop_the_bus()
+    assert round.turns_remaining == 9
+    round.stop_the_bus()
+    round.undo()
+    assert round.turns_remaining == 9
+    round.undo()
+    assert round.turns_remaining is None
+
+
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=6))
+def test_round_env_follows_driver_phases(seed: int, player_count: int) -> None:
+    rng: random.Random = random.Random(seed)
+    env: RoundEnv = RoundEnv(Game(player_count, rng=random.Random(seed)).start_round())
+    round: Round = Game(player_count, rng=random.Random(seed)).start_round()
+
+    done: bool = False
+    while not done and round.turn < 100:
+        legal: list[int] = np.flatnonzero(env.legal_actions()).tolist()
+        observation = env.observe()
+        assert bytes(observation[: len(round.current_hand)]) == round.current_hand.indices
+        assert observation[OBSERVATION_PHASE] == env.phase
+
+        if env.phase == Phase.DRAW:
+            assert legal == [ACTION_DRAW_FROM_DECK, ACTION_DRAW_FROM_DISCARD]
+        elif env.phase == Phase.DISCARD:
+            assert legal == [ACTION_DISCARD + i for i in range(len(round.current_hand))]
+        else:
+            assert legal == [ACTION_STOP_THE_BUS, ACTION_CONTINUE]
+            assert round.can_stop_the_bus()
+
+        action: int = rng.choice(legal)
+        if action == ACTION_DRAW_FROM_DECK:
+            round.draw_from_deck()
+        elif action == ACTION_DRAW_FROM_DISCARD:
+            round.draw_from_discard()
+        elif action < ACTION_STOP_THE_BUS:
+            round.discard(action - ACTION_DISCARD)
+            if not round.can_stop_the_bus():
+                round.advance_turn()
+        else:
+            if action == ACTION_STOP_THE_BUS:
+                round.stop_the_bus()
+            round.advance_turn()
+
+        _, penalties, done = env.step(action)
+        assert _round_state(env.round) == _round_state(round)
+        assert penalties == (round.penalties() if done else [0] * player_count)
+
+    if done:
+        assert not env.legal_actions().any()
+        with pytest.raises(ValueError):
+            env.step(ACTION_CONTINUE)
+
+
+@given(
+    st.integers(min_value=0, max_value=2**32),
+    st.integers(min_value=2, max_value=6),
+    st.integers(min_value=0, max_value=30),
+)
+def test_determinizations_agree_with_the_view(seed: int, player_count: int, turns: int) -> None:
+    rng: random.Random = random.Random(seed)
+    round: Round = Game(player_count, rng=random.Random(seed)).start_round()
+    _play_random_turns(round, rng, turns)
+    if not round.has_turns_remaining:
+        return
+    view: View = round.current_view()
+
+    samples: Determinizations = sample_determinizations(view, 16, np.random.default_rng(seed))
+    vector: VectorGame = samples.to_vector_game()
+    for sample, sampled in enumerate(samples.to_rounds()):
+        assert sampled.current_hand.indices == round.current_hand.indices
+        assert sampled.discard_pile.indices == round.discard_pile.indices
+        assert len(sampled.deck) == len(round.deck)
+        assert [len(hand) for hand in sampled.hands] == [len(hand) for hand in round.hands]
+        for seat, holds in enumerate(round.certain_holds):
+            assert holds.mask & ~sampled.hands[seat].mask == 0
+        cards: list[int] = list(sampled.deck.indices + sampled.discard_pile.indices)
+        for hand in sampled.hands:
+            cards.extend(hand.indices)
+        assert sorted(cards) == list(range(52))
+
+        for seat, hand in enumerate(sampled.hands):
+            assert vector.round.hands[sample, seat, : len(hand)].tolist() == list(hand.indices)
+        assert vector.round.deck[sample, : len(sampled.deck)].tobytes() == sampled.deck.indices
+        assert vector.round.turn[sample] == round.turn
+
+
+def test_ismcts_agents_play_a_game() -> None:
+    agents: list[Agent] = [
+        ISMCTSAgent(playouts=64, batch_size=32, rng=np.random.default_rng(seed))
+        for seed in range(3)
+    ]
+    winner: int = Driver(agents, lives=2, rng=random.Random(0)).drive()
+    assert winner in range(len(agents))
+
+
+def test_ismcts_agent_reuses_the_draw_subtree() -> None:
+    round: Round = Game(3, rng=random.Random(0)).start_round()
+    round.discard(0)
+    round.advance_turn()
+    agent: ISMCTSAgent = ISMCTSAgent(playouts=256, rng=np.random.default_rng(0))
+
+    agent.draw(round.current_view())
+    subtree = agent._subtree
+    assert subtree is not None
+    visits: int = sum(child.visits for child in subtree.children if child is not None)
+    assert visits > 0
+
+    agent.discard(round.current_view())
+    assert sum(child.visits for child in subtree.children if child is not None) == visits + 256
+
+    # Another round at the same turn starts a fresh tree
+    other: Round = Game(3, rng=random.Random(1)).start_round()
+    other.discard(0)
+    other.advance_turn()
+    assert other.turn == round.turn
+    assert agent._subtree is not None
+    assert agent._root(other.current_view()) is not agent._subtree
+
+    # The stop decision ends the turn, searched or not
+    agent.stop_the_bus(round.current_view())
+    assert agent._subtree is None
+
+
+def _endgame_round(seed: int, player_count: int, remaining: int) -> Round:
+    rng: random.Random = random.Random(seed)
+    round: Round = Game(player_count, rng=random.Random(seed)).start_round()
+    _play_random_turns(round, rng, rng.randrange(1, 12))
+    round.stop_the_bus()
+    while round.turns_remaining is not None and round.turns_remaining > remaining:
+        round.advance_turn()
+    return round
+
+
+# The current player's expected lives lost from the round's last turn, by trying every draw and
+# discard on clones of the round
+def _brute_force_last_turn(round: Round) -> float:
+    def best_discard(drawn: Round) -> float:
+        losses: list[float] = []
+        for slot in range(len(drawn.current_hand)):
+            discarded: Round = drawn.clone()
+            discarded.discard(slot)
+            losses.append(discarded.penalties()[round.current_index])
+        return min(losses)
+
+    from_pile: Round = round.clone()
+    from_pile.draw_from_discard()
+    deck_losses: list[float] = []
+    for card in round.deck.indices:
+        from_deck: Round = round.clone()
+        from_deck.deck.clear()
+        from_deck.deck.extend_indices(bytes([card]))
+        from_deck.draw_from_deck()
+        deck_losses.append(best_discard(from_deck))
+    return min(best_discard(from_pile), sum(deck_losses) / len(deck_losses))
+
+
+@pytest.mark.parametrize("canonical", [False, True])
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=5))
+def test_endgame_solver_matches_brute_force(canonical: bool, seed: int, player_count: int) -> None:
+    round: Round = _endgame_round(seed, player_count, remaining=1)
+    assert list(mask_penalties(round_position(round)[2])) == round.penalties()
+
+    solver: EndgameSolver = EndgameSolver(canonical=canonical)
+    outcome: tuple[float, ...] = solver.outcome(round_position(round))
+    assert outcome[round.current_index] == pytest.approx(_brute_force_last_turn(round))
+
+    misses: int = solver.misses
+    solver.outcome(round_position(round))
+    assert solver.misses == misses
+
+
+def test_ismcts_agent_uses_the_endgame_solver() -> None:
+    round: Round = _endgame_round(0, 3, remaining=2)
+    solver: EndgameSolver = EndgameSolver()
+    agent: ISMCTSAgent = ISMCTSAgent(playouts=0, endgame=solver, rng=np.random.default_rng(0))
+    agent.draw(round.current_view())
+    agent.discard(round.current_view())
+    assert solver.misses > 0
+    assert len(round.current_hand) == 3
+
+
+def test_tournament_is_deterministic_across_worker_counts() -> None:
+    factories: list[AgentFactory] = [RandomAgent] * 3
+    results: list[GameResult] = run_tournament(factories, 12, seed=7, workers=2, chunk_size=5)
+    assert results == run_tournament(factories, 12, seed=7, workers=1, chunk_size=5)
+    assert results == [r for c in chunks(factories, 12, 7, 5) for r in play_chunk(c)]
+
+    assert len({result.seed for result in results}) == len(results)
+    assert sum(win_counts(results, 3)) == sum(1 for result in results if result.winner >= 0)
+    for result in results:
+        assert result.rounds > 0 and result.turns >= result.rounds
+        if result.winner >= 0:
+            assert sorted([*result.eliminations, result.winner]) == [0, 1, 2]
+
+
+class _RecordingAgent:
+    def __init__(self, seed: int, events: list[tuple[object, ...]]) -> None:
+        self.agent: RandomAgent = RandomAgent(seed)
+        self.events: list[tuple[object, ...]] = events
+
+    def draw(self, view: View) -> tuple[Card, bool]:
+        return self.agent.draw(view)
+
+    def discard(self, view: View) -> Card:
+        return self.agent.discard(view)
+
+    def stop_the_bus(self, view: View) -> bool:
+        return self.agent.stop_the_bus(view)
+
+    def on_turn_start(self, view: View) -> None:
+        self.events.append(("turn_start", view.player_index))
+
+    def on_turn_end(self, view: View) -> None:
+        self.events.append(("turn_end", view.player_index))
+
+    def on_discard(self, agent: int, actor: int, card: Card) -> None:
+        self.events.append(("discard", agent, actor, card))
+
+    def on_stop_the_bus(self, agent: int, actor: int) -> None:
+        self.events.append(("stop_the_bus", agent, actor))
+
+    def on_round_start(self) -> None:
+        self.events.append(("round_start",))
+
+    def on_draw(self, agent: int, actor: int, card: Card, from_deck: bool) -> None:
+        self.events.append(("draw", agent, actor, card, from_deck))
+
+
+class _AsyncRecordingAgent(_RecordingAgent):
+    async def draw(self, view: View) -> tuple[Card, bool]:  # type: ignore[override]
+        await asyncio.sleep(0)
+        return self.agent.draw(view)
+
+    async def discard(self, view: View) -> Card:  # type: ignore[override]
+        await asyncio.sleep(0)
+        return self.agent.discard(view)
+
+    async def stop_the_bus(self, view: View) -> bool:  # type: ignore[override]
+        await asyncio.sleep(0)
+        return self.agent.stop_the_bus(view)
+
+
+class _StallingAgent:
+    # Draws and then never finishes deciding, so every draw must be undone
+    async def draw(self, view: View) -> tuple[Card, bool]:
+        view.round.draw_from_deck()
+        await asyncio.sleep(60)
+        raise AssertionError
+
+    async def discard(self, view: View) -> Card:
+        await asyncio.sleep(60)
+        raise AssertionError
+
+    async def stop_the_bus(self, view: View) -> bool:
+        await asyncio.sleep(60)
+        raise AssertionError
+
+
+class _BatchRecordingAgent:
+    def __init__(self, seed: int) -> None:
+        self.agent: RandomAgent = RandomAgent(seed)
+        self.batches: list[tuple[int, list[Event]]] = []
+
+    def draw(self, view: View) -> tuple[Card, bool]:
+        return self.agent.draw(view)
+
+    def discard(self, view: View) -> Card:
+        return self.agent.discard(view)
+
+    def stop_the_bus(self, view: View) -> bool:
+        return self.agent.stop_the_bus(view)
+
+    def on_turn_start(self, view: View) -> None:
+        pass
+
+    def on_turn_end(self, view: View) -> None:
+        pass
+
+    def on_events(self, agent: int, events: Sequence[Event]) -> None:
+        self.batches.append((agent, list(events)))
+
+
+def _as_observed(agent: int, event: Event) -> tuple[object, ...]:
+    match event:
+        case RoundStartEvent():
+            return ("round_start",)
+        case DrawEvent(actor, card, from_deck):
+            return ("draw", agent, actor, card, from_deck)
+        case DiscardEvent(actor, card):
+            return ("discard", agent, actor, card)
+        case StopTheBusEvent(actor):
+            return ("stop_the_bus", agent, actor)
+
+
+def test_batch_observers_see_every_event_once_per_turn() -> None:
+    events: list[tuple[object, ...]] = []
+    agents: list[Agent] = [_RecordingAgent(0, events), RandomAgent(1), RandomAgent(2)]
+    Driver(agents, lives=2, rng=random.Random(5)).drive()
+    broadcasts: list[tuple[object, ...]] = [
+        event for event in events if event[0] not in ("turn_start", "turn_end")
+    ]
+
+    observers: list[_BatchRecordingAgent] = [_BatchRecordingAgent(i) for i in range(3)]
+    driver: Driver = Driver(list(observers), lives=2, rng=random.Random(5))
+    driver.drive()
+
+    for agent_id, observer in enumerate(observers):
+        assert len(observer.batches) == driver.turn_count
+        assert all(agent == agent_id for agent, _ in observer.batches)
+        observed: list[tuple[object, ...]] = [
+            _as_observed(0, event) for _, batch in observer.batches for event in batch
+        ]
+        assert observed == broadcasts
+
+
+def test_async_driver_matches_driver() -> None:
+    seeds: range = range(8)
+    sync_events: list[list[tuple[object, ...]]] = [[] for _ in seeds]
+    async_events: list[list[tuple[object, ...]]] = [[] for _ in seeds]
+    sync_drivers: list[Driver] = [
+        Driver(
+            [_RecordingAgent(seed * 3 + i, sync_events[seed]) for i in range(3)],
+            lives=2,
+            rng=random.Random(seed),
+        )
+        for seed in seeds
+    ]
+    async_drivers: list[AsyncDriver] = [
+        AsyncDriver(
+            [
+                _AsyncRecordingAgent(seed * 3, async_events[seed]),
+                _RecordingAgent(seed * 3 + 1, async_events[seed]),
+                _AsyncRecordingAgent(seed * 3 + 2, async_events[seed]),
+            ],
+            lives=2,
+            rng=random.Random(seed),
+        )
+        for seed in seeds
+    ]
+
+    winners: list[int] = asyncio.run(drive_tables(async_drivers))
+    assert winners == [driver.drive() for driver in sync_drivers]
+    assert async_events == sync_events
+    for sync_driver, async_driver in zip(sync_drivers, async_drivers, strict=True):
+        assert async_driver.eliminations == sync_driver.eliminations
+        assert async_driver.round_count == sync_driver.round_count
+        assert async_driver.turn_count == sync_driver.turn_count
+        assert async_driver.timeouts == [0, 0, 0]
+
+
+def test_async_driver_falls_back_on_timeout() -> None:
+    driver: AsyncDriver = AsyncDriver(
+        [_StallingAgent(), RandomAgent(0, stop_probability=1.0)],
+        lives=1,
+        rng=random.Random(0),
+        timeout=0.001,
+        fallback=RandomAgent(1, stop_probability=0.0),
+    )
+    winner: int = asyncio.run(driver.drive())
+    assert winner in (0, 1)
+    assert driver.timeouts[0] > 0 and driver.timeouts[1] == 0
+
+
+@pytest.mark.parametrize("max_turn_count", [100, 5])
+def test_replay_matches_recorded_games(tmp_path: Path, max_turn_count: int) -> None:
+    records: list[GameRecord] = []
+    for seed in range(6):
+        agents: list[Agent] = [RandomAgent(seed * 4 + i) for i in range(4)]
+        winner, record = record_game(agents, seed, lives=2, max_turn_count=max_turn_count)
+        driver: Driver = Driver(
+            [RandomAgent(seed * 4 + i) for i in range(4)],
+            2,
+            max_turn_count,
+            random.Random(seed),
+        )
+        assert driver.drive() == winner
+        assert replay(record) == GameResult(
+            seed, winner, driver.round_count, driver.turn_count, tuple(driver.eliminations)
+        )
+        assert len(record.actions) == driver.turn_count
+        records.append(record)
+
+    path: Path = tmp_path / "games.bin"
+    append_records(path, records[:2])
+    append_records(path, records[2:])
+    assert list(read_records(path)) == records
+
+
+@given(st.integers(min_value=0, max_value=1 << 40))
+def test_latency_buckets_hold_their_values(value: int) -> None:
+    low, high = bucket_bounds(bucket_index(value))
+    assert low <= value <= high
+    assert high - low <= low >> 4
+    assert bucket_bounds(bucket_index(value) + 1)[0] == high + 1
+
+
+def test_latency_histogram_percentiles() -> None:
+    histogram: LatencyHistogram = LatencyHistogram()
+    for value in range(1, 1001):
+        histogram.record(value)
+    assert (histogram.count, histogram.min, histogram.max) == (1000, 1, 1000)
+    assert histogram.mean == 500.5
+    assert 500 <= histogram.percentile(50) <= 500 * 17 // 16
+    assert histogram.percentile(100) == 1000
+
+
+def test_driver_records_latencies() -> None:
+    events: list[tuple[object, ...]] = []
+    agents: list[Agent] = [_RecordingAgent(0, events), RandomAgent(1), RandomAgent(2)]
+    latencies: LatencyRecorder = LatencyRecorder()
+    driver: Driver = Driver(agents, lives=2, rng=random.Random(0), latencies=latencies)
+    winner: int = driver.drive()
+    assert winner >= 0
+
+    def count(agent: int, phase: str) -> int:
+        return latencies.histogram(agent, phase).count
+
+    assert count(GAME_AGENT, PHASE_DEAL) == count(GAME_AGENT, PHASE_END_ROUND) == driver.round_count
+    assert sum(count(agent, PHASE_DISCARD) for agent in range(3)) == driver.turn_count
+    assert sum(count(agent, PHASE_STOP_THE_BUS) for agent in range(3)) == driver.turn_count
+    assert sum(count(agent, PHASE_DRAW) for agent in range(3)) == (
+        driver.turn_count - driver.round_count
+    )
+    assert count(0, PHASE_OBSERVE) == len(events)
+    assert count(1, PHASE_OBSERVE) == count(2, PHASE_OBSERVE) == 0
+
+    exported: dict[str, dict[str, dict[str, object]]] = latencies.export()
+    assert set(exported) == {"game", "0", "1", "2"}
+    assert exported["0"][PHASE_OBSERVE]["count"] == len(events)
+    assert json.loads(json.dumps(exported)) == exported
+
+
+def test_inference_server_batches_match_single_forward_passes() -> None:
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule(hidden_dim=32)
+    net.eval()
+    views: list[tuple[View, Phase]] = []
+    for seed in range(24):
+        round: Round = Game(3, rng=random.Random(seed)).start_round()
+        _play_random_turns(round, random.Random(seed), seed % 5)
+        views.append((round.current_view(), list(Phase)[seed % 3]))
+
+    with InferenceServer(net, max_batch_size=8, max_wait=0.05) as server:
+        futures: list[Future[torch.Tensor]] = [server.submit(view, phase) for view, phase in views]
+        for future, (view, phase) in zip(futures, views, strict=True):
+            with torch.no_grad():
+                torch.testing.assert_close(future.result(), net(view, phase))
+        assert server.request_count == len(views)
+        assert server.batch_count < len(views)
+
+        async def infer_all() -> list[torch.Tensor]:
+            return list(
+                await asyncio.gather(*(server.infer_async(view, phase) for view, phase in views))
+            )
+
+        for logits, future in zip(asyncio.run(infer_all()), futures, strict=True):
+            torch.testing.assert_close(logits, future.result())
+
+    # Once stopped, nothing would serve a request
+    with pytest.raises(RuntimeError):
+        server.infer(*views[0])
+
+
+def test_async_neural_agents_share_an_inference_server() -> None:
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule(hidden_dim=32)
+    with InferenceServer(net, max_batch_size=16) as server:
+        drivers: list[AsyncDriver] = [
+            AsyncDriver(
+                [AsyncNeuralAgent(NeuralAgent(net), server), RandomAgent(seed)],
+                lives=1,
+                max_turn_count=20,
+                rng=random.Random(seed),
+            )
+            for seed in range(8)
+        ]
+        asyncio.run(drive_tables(drivers))
+        assert server.mean_batch_size > 1
+        assert sum(driver.timeouts[0] for driver in drivers) == 0
+
+
+def test_decision_cache_repeats_uncached_decisions() -> None:
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule(hidden_dim=32)
+    cached: list[Agent] = [NeuralAgent(net, cache_size=64) for _ in range(3)]
+    for seed in range(4):
+        _, expected = record_game([NeuralAgent(net) for _ in range(3)], seed, 2, 300)
+        _, record = record_game(cached, seed, 2, 300)
+        assert record == expected
+    for agent in cached:
+        assert isinstance(agent, NeuralAgent) and agent.cache is not None
+        assert agent.cache.hits > 0
+        assert len(agent.cache.actions) <= 64
+
+
+def test_decision_cache_is_emptied_when_the_weights_change() -> None:
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule(hidden_dim=32)
+    agent: NeuralAgent = NeuralAgent(net, cache_size=8)
+    assert agent.cache is not None
+    round: Round = Game(2, rng=random.Random(0)).start_round()
+    view: View = round.current_view()
+
+    agent.discard(view)
+    round.undo()
+    agent.discard(view)
+    round.undo()
+    assert (agent.cache.hits, agent.cache.misses) == (1, 1)
+
+    # Make the first card the one to discard, whatever was cached
+    with torch.no_grad():
+        net.discard_head.bias.copy_(torch.tensor([1e6, 0.0, 0.0, 0.0]))
+    first: Card = view.hand[0]
+    assert agent.discard(view) == first
+    assert (agent.cache.hits, agent.cache.misses) == (1, 2)
+    round.undo()
+
+    net.load_state_dict(ViewModule(hidden_dim=32).state_dict())
+    agent.discard(view)
+    assert (agent.cache.hits, agent.cache.misses) == (1, 3)
+    assert len(agent.cache.actions) == 1
+    round.undo()
+
+    # Writes through `.data` bypass the version counters, so need an explicit invalidation
+    net.discard_head.bias.data.copy_(torch.tensor([0.0, 1e6, 0.0, 0.0]))
+    agent.invalidate()
+    second: Card = view.hand[1]
+    assert agent.discard(view) == second
+    assert (agent.cache.hits, agent.cache.misses) == (1, 4)
+
+
+class _PhaseRecordingAgent:
+    """Records the phase and hand rank of each of an agent's decisions."""
+
+    def __init__(self, agent: Agent) -> None:
+        self.agent: Agent = agent
+        self.decisions: set[tuple[Phase, int]] = set()
+
+    def _record(self, view: View, phase: Phase) -> None:
+        self.decisions.add((phase, hand_rank([card.index for card in view.hand])))
+
+    def draw(self, view: View) -> tuple[Card, bool]:
+        self._record(view, Phase.DRAW)
+        return self.agent.draw(view)
+
+    def discard(self, view: View) -> Card:
+        self._record(view, Phase.DISCARD)
+        return self.agent.discard(view)
+
+    def stop_the_bus(self, view: View) -> bool:
+        self._record(view, Phase.STOP)
+        return self.agent.stop_the_bus(view)
+
+
+def test_table_policy_agent_replays_distilled_games(tmp_path: Path) -> None:
+    torch.manual_seed(0)
+    net: ViewModule = ViewModule(hidden_dim=16)
+    seeds: range = range(3)
+    expected: list[GameRecord] = []
+    recorders: list[_PhaseRecordingAgent] = [
+        _PhaseRecordingAgent(NeuralAgent(net)) for _ in range(3)
+    ]
+    players: list[Agent] = list(recorders)
+    for seed in seeds:
+        expected.append(record_game(players, seed, 2, 100)[1])
+
+    # Distill only the hands the games reach, as distilling every hand takes minutes
+    actions: np.ndarray = np.zeros(TABLE_ENTRY_COUNT, dtype=np.uint8)
+    for phase, rank in {decision for recorder in recorders for decision in recorder.decisions}:
+        begin: int = PHASE_ENTRY_OFFSETS[phase] + rank * HAND_ENTRY_COUNT
+        actions[begin : begin + HAND_ENTRY_COUNT] = phase_actions(net, phase, rank, rank + 1)
+    path: Path = tmp_path / "policy.bin"
+    write_table(path, actions)
+
+    with PolicyTable(path) as table:
+        agents: list[Agent] = [TablePolicyAgent(table) for _ in range(3)]
+        assert [record_game(agents, seed, 2, 100)[1] for seed in seeds] == expected
+
+    path.write_bytes(b"not a table")
+    with pytest.raises(ValueError):
+        PolicyTable(path)
+
+
+def test_table_policy_agent_does_not_import_torch(tmp_path: Path) -> None:
+    code: str = (
+        "import sys\n"
+        "import stop_the_bus.TablePolicyAgent\n"
+        "assert 'torch' not in sys.modules, 'torch was imported'\n"
+    )
+    src: Path = Path(__file__).resolve().parents[1] / "src"
+    result: subprocess.CompletedProcess[str] = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=tmp_path,
+        env={**os.environ, "PYTHONPATH": str(src)},
+        capture_output=True,
+        text=True,
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def _cards_mask(cards: Sequence[int]) -> int:
+    return sum(1 << card for card in cards)
+
+
+@given(
+    st.lists(
+        st.integers(min_value=0, max_value=DECK_SIZE - 1), min_size=4, max_size=10, unique=True
+    ),
+    st.booleans(),
+    st.permutations(range(Suit.size())),
+)
+def test_canonicalization_is_shared_by_relabellings(
+    cards: list[int], has_top: bool, permutation: list[int]
+) -> None:
+    # A hand, maybe a discard pile top, and the known holds of two other seats
+    top: int = cards[3] if has_top else NO_CARD
+    situation: Situation = (
+        _cards_mask(cards[:3]),
+        top,
+        (_cards_mask(cards[4:7]), _cards_mask(cards[7:])),
+    )
+    relabelled: Situation = relabel_situation(situation, tuple(permutation))
+    canonical, to_canonical = canonicalize(situation)
+
+    assert canonicalize(relabelled)[0] == canonical
+    assert relabel_situation(canonical, invert_permutation(to_canonical)) == situation
+    hand: Hand = Hand(Card.from_index(card) for card in mask_cards(canonical[0]))
+    assert hand_value(hand) == hand_value(Hand(Card.from_index(card) for card in cards[:3]))
+
+
+def test_endgame_solver_shares_entries_between_relabellings() -> None:
+    round: Round = _endgame_round(0, 3, remaining=2)
+    position: Position = round_position(round)
+    seat, remaining, hands, top, deck = position
+    permutation: tuple[int, ...] = (2, 3, 1, 0)
+    relabelled: Position = (
+        seat,
+        remaining,
+        tuple(relabel_mask(hand, permutation) for hand in hands),
+        relabel_card(top, permutation),
+        relabel_mask(deck, permutation),
+    )
+
+    solver: EndgameSolver = EndgameSolver(canonical=True)
+    outcome: tuple[float, ...] = solver.outcome(position)
+    misses: int = solver.misses
+    assert solver.outcome(relabelled) == outcome
+    assert solver.misses == misses
+
+    # Outcomes match those of the search over the positions as labelled, up to rounding
+    plain: EndgameSolver = EndgameSolver()
+    assert plain.outcome(position)[seat] == pytest.approx(outcome[seat])
+    assert len(plain.table) >= len(solver.table)
@@ -0,0 +1,82 @@
+import random
+
+import hypothesis.strategies as st
+import numpy as np
+from hypothesis import given
+
+from stop_the_bus.Game import Game, Round
+from stop_the_bus.VectorGame import NO_WINNER, VectorGame
+
+TABLE_COUNT: int = 8
+FORCED_STOP_TURN: int = 25
+
+
+def _random_game(player_count: int, rng: random.Random) -> Game:
+    game: Game = Game(player_count, rng=random.Random(rng.random()))
+    while sum(1 for lives in game.lives if lives > 0) < 2:
+        game.lives = [rng.randint(0, 3) for _ in range(player_count)]
+    game.dealer = rng.randrange(player_count)
+    return game
+
+
+def _assert_same_state(vector: VectorGame, rounds: list[Round]) -> None:
+    for table, round in enumerate(rounds):
+        assert vector.round.turn[table] == round.turn
+        assert vector.round.players[table, : round.player_count].tolist() == round.players
+        for seat, hand in enumerate(round.hands):
+            assert vector.round.hands[table, seat, : len(hand)].tolist() == [c.index for c in hand]
+        assert vector.round.discard_pile[table, : len(round.discard_pile)].tobytes() == (
+            round.discard_pile.indices
+        )
+
+
+@given(st.integers(min_value=0, max_value=2**32), st.integers(min_value=2, max_value=6))
+def test_vector_round_matches_round(seed: int, player_count: int) -> None:
+    rng: random.Random = random.Random(seed)
+    games: list[Game] = [_random_game(player_count, rng) for _ in range(TABLE_COUNT)]
+    rounds: list[Round] = [game.start_round() for game in games]
+    vector: VectorGame = VectorGame.from_rounds(rounds, rng=np.random.default_rng(seed))
+
+    while any(round.has_turns_remaining for round in rounds):
+        playing = np.array([round.has_turns_remaining for round in rounds])
+        drawing = playing & (vector.round.turn > 0)
+        from_deck = np.array([rng.random() < 0.5 for _ in rounds])
+        slots = np.array([rng.randrange(4) for _ in rounds])
+        wants_stop = np.array([rng.random() < 0.3 for _ in rounds])
+
+        vector.round.draw_from_deck(drawing & from_deck)
+        vector.round.draw_from_discard(drawing & ~from_deck)
+        vector.round.discard(slots, playing)
+        can_stop = vector.round.can_stop_the_bus()
+        forced = playing & ~vector.round.bus_is_stopped & (vector.round.turn >= FORCED_STOP_TURN)
+        vector.round.stop_the_bus(playing & ((wants_stop & can_stop) | forced))
+        vector.round.advance_turn(playing)
+
+        for table, round in enumerate(rounds):
+            if not playing[table]:
+                continue
+            if round.turn > 0:
+                if from_deck[table]:
+                    round.draw_from_deck()
+                else:
+                    round.draw_from_discard()
+            round.discard(int(slots[table]))
+            assert round.can_stop_the_bus() == can_stop[table]
+            if (wants_stop[table] and can_stop[table]) or forced[table]:
+                round.stop_the_bus()
+            round.advance_turn()
+
+        _assert_same_state(vector, rounds)
+
+    for round in rounds:
+        round.end_round()
+        round.game.rotate_dealer()
+    vector.finish_rounds()
+
+    assert vector.lives.tolist() == [game.lives for game in games]
+    assert vector.dealer.tolist() == [game.dealer for game in games]
+    for table, game in enumerate(games):
+        if game.live_player_count <= 1:
+            assert vector.over[table]
+            expected_winner: int = next(game.live_players, NO_WINNER)
+            assert vector.winner[table] == expected_winner